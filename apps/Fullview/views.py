@@ -1,5 +1,4 @@
 from django.shortcuts import render
-import requests
 import json
 from datetime import datetime, timedelta
 import random
@@ -7,27 +6,26 @@ from django.http import JsonResponse
 import os
 import logging
 
+from apps.live_rates.tokens import mg_link_token_manager
+from apps.live_rates.clients import mg_link_client
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
 def get_token():
-    """Get authentication token from API"""
-    url = "https://api.mg-link.net/api/auth/token"
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    data = {
-        'grant_type': 'password',
-        'username': 'EKCapital2024',
-        'password': '3KC@Pit@L!2024'
-    }
-    
-    response = requests.post(url, headers=headers, data=data)
-    if response.status_code == 200:
-        return response.json().get('access_token')
-    return None
+    """Get authentication token from API (shared across workers via the cache)"""
+    return mg_link_token_manager.get_token()
 
-def get_stock_data(access_token, symbol=None):
+def api_get(url):
+    """
+    Make an authenticated GET request to the API using the pooled client.
+    Retries once with a fresh token if the token is rejected.
+    """
+    return mg_link_client.get(url)
+
+def get_stock_data(symbol=None):
     """Get stock data from API"""
     today = datetime.now().strftime('%Y-%m-%d')
     
@@ -35,12 +33,7 @@ def get_stock_data(access_token, symbol=None):
     # Get stock prices data
     url = f"https://api.mg-link.net/api/Data1/PSXStockPrices?StartDate=&EndDate="
     
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Authorization': f'Bearer {access_token}'
-    }
-    
-    response = requests.get(url, headers=headers)
+    response = api_get(url)
     if response.status_code == 200:
         data = response.json()
         if symbol:
@@ -49,41 +42,26 @@ def get_stock_data(access_token, symbol=None):
         return data
     return []
 
-def get_news(access_token):
+def get_news():
     """Get news data from API"""
     url = "https://api.mg-link.net/api/Data1/GetMGNews_New"
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Authorization': f'Bearer {access_token}'
-    }
-    
-    response = requests.get(url, headers=headers)
+    response = api_get(url)
     if response.status_code == 200:
         return response.json()
     return []
 
-def get_announcements(access_token):
+def get_announcements():
     """Get company announcements from API"""
     url = "https://api.mg-link.net/api/Data1/GetPSXAnnouncements"
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Authorization': f'Bearer {access_token}'
-    }
-    
-    response = requests.get(url, headers=headers)
+    response = api_get(url)
     if response.status_code == 200:
         return response.json()
     return []
 
-def get_indices(access_token):
+def get_indices():
     """Get market indices data from API"""
     url = "https://api.mg-link.net/api/Data1/GetPSXIndicesLive"
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Authorization': f'Bearer {access_token}'
-    }
-    
-    response = requests.get(url, headers=headers)
+    response = api_get(url)
     if response.status_code == 200:
         return response.json()
     return []
@@ -255,7 +233,7 @@ def stock_360_view(request, symbol="786"):
         })
     
     # Get stock data
-    stock_data = get_stock_data(access_token, symbol)
+    stock_data = get_stock_data(symbol)
     
     # Get latest stock information
     latest_stock = None
@@ -296,14 +274,14 @@ def stock_360_view(request, symbol="786"):
             logger.error(f"Error converting PctChange to float: {e}")
     
     # Get news
-    news = get_news(access_token)
+    news = get_news()
     
     # Get announcements
-    announcements = get_announcements(access_token)
+    announcements = get_announcements()
     filtered_announcements = [a for a in announcements if a.get('Symbol') == symbol]
     
     # Get indices
-    indices = get_indices(access_token)
+    indices = get_indices()
     
     # Get company analysis
     company_analysis = get_company_analysis(symbol, stock_data)
@@ -567,7 +545,7 @@ def companies_list(request):
         })
     
     # Get stock data for all companies
-    all_stocks = get_stock_data(access_token)
+    all_stocks = get_stock_data()
     
     # Group by Symbol to get unique companies
     companies = {}
@@ -649,7 +627,7 @@ def api_debug(request, symbol="DGKC"):
     os.makedirs(output_dir, exist_ok=True)
     
     # Get stock data
-    stock_data = get_stock_data(access_token, symbol)
+    stock_data = get_stock_data(symbol)
     
     # Get latest stock information
     latest_stock = None
@@ -657,14 +635,14 @@ def api_debug(request, symbol="DGKC"):
         latest_stock = stock_data[-1]
     
     # Get news
-    news = get_news(access_token)
+    news = get_news()
     
     # Get announcements
-    announcements = get_announcements(access_token)
+    announcements = get_announcements()
     filtered_announcements = [a for a in announcements if a.get('Symbol') == symbol]
     
     # Get indices
-    indices = get_indices(access_token)
+    indices = get_indices()
     
     # Save data to files
     try:
@@ -1,6 +1,6 @@
 # news/views.py
 
-import requests
+import httpx
 import logging
 from collections import Counter
 from datetime import datetime, timedelta
@@ -16,27 +16,26 @@ from django.utils import timezone
 # from django.views.decorators.cache import cache_page # View-level caching less ideal with filtering
 
 # Local Imports
+from apps.live_rates.tokens import mg_link_token_manager
+from apps.live_rates.clients import mg_link_client
+from helpers.exceptions.requests import RequestError
 from .models import News # Assuming your model is in the same app
 
 logger = logging.getLogger(__name__)
 
 # --- Constants for Cache ---
-ACCESS_TOKEN_CACHE_KEY = 'mg_link_access_token'
 NEWS_DATA_CACHE_KEY = 'mg_link_news_data'
 MARKET_DATA_CACHE_KEY = 'market_data_v2'
 ALL_CATEGORIES_CACHE_KEY = 'all_news_categories_v2'
 DISTINCT_SOURCES_CACHE_KEY = 'distinct_news_sources_v2'
 
 # --- Cache Timeouts (in seconds) ---
-TOKEN_EXPIRY_SECONDS = 3500 # Assume token expires in 3600 secs, refresh slightly earlier
 NEWS_CACHE_TIMEOUT = 15 * 60 # Cache news API data for 15 minutes
 MARKET_DATA_CACHE_TIMEOUT = 5 * 60 # Cache market data for 5 minutes
 ALL_CATEGORIES_TIMEOUT = 60 * 60 # Cache category list for 1 hour
 SOURCES_CACHE_TIMEOUT = 2 * 60 * 60 # Cache sources for 2 hours
 
 # --- API Credentials (Move to settings or environment variables!) ---
-MG_API_USERNAME = "EKCapital2024"
-MG_API_PASSWORD = "3KC@Pit@L!2024"
 # Placeholder for Market Data API - REPLACE THESE
 MARKET_DATA_API_KEY = getattr(settings, "MARKET_DATA_API_KEY", "YOUR_MARKET_API_KEY")
 MARKET_DATA_API_URL = getattr(settings, "MARKET_DATA_API_URL", "YOUR_MARKET_API_ENDPOINT")
@@ -47,47 +46,8 @@ MARKET_DATA_API_URL = getattr(settings, "MARKET_DATA_API_URL", "YOUR_MARKET_API_
 # ===========================
 
 def get_access_token():
-    """Fetches the MG-Link access token from the API or cache."""
-    token = cache.get(ACCESS_TOKEN_CACHE_KEY)
-    if token:
-        logger.debug("MG-Link Access token found in cache.")
-        return token
-
-    logger.info("Fetching new MG-Link access token from API.")
-    url = "https://api.mg-link.net/api/auth/token"
-    data = {
-        "grant_type": "password",
-        "username": MG_API_USERNAME,
-        "password": MG_API_PASSWORD
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-    try:
-        response = requests.post(url, data=data, headers=headers, timeout=10)
-        response.raise_for_status()
-        token_data = response.json()
-        access_token = token_data.get('access_token')
-        # Use 'expires_in' for dynamic timeout, provide a default
-        expires_in = token_data.get('expires_in', TOKEN_EXPIRY_SECONDS)
-        # Ensure cache timeout is reasonable, at least 60 seconds
-        cache_timeout = max(60, expires_in - 120) if expires_in else TOKEN_EXPIRY_SECONDS - 120
-
-        if access_token:
-            cache.set(ACCESS_TOKEN_CACHE_KEY, access_token, timeout=cache_timeout)
-            logger.info(f"New MG-Link access token obtained and cached for {cache_timeout} seconds.")
-            return access_token
-        else:
-            logger.error("Access token not found in MG-Link API response.")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Network error getting MG-Link access token: {str(e)}")
-        return None
-    except ValueError as e: # JSON decode error
-        logger.error(f"Error decoding JSON response from MG-Link token API: {str(e)}")
-        return None
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during MG-Link token fetch: {str(e)}")
-        return None
+    """Fetches the MG-Link access token (shared across workers via the cache)."""
+    return mg_link_token_manager.get_token()
 
 
 def fetch_news_from_api():
@@ -104,11 +64,10 @@ def fetch_news_from_api():
         return [] # Return empty list on failure
 
     url = "https://api.mg-link.net/api/Data1/GetMGNews_New"
-    headers = {"Authorization": f"Bearer {access_token}"}
 
     try:
-        # Increased timeout for potentially large response
-        response = requests.get(url, headers=headers, timeout=25)
+        # Pooled client uses an increased timeout for this endpoint's potentially large response
+        response = mg_link_client.get(url)
         response.raise_for_status()
         news_data = response.json() # Assume this returns a list of dicts
 
@@ -126,16 +85,14 @@ def fetch_news_from_api():
              logger.error(f"Unexpected data format received from MG-Link news API. Expected list, got {type(news_data)}. Response: {str(response.text)[:200]}")
              return []
 
-    except requests.exceptions.Timeout:
-        logger.error("Timeout occurred while fetching MG-Link news.")
-        return []
-    except requests.exceptions.HTTPError as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error fetching MG-Link news: {e.response.status_code} - {e.response.text}")
         if e.response.status_code == 401: # Unauthorized
-            cache.delete(ACCESS_TOKEN_CACHE_KEY) # Clear potentially expired token
+            mg_link_token_manager.invalidate(stale_token=access_token) # Clear potentially expired token
             logger.warning("Received 401 from MG-Link, clearing cached access token.")
         return []
-    except requests.exceptions.RequestException as e:
+    except RequestError as e:
+        # Includes timeouts
         logger.error(f"Network error fetching MG-Link news: {str(e)}")
         return []
     except ValueError as e: # JSON decode error
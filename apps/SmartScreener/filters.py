@@ -0,0 +1,905 @@
+"""
+Unified SmartScreener filter engine.
+
+Screener filter parameters are compiled once into a `FilterSpec`, which can then be
+evaluated either as a NumPy mask over a typed, columnar `StockFrame` built from
+API records, or as an ORM `Q` over the `Stock` model. Both paths share the same
+semantics:
+
+- Conditions on fields that the data source does not have are skipped.
+- Rows with a missing (null) value for a condition's field do not match it.
+- Signals like "top_gainers" keep the top N matching rows by a field.
+"""
+
+import typing
+import datetime
+import numpy as np
+from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Abs, Cast, NullIf
+from django.db.models.lookups import (
+    Exact,
+    GreaterThan,
+    GreaterThanOrEqual,
+    LessThan,
+    LessThanOrEqual,
+)
+
+
+class Field(typing.NamedTuple):
+    """A filterable stock field"""
+
+    aliases: typing.Tuple[str, ...]
+    """Keys of the field in API records, in order of preference"""
+    kind: str = "number"
+    """One of "number", "text" or "date" """
+    model_field: typing.Optional[str] = None
+    """Name of the equivalent `Stock` model field, if any"""
+    fallback: typing.Optional[typing.Any] = None
+    """
+    Expression used instead if the data source does not have the field.
+    Fields within it are not replaced by their own fallbacks.
+    """
+
+
+class Ratio(typing.NamedTuple):
+    """`numerator / denominator`"""
+
+    numerator: typing.Any
+    denominator: typing.Any
+
+
+class PctDiff(typing.NamedTuple):
+    """Percentage difference of `value` from `base`"""
+
+    value: typing.Any
+    base: typing.Any
+
+
+class Scaled(typing.NamedTuple):
+    """`expression * factor`"""
+
+    expression: typing.Any
+    factor: float
+
+
+FIELDS: typing.Dict[str, Field] = {
+    # Text fields
+    "Symbol": Field(("Symbol",), "text", "symbol"),
+    "CompanyName": Field(("CompanyName",), "text", "name"),
+    "Sector": Field(("Sector", "sector"), "text", "sector"),
+    "Industry": Field(("Industry", "industry"), "text", "industry"),
+    "Exchange": Field(("Exchange",), "text"),
+    "Index": Field(("Index",), "text"),
+    "Country": Field(("Country",), "text"),
+    "Recommendation": Field(("Recommendation", "AnalystRecommendation", "AnalystRecom"), "text"),
+    "IPODate": Field(("IPODate",), "date"),
+    # Prices
+    "Last": Field(("Last", "price"), model_field="price"),
+    "LDCP": Field(("LDCP",), model_field="prev_close"),
+    "Open": Field(("Open",), model_field="open_price"),
+    "High": Field(("High",), model_field="high_price"),
+    "Low": Field(("Low",), model_field="low_price"),
+    "Change": Field(("Change",), model_field="change"),
+    "PctChange": Field(("PctChange", "changePercent"), model_field="change_percent"),
+    "High52": Field(("High52Week", "High52")),
+    "Low52": Field(("Low52Week", "Low52")),
+    "TargetPrice": Field(("TargetPrice",)),
+    # Volume
+    "Volume": Field(("Volume", "volume"), model_field="volume"),
+    "AvgVolume": Field(("AverageVolume", "AvgVolume"), fallback="Volume"),
+    "RelVolume": Field(
+        ("RelativeVolume", "RelVolume"), fallback=Ratio("Volume", "AvgVolume")
+    ),
+    # Fundamentals
+    "MarketCap": Field(("MarketCap", "marketCap"), model_field="market_cap"),
+    "PE": Field(("PE", "pe"), model_field="pe_ratio"),
+    "ForwardPE": Field(("ForwardPE",)),
+    "PEG": Field(("PEG",)),
+    "PS": Field(("PS",)),
+    "PB": Field(("PB",)),
+    "SharesOutstanding": Field(("SharesOutstanding",)),
+    "Float": Field(("Float",)),
+    "DividendYield": Field(("DividendYield", "dividendYield")),
+    "DividendGrowth": Field(("DividendGrowth",)),
+    "InstitutionalOwnership": Field(("InstitutionalOwnership",)),
+    "InsiderOwnership": Field(("InsiderOwnership",)),
+    # Technicals
+    "RSI": Field(("RSI", "rsi")),
+    "SMA20": Field(("SMA20",)),
+    "SMA50": Field(("SMA50",)),
+    "SMA200": Field(("SMA200",)),
+    "Volatility": Field(("Volatility",)),
+    "VolatilityWeek": Field(("VolatilityWeek", "WeekVolatility")),
+    "VolatilityMonth": Field(("VolatilityMonth", "MonthVolatility")),
+    "PerformanceWeek": Field(("PerformanceWeek",), fallback="PctChange"),
+    "PerformanceMonth": Field(("PerformanceMonth",)),
+    "PerformanceQuarter": Field(("PerformanceQuarter",)),
+    "PerformanceYear": Field(("PerformanceYear",)),
+}
+"""Filterable fields, keyed by their canonical (API) name"""
+
+FIELDS_BY_ALIAS: typing.Dict[str, str] = {
+    alias: name for name, field in FIELDS.items() for alias in field.aliases
+}
+"""Canonical field names, keyed by API record key"""
+
+
+class Condition(typing.NamedTuple):
+    """
+    A filter condition.
+
+    `op` is one of "gt", "gte", "lt", "lte", "eq" and "abs_lt" for numeric and date
+    expressions, and "ieq" (case-insensitive equality) and "icontains_any" (contains
+    any of the given terms, case-insensitive) for text fields.
+    """
+
+    expression: typing.Any
+    op: str
+    value: typing.Any
+
+
+class Rank(typing.NamedTuple):
+    """Keep only the top `limit` rows by a field"""
+
+    field: str
+    descending: bool
+    limit: int
+
+
+def _between(expression, low=None, high=None, inclusive_low=False, inclusive_high=True):
+    conditions = []
+    if low is not None:
+        conditions.append(Condition(expression, "gte" if inclusive_low else "gt", low))
+    if high is not None:
+        conditions.append(Condition(expression, "lte" if inclusive_high else "lt", high))
+    return conditions
+
+
+def _gt(expression, value):
+    return [Condition(expression, "gt", value)]
+
+
+def _lt(expression, value):
+    return [Condition(expression, "lt", value)]
+
+
+def _eq(expression, value):
+    return [Condition(expression, "eq", value)]
+
+
+def _near(a, b, tolerance=2.0):
+    # |a - b| / b < 2%, used to approximate crossovers without historical data
+    return [Condition(PctDiff(a, b), "abs_lt", tolerance)]
+
+
+_VOLUME_OPTIONS = {
+    "Under 100K": _lt("Volume", 100_000),
+    "Over 100K": _gt("Volume", 100_000),
+    "Over 500K": _gt("Volume", 500_000),
+    "Over 1M": _gt("Volume", 1_000_000),
+}
+
+_SHARES_OPTIONS = {
+    "Under 10M": ("lt", 10_000_000),
+    "Over 50M": ("gt", 50_000_000),
+    "Over 100M": ("gt", 100_000_000),
+    "Over 500M": ("gt", 500_000_000),
+}
+
+
+def _sma_options(sma: str, other: str, other_label: str) -> typing.Dict[str, typing.List[Condition]]:
+    return {
+        f"Price Above {sma}": [Condition("Last", "gt", sma)],
+        f"Price Below {sma}": [Condition("Last", "lt", sma)],
+        f"Price Crossed {sma}": _near("Last", sma),
+        f"{sma} Crossed {other_label}": _near(sma, other),
+        f"{sma} Above {other_label}": [Condition(sma, "gt", other)],
+        f"{sma} Below {other_label}": [Condition(sma, "lt", other)],
+    }
+
+
+_GAP = PctDiff("Open", "LDCP")
+_CHANGE_FROM_OPEN = PctDiff("Last", "Open")
+_PRICE_TO_TARGET = PctDiff("TargetPrice", "Last")
+
+OPTION_FILTERS: typing.Dict[str, typing.Dict[str, typing.List[Condition]]] = {
+    "market_cap": {
+        "Mega": _gt("MarketCap", 200_000_000_000),
+        "Large": _between("MarketCap", 10_000_000_000, 200_000_000_000, inclusive_low=True),
+        "Mid": _between("MarketCap", 2_000_000_000, 10_000_000_000, inclusive_low=True),
+        "Small": _between("MarketCap", 300_000_000, 2_000_000_000, inclusive_low=True),
+        "Micro": _lt("MarketCap", 300_000_000),
+    },
+    "div_yield": {
+        "Positive": _gt("DividendYield", 0),
+        "High": _gt("DividendYield", 3),
+        "Very High": _gt("DividendYield", 6),
+    },
+    "avg_volume": {
+        option: [c._replace(expression="AvgVolume") for c in conditions]
+        for option, conditions in _VOLUME_OPTIONS.items()
+    },
+    "rel_volume": {
+        "Over 0.5": _gt("RelVolume", 0.5),
+        "Over 1": _gt("RelVolume", 1),
+        "Over 2": _gt("RelVolume", 2),
+        "Over 3": _gt("RelVolume", 3),
+    },
+    "current_volume": _VOLUME_OPTIONS,
+    "price": {
+        "Under 1": _lt("Last", 1),
+        "Under 5": _lt("Last", 5),
+        "Under 10": _lt("Last", 10),
+        "Under 20": _lt("Last", 20),
+        "Over 50": _gt("Last", 50),
+        "Over 100": _gt("Last", 100),
+    },
+    "target_price": {
+        "Positive": _gt(_PRICE_TO_TARGET, 0),
+        "Over 5%": _gt(_PRICE_TO_TARGET, 5),
+        "Over 10%": _gt(_PRICE_TO_TARGET, 10),
+        "Over 20%": _gt(_PRICE_TO_TARGET, 20),
+    },
+    "shares_outstanding": {
+        option: [Condition("SharesOutstanding", op, value)]
+        for option, (op, value) in _SHARES_OPTIONS.items()
+    },
+    "float": {
+        option: [Condition("Float", op, value)]
+        for option, (op, value) in _SHARES_OPTIONS.items()
+    },
+    "pe_ratio": {
+        "Low": _lt("PE", 15),
+        "High": _gt("PE", 50),
+        "Negative": _lt("PE", 0),
+    },
+    "forward_pe": {"Low": _lt("ForwardPE", 15), "High": _gt("ForwardPE", 50)},
+    "peg": {"Low": _lt("PEG", 1), "High": _gt("PEG", 2)},
+    "ps": {"Low": _lt("PS", 1), "High": _gt("PS", 10)},
+    "pb": {"Low": _lt("PB", 1), "High": _gt("PB", 5)},
+    "rsi": {
+        "Oversold": _lt("RSI", 30),
+        "Overbought": _gt("RSI", 70),
+        "Not Overbought": _lt("RSI", 70),
+        "Not Oversold": _gt("RSI", 30),
+    },
+    "sma_20": _sma_options("SMA20", "SMA50", "SMA50"),
+    "sma_50": _sma_options("SMA50", "SMA200", "SMA200"),
+    "sma_200": {
+        "Price Above SMA200": [Condition("Last", "gt", "SMA200")],
+        "Price Below SMA200": [Condition("Last", "lt", "SMA200")],
+        "Price Crossed SMA200": _near("Last", "SMA200"),
+        "SMA200 Above SMA20": [Condition("SMA200", "gt", "SMA20")],
+        "SMA200 Below SMA20": [Condition("SMA200", "lt", "SMA20")],
+    },
+    "gap": {
+        "Up": _gt(_GAP, 0),
+        "Up 0-2%": _between(_GAP, 0, 2),
+        "Up 2-5%": _between(_GAP, 2, 5),
+        "Up 5-10%": _between(_GAP, 5, 10),
+        "Up 10-20%": _between(_GAP, 10, 20),
+        "Down": _lt(_GAP, 0),
+        "Down 0-2%": _between(_GAP, -2, 0, inclusive_low=True, inclusive_high=False),
+        "Down 2-5%": _between(_GAP, -5, -2, inclusive_low=True, inclusive_high=False),
+        "Down 5-10%": _between(_GAP, -10, -5, inclusive_low=True, inclusive_high=False),
+        "Down 10-20%": _between(_GAP, -20, -10, inclusive_low=True, inclusive_high=False),
+    },
+    "change": {
+        "Up": _gt("PctChange", 0),
+        **{f"Up {n}%": _gt("PctChange", n) for n in (1, 2, 5, 10, 15, 20)},
+        "Down": _lt("PctChange", 0),
+        **{f"Down {n}%": _lt("PctChange", -n) for n in (1, 2, 5, 10, 15)},
+    },
+    "change_open": {
+        "Up": _gt(_CHANGE_FROM_OPEN, 0),
+        **{f"Up {n}%": _gt(_CHANGE_FROM_OPEN, n) for n in (1, 2, 5)},
+        "Down": _lt(_CHANGE_FROM_OPEN, 0),
+        **{f"Down {n}%": _lt(_CHANGE_FROM_OPEN, -n) for n in (1, 2, 5)},
+    },
+    "performance": {
+        f"{period} {direction}": (_gt if direction == "Up" else _lt)(f"Performance{period}", 0)
+        for period in ("Week", "Month", "Quarter", "Year")
+        for direction in ("Up", "Down")
+    },
+    "volatility": {
+        "Low": _lt("Volatility", 1.5),
+        "High": _gt("Volatility", 2.5),
+    },
+    "dividend_yield": {
+        "No Dividend": _eq("DividendYield", 0),
+        "Very High": _gt("DividendYield", 6),
+        "High": _gt("DividendYield", 4),
+        "Average": _between("DividendYield", 2, 4),
+        "Low": _between("DividendYield", 0, 2),
+    },
+    "dividend_growth": {
+        "Positive Only": _gt("DividendGrowth", 0),
+        "Very High": _gt("DividendGrowth", 15),
+        "High": _gt("DividendGrowth", 10),
+        "Average": _between("DividendGrowth", 5, 10),
+        "Low": _between("DividendGrowth", 0, 5),
+        "Negative Only": _lt("DividendGrowth", 0),
+    },
+    "ownership": {
+        "High Institutional": _gt("InstitutionalOwnership", 70),
+        "Low Institutional": _lt("InstitutionalOwnership", 30),
+        "High Insider": _gt("InsiderOwnership", 10),
+        "Very High Insider": _gt("InsiderOwnership", 30),
+        "Low Insider": _lt("InsiderOwnership", 5),
+    },
+    "signal": {
+        "new_high": [Condition("Last", "gte", Scaled("High52", 0.95))],
+        "new_low": [Condition("Last", "lte", Scaled("Low52", 1.05))],
+        "overbought": _gt("RSI", 70),
+        "oversold": _lt("RSI", 30),
+    },
+}
+"""Conditions of each option of the screener's select filters"""
+
+RANK_FILTERS: typing.Dict[str, typing.Dict[str, Rank]] = {
+    "signal": {
+        "top_gainers": Rank("PctChange", descending=True, limit=20),
+        "top_losers": Rank("PctChange", descending=False, limit=20),
+        "most_active": Rank("Volume", descending=True, limit=20),
+    },
+    "volatility": {
+        "Week": Rank("VolatilityWeek", descending=True, limit=100),
+        "Month": Rank("VolatilityMonth", descending=True, limit=100),
+    },
+}
+"""Options of the screener's select filters that keep the top N stocks by a field"""
+
+TEXT_FILTERS = {
+    "exchange": "Exchange",
+    "index": "Index",
+    "sector": "Sector",
+    "industry": "Industry",
+    "country": "Country",
+    "analyst_recom": "Recommendation",
+}
+"""Filters matching a text field case-insensitively"""
+
+RANGE_FILTERS = {
+    "price": "Last",
+    "volume": "Volume",
+    "change": "PctChange",
+    "pe": "PE",
+    "market_cap": "MarketCap",
+}
+"""Fields of the `<name>_min`/`<name>_max` range filters"""
+
+IPO_DATE_YEARS = {
+    "This Year": ("gte", 0),
+    "Last 2 Years": ("gte", 2),
+    "Last 5 Years": ("gte", 5),
+    "Over 10 Years": ("lte", 10),
+}
+
+IGNORED_VALUES = {"any", "none"}
+"""Filter values meaning "no filter" """
+
+
+def filters_from_query(
+    params: typing.Mapping[str, str],
+    exclude: typing.Iterable[str] = ("page", "per_page", "sort_by", "sort_dir", "csrfmiddlewaretoken"),
+) -> typing.Dict[str, str]:
+    """
+    Returns the filters in request query parameters.
+
+    Empty values and values meaning "no filter" are dropped.
+
+    :param params: The query parameters, e.g. `request.GET`.
+    :param exclude: Names of non-filter parameters, e.g. for pagination or sorting.
+    """
+    exclude = set(exclude)
+    filters = {
+        key: value
+        for key, value in params.items()
+        if key not in exclude and value and value.strip().lower() not in IGNORED_VALUES
+    }
+    if "symbol" not in filters and "tickers" in filters:
+        filters["symbol"] = filters["tickers"]
+    return filters
+
+
+def _to_float(value) -> typing.Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _years_ago(today: datetime.date, years: int) -> datetime.date:
+    if years == 0:
+        return today.replace(month=1, day=1)
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29th of February
+        return today.replace(year=today.year - years, day=28)
+
+
+class FilterSpec:
+    """
+    Compiled screener filters.
+
+    Evaluate with `mask` (NumPy) / `apply` (API records), or `to_q` / `filter_queryset` (ORM).
+    """
+
+    def __init__(
+        self,
+        conditions: typing.Sequence[Condition] = (),
+        rank: typing.Optional[Rank] = None,
+    ):
+        self.conditions = list(conditions)
+        self.rank = rank
+
+    def __bool__(self) -> bool:
+        return bool(self.conditions or self.rank)
+
+    def __repr__(self) -> str:
+        return f"FilterSpec(conditions={self.conditions!r}, rank={self.rank!r})"
+
+    @classmethod
+    def compile(
+        cls, filters: typing.Mapping[str, typing.Any], today: typing.Optional[datetime.date] = None
+    ) -> "FilterSpec":
+        """
+        Compile screener filter parameters.
+
+        Unknown filters and options are ignored.
+
+        :param filters: The filter parameters, e.g. as returned by `filters_from_query`.
+        :param today: The date relative filters (e.g. IPO date) are relative to. Defaults to today.
+        """
+        conditions: typing.List[Condition] = []
+        rank = None
+        for key, raw_value in filters.items():
+            if raw_value is None:
+                continue
+            value = str(raw_value).strip()
+            if not value or value.lower() in IGNORED_VALUES:
+                continue
+
+            if key in TEXT_FILTERS:
+                conditions.append(Condition(TEXT_FILTERS[key], "ieq", value))
+            elif key == "symbol":
+                terms = value.replace(",", " ").split()
+                if terms:
+                    conditions.append(Condition("Symbol", "icontains_any", terms))
+            elif key.endswith(("_min", "_max")) and key[:-4] in RANGE_FILTERS:
+                bound = _to_float(value)
+                if bound is not None:
+                    op = "gte" if key.endswith("_min") else "lte"
+                    conditions.append(Condition(RANGE_FILTERS[key[:-4]], op, bound))
+            elif key == "ipo_date" and value in IPO_DATE_YEARS:
+                op, years = IPO_DATE_YEARS[value]
+                date = _years_ago(today or datetime.date.today(), years)
+                conditions.append(Condition("IPODate", op, date))
+            elif key in RANK_FILTERS and value in RANK_FILTERS[key]:
+                rank = RANK_FILTERS[key][value]
+            elif key in OPTION_FILTERS and value in OPTION_FILTERS[key]:
+                conditions.extend(OPTION_FILTERS[key][value])
+        return cls(conditions, rank)
+
+    # NumPy evaluation
+
+    def _evaluate(
+        self, expression, frame: "StockFrame", fallbacks: bool = True
+    ) -> typing.Optional[np.ndarray]:
+        if isinstance(expression, (int, float, datetime.date)):
+            return expression
+        if isinstance(expression, str):
+            field = FIELDS[expression]
+            if frame.has_field(expression):
+                return frame.column(expression)
+            if fallbacks and field.fallback is not None:
+                return self._evaluate(field.fallback, frame, fallbacks=False)
+            return None
+        if isinstance(expression, Scaled):
+            values = self._evaluate(expression.expression, frame, fallbacks)
+            return None if values is None else values * expression.factor
+
+        if isinstance(expression, Ratio):
+            numerator = self._evaluate(expression.numerator, frame, fallbacks)
+            denominator = self._evaluate(expression.denominator, frame, fallbacks)
+        else:
+            numerator = self._evaluate(expression.value, frame, fallbacks)
+            denominator = self._evaluate(expression.base, frame, fallbacks)
+            if numerator is not None and denominator is not None:
+                numerator = (numerator - denominator) * 100
+        if numerator is None or denominator is None:
+            return None
+        # Division by zero gives null, as in SQL
+        return np.divide(
+            numerator,
+            denominator,
+            out=np.full(len(frame), np.nan),
+            where=denominator != 0,
+        )
+
+    def _condition_mask(self, condition: Condition, frame: "StockFrame") -> typing.Optional[np.ndarray]:
+        values = self._evaluate(condition.expression, frame)
+        if values is None:
+            return None
+
+        if condition.op == "ieq":
+            return values == condition.value.lower()
+        if condition.op == "icontains_any":
+            mask = np.zeros(len(frame), dtype=bool)
+            for term in condition.value:
+                mask |= np.char.find(values, term.lower()) >= 0
+            return mask
+
+        value = condition.value
+        if isinstance(value, datetime.date):
+            value = np.datetime64(value, "D")
+        elif not isinstance(value, (int, float)):
+            value = self._evaluate(value, frame)
+            if value is None:
+                return None
+
+        # Comparisons with NaN/NaT are False, so rows with missing values do not match
+        with np.errstate(invalid="ignore"):
+            if condition.op == "gt":
+                return values > value
+            if condition.op == "gte":
+                return values >= value
+            if condition.op == "lt":
+                return values < value
+            if condition.op == "lte":
+                return values <= value
+            if condition.op == "eq":
+                return values == value
+            if condition.op == "abs_lt":
+                return np.abs(values) < value
+        raise ValueError(f"Unsupported filter operation: {condition.op}")
+
+    def mask(self, frame: "StockFrame") -> np.ndarray:
+        """Returns a boolean mask of the rows of the frame that match the filters"""
+        mask = np.ones(len(frame), dtype=bool)
+        for condition in self.conditions:
+            condition_mask = self._condition_mask(condition, frame)
+            if condition_mask is not None:
+                mask &= condition_mask
+
+        if self.rank is not None and frame.has_field(self.rank.field):
+            values = frame.column(self.rank.field)
+            candidates = np.flatnonzero(mask & ~np.isnan(values))
+            order = np.argsort(values[candidates], kind="stable")
+            if self.rank.descending:
+                order = order[::-1]
+            mask = np.zeros(len(frame), dtype=bool)
+            mask[candidates[order[: self.rank.limit]]] = True
+        return mask
+
+    def apply(self, stocks: typing.Sequence[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Returns the API stock records that match the filters, in their original order"""
+        if not self or not stocks:
+            return list(stocks)
+        frame = StockFrame(stocks)
+        return frame.take(np.flatnonzero(self.mask(frame)))
+
+    def matches(self, stock: typing.Dict[str, typing.Any]) -> bool:
+        """Returns whether a single API stock record matches the filters"""
+        return bool(self.apply([stock]))
+
+    # ORM evaluation
+
+    def _expression(self, expression, fallbacks: bool = True) -> typing.Optional[typing.Any]:
+        if isinstance(expression, (int, float, datetime.date)):
+            return Value(expression)
+        if isinstance(expression, str):
+            field = FIELDS[expression]
+            if field.model_field is not None:
+                if field.kind == "number":
+                    return Cast(field.model_field, models.FloatField())
+                return F(field.model_field)
+            if fallbacks and field.fallback is not None:
+                return self._expression(field.fallback, fallbacks=False)
+            return None
+        if isinstance(expression, Scaled):
+            inner = self._expression(expression.expression, fallbacks)
+            return None if inner is None else inner * Value(expression.factor)
+
+        if isinstance(expression, Ratio):
+            numerator = self._expression(expression.numerator, fallbacks)
+            denominator = self._expression(expression.denominator, fallbacks)
+        else:
+            numerator = self._expression(expression.value, fallbacks)
+            denominator = self._expression(expression.base, fallbacks)
+            if numerator is not None and denominator is not None:
+                numerator = (numerator - denominator) * Value(100.0)
+        if numerator is None or denominator is None:
+            return None
+        return models.ExpressionWrapper(
+            numerator / NullIf(denominator, Value(0.0)),
+            output_field=models.FloatField(),
+        )
+
+    def _condition_q(self, condition: Condition) -> typing.Optional[Q]:
+        if condition.op in ("ieq", "icontains_any"):
+            model_field = FIELDS[condition.expression].model_field
+            if model_field is None:
+                return None
+            if condition.op == "ieq":
+                return Q(**{f"{model_field}__iexact": condition.value})
+            q = Q()
+            for term in condition.value:
+                q |= Q(**{f"{model_field}__icontains": term})
+            return q
+
+        lhs = self._expression(condition.expression)
+        rhs = self._expression(condition.value)
+        if lhs is None or rhs is None:
+            return None
+        if condition.op == "abs_lt":
+            return Q(LessThan(Abs(lhs), rhs))
+        lookup = {
+            "gt": GreaterThan,
+            "gte": GreaterThanOrEqual,
+            "lt": LessThan,
+            "lte": LessThanOrEqual,
+            "eq": Exact,
+        }.get(condition.op)
+        if lookup is None:
+            raise ValueError(f"Unsupported filter operation: {condition.op}")
+        return Q(lookup(lhs, rhs))
+
+    def to_q(self) -> Q:
+        """
+        Returns the filter conditions as a `Q` over the `Stock` model.
+
+        Does not include the rank (top N) filter. Use `filter_queryset` for that.
+        """
+        query = Q()
+        for condition in self.conditions:
+            condition_q = self._condition_q(condition)
+            if condition_q is not None:
+                query &= condition_q
+        return query
+
+    def filter_queryset(self, queryset: models.QuerySet) -> models.QuerySet:
+        """Returns the `Stock` queryset filtered by the filters, including the rank filter"""
+        queryset = queryset.filter(self.to_q())
+        if self.rank is not None:
+            model_field = FIELDS[self.rank.field].model_field
+            if model_field is not None:
+                ordering = F(model_field).desc() if self.rank.descending else F(model_field).asc()
+                top_ids = list(
+                    queryset.filter(**{f"{model_field}__isnull": False})
+                    .order_by(ordering, "pk")
+                    .values_list("pk", flat=True)[: self.rank.limit]
+                )
+                queryset = queryset.filter(pk__in=top_ids)
+        return queryset
+
+
+class StockFrame:
+    """
+    Typed, columnar view of API stock records.
+
+    Columns are built lazily, on first use, as float arrays (NaN for missing values),
+    lowercase string arrays or `datetime64[D]` arrays (NaT for missing values).
+    """
+
+    def __init__(self, stocks: typing.Sequence[typing.Dict[str, typing.Any]]):
+        self.stocks = stocks
+        self.keys = set().union(*(stock.keys() for stock in stocks)) if stocks else set()
+        self._columns: typing.Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.stocks)
+
+    def has_field(self, name: str) -> bool:
+        """Returns whether any of the records have the field"""
+        return any(alias in self.keys for alias in FIELDS[name].aliases)
+
+    def _values(self, aliases: typing.Tuple[str, ...]) -> typing.List[typing.Any]:
+        if len(aliases) == 1:
+            alias = aliases[0]
+            return [stock.get(alias) for stock in self.stocks]
+        values = []
+        for stock in self.stocks:
+            value = None
+            for alias in aliases:
+                value = stock.get(alias)
+                if value is not None:
+                    break
+            values.append(value)
+        return values
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the field's column"""
+        column = self._columns.get(name)
+        if column is not None:
+            return column
+
+        field = FIELDS[name]
+        values = self._values(field.aliases)
+        if field.kind == "text":
+            column = np.array([str(value).lower() if value is not None else "" for value in values], dtype=str)
+        elif field.kind == "date":
+            column = np.array([_to_datetime64(value) for value in values], dtype="datetime64[D]")
+        else:
+            try:
+                column = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                column = np.array([_to_float(value) for value in values], dtype=float)
+        self._columns[name] = column
+        return column
+
+    def take(self, indices: np.ndarray) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Returns the records at the given positions"""
+        return [self.stocks[i] for i in indices]
+
+    def resolve_key(self, key: str) -> typing.Optional[str]:
+        """Returns the record key matching `key` case-insensitively, or None if there is none"""
+        if key in self.keys:
+            return key
+        lowered = key.lower()
+        for record_key in self.keys:
+            if record_key.lower() == lowered:
+                return record_key
+        return None
+
+    def sort_column(self, key: str) -> np.ndarray:
+        """
+        Returns the column used to sort by a record key.
+
+        Numeric fields are float columns (NaN for missing values). Other keys are
+        float columns if all their values are numeric, and string columns
+        (empty for missing values) otherwise.
+        """
+        name = FIELDS_BY_ALIAS.get(key)
+        if name is not None and FIELDS[name].kind == "number":
+            return self.column(name)
+
+        cache_key = f"sort:{key}"
+        column = self._columns.get(cache_key)
+        if column is None:
+            values = [stock.get(key) for stock in self.stocks]
+            try:
+                column = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                column = np.array([str(value) if value is not None else "" for value in values], dtype=str)
+            self._columns[cache_key] = column
+        return column
+
+    def sorted_indices(
+        self,
+        key: str,
+        descending: bool = False,
+        indices: typing.Optional[np.ndarray] = None,
+        limit: typing.Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Returns the positions of the records sorted by a record key, missing values last.
+
+        :param key: The record key to sort by.
+        :param descending: Sort in descending order.
+        :param indices: Positions of the records to sort. Defaults to all records.
+        :param limit: Only return the first `limit` positions. Only these are fully sorted,
+            so sorting for a page costs O(n + limit * log(limit)).
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        values = self.sort_column(key)[indices]
+        if limit is None or limit > len(values):
+            limit = len(values)
+
+        if values.dtype.kind == "f":
+            # NaN sorts last in both directions
+            if descending:
+                values = -values
+            if limit < len(values):
+                candidates = np.argpartition(values, limit - 1)[:limit]
+                order = candidates[np.argsort(values[candidates], kind="stable")]
+            else:
+                order = np.argsort(values, kind="stable")
+        else:
+            present = np.flatnonzero(values != "")
+            order = present[np.argsort(values[present], kind="stable")]
+            if descending:
+                order = order[::-1]
+            order = np.concatenate([order, np.flatnonzero(values == "")])[:limit]
+        return indices[order]
+
+
+def _to_datetime64(value) -> np.datetime64:
+    if not value:
+        return np.datetime64("NaT")
+    try:
+        return np.datetime64(str(value)[:10], "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+class StockPage(typing.NamedTuple):
+    """A page of sorted stock records"""
+
+    records: typing.List[typing.Dict[str, typing.Any]]
+    total: int
+    page: int
+    per_page: int
+    total_pages: int
+
+
+def get_page(
+    stocks: typing.Sequence[typing.Dict[str, typing.Any]],
+    spec: typing.Optional[FilterSpec] = None,
+    sort_by: str = "Symbol",
+    descending: bool = False,
+    page: int = 1,
+    per_page: int = 20,
+) -> StockPage:
+    """
+    Filter and sort stock records, and return one page of them.
+
+    Only the records on the requested page are materialized, so the cost beyond
+    filtering and partial sorting scales with the page size, not the number of stocks.
+
+    :param stocks: The API stock records.
+    :param spec: The filters. Defaults to no filters.
+    :param sort_by: The record key to sort by, matched case-insensitively. Falls back
+        to "Symbol" if the records do not have it.
+    :param descending: Sort in descending order.
+    :param page: The 1-based page number. Out of range pages return the first page.
+    :param per_page: The number of records per page.
+    """
+    frame = StockFrame(stocks)
+    if spec:
+        indices = np.flatnonzero(spec.mask(frame))
+    else:
+        indices = np.arange(len(frame))
+
+    total = len(indices)
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    if page > total_pages or page < 1:
+        page = 1
+    start = (page - 1) * per_page
+    end = min(start + per_page, total)
+
+    sort_key = frame.resolve_key(sort_by) or frame.resolve_key("Symbol")
+    if sort_key is not None:
+        indices = frame.sorted_indices(sort_key, descending=descending, indices=indices, limit=end)
+    return StockPage(
+        records=frame.take(indices[start:end]),
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=total_pages,
+    )
+
+
+def compile_filters(filters: typing.Mapping[str, typing.Any]) -> FilterSpec:
+    """Compile screener filter parameters. See `FilterSpec.compile`."""
+    return FilterSpec.compile(filters)
+
+
+def queryset_to_records(queryset: models.QuerySet) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Returns `Stock` rows as API-shaped stock records"""
+    records = []
+    for row in queryset.values(
+        "symbol", "name", "sector", "industry", "price", "prev_close", "change",
+        "change_percent", "open_price", "high_price", "low_price", "volume",
+        "market_cap", "pe_ratio",
+    ):
+        records.append({
+            "Symbol": row["symbol"],
+            "CompanyName": row["name"],
+            "Sector": row["sector"],
+            "Industry": row["industry"],
+            "Last": _to_float(row["price"]),
+            "LDCP": _to_float(row["prev_close"]),
+            "Change": _to_float(row["change"]),
+            "PctChange": _to_float(row["change_percent"]),
+            "Open": _to_float(row["open_price"]),
+            "High": _to_float(row["high_price"]),
+            "Low": _to_float(row["low_price"]),
+            "Volume": row["volume"],
+            "MarketCap": _to_float(row["market_cap"]),
+            "PE": _to_float(row["pe_ratio"]),
+        })
+    return records
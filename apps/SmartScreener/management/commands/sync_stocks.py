@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from apps.SmartScreener.helpers import sync_stocks
+from apps.SmartScreener.scheduled_tasks import schedule_stocks_sync
+
+
+class Command(BaseCommand):
+    help = "Sync or schedule syncs of the SmartScreener stocks with the live prices feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="""
+            Schedule a task to sync the stocks.
+
+            Deletes the existing schedule if it already exists.
+
+            Defaults to repeating indefinitely every 5 minutes.
+            """,
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=-1,
+            help="Number of times to repeat the task. -1 to repeat indefinitely.",
+        )
+        parser.add_argument(
+            "--cron",
+            type=str,
+            default="*/5 * * * *",
+            help="Cron expression defining the interval at which the task should run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            self.schedule_update(repeats=options["repeats"], cron=options["cron"])
+            return
+
+        try:
+            self.stdout.write("Syncing stocks...")
+            synced = sync_stocks()
+            self.stdout.write(self.style.SUCCESS(f"Created or updated {synced} stocks"))
+        except Exception as exc:
+            self.stdout.write(self.style.ERROR(f"Error syncing stocks: {exc}"))
+
+    def schedule_update(self, **kwargs):
+        try:
+            self.stdout.write(
+                f"Scheduling stocks sync to run every {kwargs.get('cron')}..."
+            )
+            schedule_stocks_sync(**kwargs)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Stocks sync scheduled to run every {kwargs.get('cron')}."
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(
+                self.style.ERROR(f"Error scheduling stocks sync: {exc}")
+            )
@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-19 17:59
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_stocks(apps, schema_editor):
+    """Keep only the most recently added row of each symbol"""
+    Stock = apps.get_model('SmartScreener', 'Stock')
+    latest_ids = Stock.objects.values('symbol').annotate(latest_id=Max('id')).values('latest_id')
+    Stock.objects.exclude(id__in=latest_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SmartScreener', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_stocks, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='stock',
+            name='SmartScreen_symbol_337764_idx',
+        ),
+        migrations.AlterField(
+            model_name='stock',
+            name='symbol',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
@@ -1,9 +1,11 @@
+import typing
+from decimal import Decimal, InvalidOperation
 from django.db import models
 
 # Create your models here.
 
 class Stock(models.Model):
-    symbol = models.CharField(max_length=20)
+    symbol = models.CharField(max_length=20, unique=True)
     name = models.CharField(max_length=200)
     sector = models.CharField(max_length=100, null=True, blank=True)
     industry = models.CharField(max_length=100, null=True, blank=True)
@@ -21,7 +23,6 @@ class Stock(models.Model):
     
     class Meta:
         indexes = [
-            models.Index(fields=['symbol']),
             models.Index(fields=['sector']),
             models.Index(fields=['industry']),
         ]
@@ -29,22 +30,95 @@ class Stock(models.Model):
     def __str__(self):
         return self.symbol
         
+    API_FIELDS = {
+        'name': 'CompanyName',
+        'sector': 'Sector',
+        'industry': 'Industry',
+        'price': 'Last',
+        'prev_close': 'LDCP',
+        'change': 'Change',
+        'change_percent': 'PctChange',
+        'open_price': 'Open',
+        'high_price': 'High',
+        'low_price': 'Low',
+        'volume': 'Volume',
+    }
+    """Keys of the model fields in the live prices feed"""
+
+    @classmethod
+    def values_from_api(cls, data) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the model field values of a stock in the live prices feed.
+
+        Values are converted as they are stored, e.g. decimals are rounded
+        to the field's decimal places, so they can be compared with stored values.
+
+        :raises ValueError: If a required value is missing or invalid.
+        """
+        values = {}
+        for field_name, key in cls.API_FIELDS.items():
+            field = cls._meta.get_field(field_name)
+            value = data.get(key)
+            if value is None:
+                if not field.null:
+                    raise ValueError(f"Missing {key} for stock {data.get('Symbol')}")
+            elif isinstance(field, models.DecimalField):
+                try:
+                    value = Decimal(str(value)).quantize(Decimal(1).scaleb(-field.decimal_places))
+                except InvalidOperation as exc:
+                    raise ValueError(f"Invalid {key} for stock {data.get('Symbol')}") from exc
+            else:
+                value = field.to_python(value)
+            values[field_name] = value
+        return values
+
     @classmethod
     def update_or_create_from_api(cls, data):
         """Create or update stock from API data"""
         return cls.objects.update_or_create(
             symbol=data['Symbol'],
-            defaults={
-                'name': data['CompanyName'],
-                'sector': data.get('Sector'),
-                'industry': data.get('Industry'),
-                'price': data['Last'],
-                'prev_close': data['LDCP'],
-                'change': data['Change'],
-                'change_percent': data['PctChange'],
-                'open_price': data['Open'],
-                'high_price': data['High'],
-                'low_price': data['Low'],
-                'volume': data['Volume'],
-            }
+            defaults=cls.values_from_api(data),
         )
+
+    @classmethod
+    def sync_from_api(cls, feed, batch_size: int = 500) -> int:
+        """
+        Sync stocks with a snapshot of the live prices feed.
+
+        New stocks and stocks whose values changed are upserted in bulk,
+        in one statement per batch. Unchanged stocks are not written.
+        Invalid entries are skipped.
+
+        :param feed: The live prices feed. A list of API stock records.
+        :param batch_size: Number of stocks to upsert per statement.
+        :return: Number of stocks created or updated.
+        """
+        stocks = {}
+        for data in feed:
+            symbol = data.get('Symbol')
+            if not symbol:
+                continue
+            try:
+                stocks[symbol] = cls.values_from_api(data)
+            except ValueError:
+                continue
+
+        field_names = list(cls.API_FIELDS)
+        stored = {
+            row[0]: dict(zip(field_names, row[1:]))
+            for row in cls.objects.filter(symbol__in=stocks).values_list('symbol', *field_names)
+        }
+        changed = [
+            cls(symbol=symbol, **values)
+            for symbol, values in stocks.items()
+            if stored.get(symbol) != values
+        ]
+        if changed:
+            cls.objects.bulk_create(
+                changed,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['symbol'],
+                update_fields=[*field_names, 'updated_at'],
+            )
+        return len(changed)
@@ -0,0 +1,34 @@
+import datetime
+from django_q.tasks import schedule
+from django_q.models import Schedule
+from django.utils import timezone
+
+
+def schedule_stocks_sync(
+    repeats: int = -1,
+    cron: str = "*/5 * * * *",
+):
+    """
+    Schedule the task to sync the Stock table with the live prices feed.
+
+    Deletes the existing schedule if it already exists.
+
+    :param repeats: Number of times to repeat the task. -1 to repeat indefinitely.
+    :param cron: Cron expression defining the interval at which the task should run.
+    """
+    task_name = "apps.SmartScreener.helpers.sync_stocks"
+    # Delete the schedule if it already exists
+    Schedule.objects.filter(func=task_name).delete()
+
+    schedule(
+        task_name,
+        q_options={
+            "retry": 320,
+            "save": False,
+        },
+        timeout=300,
+        schedule_type="C",
+        repeats=repeats,
+        cron=cron,
+        next_run=(timezone.now() + datetime.timedelta(seconds=10)),
+    )
@@ -1,21 +1,35 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.core.cache import cache
 from .models import Stock
 import datetime
+import hashlib
 import json
+import time
 import logging
 import pandas as pd
 import orjson
-import requests
 import numpy as np
 
+from apps.live_rates.clients import mg_link_client
+from apps.live_rates.snapshots import (
+    get_data_etag,
+    get_feed_interval,
+    get_snapshot,
+    get_snapshot_max_age,
+)
+from helpers.exceptions.requests import RequestError
+
 from .helpers import (
     get_token, 
     get_data, 
     calculate_market_cap, 
     filter_stocks
 )
+from .filters import compile_filters, filters_from_query, get_page, queryset_to_records
 from .schemas import (
     Stock as StockSchema,
     MarketData,
@@ -125,6 +139,25 @@ def index(request):
         }
         return render(request, 'SmartScreener/Screener.html', context)
 
+def stock_page_response(stock_page):
+    """Serialize a page of stocks with orjson"""
+    payload = {
+        'status': 'success',
+        'data': stock_page.records,
+        'meta': {
+            'total': stock_page.total,
+            'page': stock_page.page,
+            'per_page': stock_page.per_page,
+            'total_pages': stock_page.total_pages,
+            'has_next': stock_page.page < stock_page.total_pages,
+            'has_previous': stock_page.page > 1
+        }
+    }
+    return HttpResponse(
+        orjson.dumps(payload),
+        content_type='application/json'
+    )
+
 def get_stock_prices(request):
     """API endpoint to get stock prices"""
     try:
@@ -147,288 +180,29 @@ def get_stock_prices(request):
                     if 'PE' not in stock:
                         stock['PE'] = None
                 
-                # Get query parameters for filtering
-                page = int(request.GET.get('page', 1))
-                per_page = int(request.GET.get('per_page', 20))
-                
-                # Create comprehensive filters dictionary
-                filters = {
-                    # Fundamentals tab filters
-                    'exchange': request.GET.get('exchange'),
-                    'index': request.GET.get('index'),
-                    'sector': request.GET.get('sector'),
-                    'industry': request.GET.get('industry'),
-                    'country': request.GET.get('country'),
-                    'market_cap': request.GET.get('market_cap'),
-                    'div_yield': request.GET.get('div_yield'),
-                    'avg_volume': request.GET.get('avg_volume'),
-                    'rel_volume': request.GET.get('rel_volume'),
-                    'current_volume': request.GET.get('current_volume'),
-                    'price': request.GET.get('price'),
-                    'target_price': request.GET.get('target_price'),
-                    'ipo_date': request.GET.get('ipo_date'),
-                    'shares_outstanding': request.GET.get('shares_outstanding'),
-                    'float': request.GET.get('float'),
-                    'analyst_recom': request.GET.get('analyst_recom'),
-                    'option_short': request.GET.get('option_short'),
-                    'earnings_date': request.GET.get('earnings_date'),
-                    'trades': request.GET.get('trades'),
-                    
-                    # Technical tab filters
-                    'pe_ratio': request.GET.get('pe_ratio'),
-                    'forward_pe': request.GET.get('forward_pe'),
-                    'peg': request.GET.get('peg'),
-                    'ps': request.GET.get('ps'),
-                    'pb': request.GET.get('pb'),
-                    
-                    # Performance tab filters
-                    'performance': request.GET.get('performance'),
-                    'performance_2': request.GET.get('performance_2'),
-                    'volatility': request.GET.get('volatility'),
-                    'rsi': request.GET.get('rsi'),
-                    'gap': request.GET.get('gap'),
-                    'sma_20': request.GET.get('sma_20'),
-                    'sma_50': request.GET.get('sma_50'),
-                    'sma_200': request.GET.get('sma_200'),
-                    'change': request.GET.get('change'),
-                    'change_open': request.GET.get('change_open'),
-                    
-                    # Legacy filters (for backward compatibility)
-                    'price_min': request.GET.get('price_min'),
-                    'price_max': request.GET.get('price_max'),
-                    'volume_min': request.GET.get('volume_min'),
-                    'volume_max': request.GET.get('volume_max'),
-                    'change_min': request.GET.get('change_min'),
-                    'change_max': request.GET.get('change_max'),
-                    'pe_min': request.GET.get('pe_min'),
-                    'pe_max': request.GET.get('pe_max'),
-                    'symbol': request.GET.get('symbol'),
-                    'signal': request.GET.get('signal')
-                }
-                
-                # Remove None values and empty strings
-                filters = {k: v for k, v in filters.items() if v is not None and v != '' and (isinstance(v, str) and v.lower() != 'any' or not isinstance(v, str))}
-                
-                # Apply all filters using enhanced filter_stocks function
-                filtered_data = filter_stocks(api_data, filters)
-                
-                # Apply sorting
-                sort_by = request.GET.get('sort_by', 'Symbol')
-                sort_dir = request.GET.get('sort_dir', 'asc')
-                
-                # Create DataFrame for efficient sorting
-                df = pd.DataFrame(filtered_data)
-                
-                if not df.empty:
-                    # Find the correct column to sort by
-                    valid_sort_key = sort_by
-                    if sort_by not in df.columns:
-                        for col in df.columns:
-                            if col.lower() == sort_by.lower():
-                                valid_sort_key = col
-                                break
-                        else:
-                            valid_sort_key = 'Symbol' if 'Symbol' in df.columns else df.columns[0]
-                    
-                    # Determine sort direction
-                    ascending = sort_dir.lower() != 'desc'
-                    
-                    # For numeric columns, ensure proper typing
-                    if valid_sort_key in ['Last', 'LDCP', 'Change', 'PctChange', 'Open', 'High', 'Low', 'Volume', 'PE', 'MarketCap']:
-                        df[valid_sort_key] = pd.to_numeric(df[valid_sort_key], errors='coerce')
-                    
-                    # Apply sorting
-                    df = df.sort_values(by=valid_sort_key, ascending=ascending, na_position='last')
-                    
-                    # Convert back to list
-                    filtered_data = df.replace({np.nan: None}).to_dict('records')
-                
-                # Paginate results
-                total_count = len(filtered_data)
-                
-                # Ensure page is valid
-                total_pages = max(1, (total_count + per_page - 1) // per_page)
-                if page > total_pages and total_pages > 0:
-                    page = 1
-                
-                # Calculate slice indices
-                start = (page - 1) * per_page
-                end = min(start + per_page, total_count)
-                
-                # Create paginated data
-                paginated_data = filtered_data[start:end] if start < total_count else []
-                
-                return JsonResponse({
-                    'status': 'success',
-                    'data': paginated_data,
-                    'meta': {
-                        'total': total_count,
-                        'page': page,
-                        'per_page': per_page,
-                        'total_pages': total_pages,
-                        'has_next': page < total_pages,
-                        'has_previous': page > 1
-                    }
-                })
+                # Filter, sort and paginate without materializing the full sorted list
+                stock_page = get_page(
+                    api_data,
+                    compile_filters(filters_from_query(request.GET)),
+                    sort_by=request.GET.get('sort_by', 'Symbol'),
+                    descending=request.GET.get('sort_dir', 'asc').lower() == 'desc',
+                    page=int(request.GET.get('page', 1)),
+                    per_page=int(request.GET.get('per_page', 20)),
+                )
+                return stock_page_response(stock_page)
 
         # Fall back to database data if API fails
-        from django.conf import settings
-        from django.db.models import Q
-        
-        # Query database
-        stocks = Stock.objects.all()
-        
-        # Get query parameters
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        sort_by = request.GET.get('sort_by', 'symbol')
-        sort_dir = request.GET.get('sort_dir', 'asc')
-        
-        # Apply basic filters with ORM
-        if request.GET.get('symbol'):
-            stocks = stocks.filter(symbol__icontains=request.GET.get('symbol'))
-        
-        if request.GET.get('sector') and request.GET.get('sector').lower() != 'any':
-            stocks = stocks.filter(sector__iexact=request.GET.get('sector'))
-        
-        if request.GET.get('industry') and request.GET.get('industry').lower() != 'any':
-            stocks = stocks.filter(industry__iexact=request.GET.get('industry'))
-        
-        # Convert queryset to list of dictionaries for advanced filtering
-        stock_list = []
-        for stock in stocks:
-            stock_dict = {
-                'Symbol': stock.symbol,
-                'CompanyName': stock.company_name,
-                'Sector': stock.sector,
-                'Industry': stock.industry,
-                'Last': float(stock.last_price) if stock.last_price else None,
-                'LDCP': float(stock.previous_close) if stock.previous_close else None,
-                'Change': float(stock.price_change) if stock.price_change else None,
-                'PctChange': float(stock.percent_change) if stock.percent_change else None,
-                'Open': float(stock.open_price) if stock.open_price else None,
-                'High': float(stock.high_price) if stock.high_price else None,
-                'Low': float(stock.low_price) if stock.low_price else None,
-                'Volume': int(stock.volume) if stock.volume else None,
-                'MarketCap': float(stock.market_cap) if stock.market_cap else None,
-                'PE': float(stock.pe) if stock.pe else None
-            }
-            stock_list.append(stock_dict)
-        
-        # Collect all filter parameters
-        filters = {
-            # Fundamentals tab filters
-            'exchange': request.GET.get('exchange'),
-            'index': request.GET.get('index'),
-            'sector': request.GET.get('sector'),
-            'industry': request.GET.get('industry'),
-            'country': request.GET.get('country'),
-            'market_cap': request.GET.get('market_cap'),
-            'div_yield': request.GET.get('div_yield'),
-            'avg_volume': request.GET.get('avg_volume'),
-            'rel_volume': request.GET.get('rel_volume'),
-            'current_volume': request.GET.get('current_volume'),
-            'price': request.GET.get('price'),
-            'target_price': request.GET.get('target_price'),
-            'ipo_date': request.GET.get('ipo_date'),
-            'shares_outstanding': request.GET.get('shares_outstanding'),
-            'float': request.GET.get('float'),
-            'analyst_recom': request.GET.get('analyst_recom'),
-            'option_short': request.GET.get('option_short'),
-            'earnings_date': request.GET.get('earnings_date'),
-            'trades': request.GET.get('trades'),
-            
-            # Technical tab filters
-            'pe_ratio': request.GET.get('pe_ratio'),
-            'forward_pe': request.GET.get('forward_pe'),
-            'peg': request.GET.get('peg'),
-            'ps': request.GET.get('ps'),
-            'pb': request.GET.get('pb'),
-            
-            # Performance tab filters
-            'performance': request.GET.get('performance'),
-            'performance_2': request.GET.get('performance_2'),
-            'volatility': request.GET.get('volatility'),
-            'rsi': request.GET.get('rsi'),
-            'gap': request.GET.get('gap'),
-            'sma_20': request.GET.get('sma_20'),
-            'sma_50': request.GET.get('sma_50'),
-            'sma_200': request.GET.get('sma_200'),
-            'change': request.GET.get('change'),
-            'change_open': request.GET.get('change_open'),
-            
-            # Legacy filters
-            'price_min': request.GET.get('price_min'),
-            'price_max': request.GET.get('price_max'),
-            'volume_min': request.GET.get('volume_min'),
-            'volume_max': request.GET.get('volume_max'),
-            'change_min': request.GET.get('change_min'),
-            'change_max': request.GET.get('change_max'),
-            'pe_min': request.GET.get('pe_min'),
-            'pe_max': request.GET.get('pe_max'),
-            'symbol': request.GET.get('symbol'),
-            'signal': request.GET.get('signal')
-        }
-        
-        # Remove None values and empty strings
-        filters = {k: v for k, v in filters.items() if v is not None and v != '' and (not isinstance(v, str) or v.lower() != 'any')}
-        
-        # Apply all filters using enhanced filter_stocks function
-        filtered_data = filter_stocks(stock_list, filters)
-        
-        # Sort using pandas
-        df = pd.DataFrame(filtered_data)
-        if not df.empty:
-            # Find the correct column name to sort by
-            valid_sort_key = sort_by
-            if sort_by not in df.columns:
-                for col in df.columns:
-                    if col.lower() == sort_by.lower():
-                        valid_sort_key = col
-                        break
-                else:
-                    valid_sort_key = 'Symbol' if 'Symbol' in df.columns else df.columns[0]
-            
-            # Determine sort direction
-            ascending = sort_dir.lower() != 'desc'
-            
-            # For numeric columns, ensure proper typing
-            if valid_sort_key in ['Last', 'LDCP', 'Change', 'PctChange', 'Open', 'High', 'Low', 'Volume', 'PE', 'MarketCap']:
-                df[valid_sort_key] = pd.to_numeric(df[valid_sort_key], errors='coerce')
-            
-            # Apply sorting
-            df = df.sort_values(by=valid_sort_key, ascending=ascending, na_position='last')
-            
-            # Convert back to list
-            filtered_data = df.replace({np.nan: None}).to_dict('records')
-        
-        # Paginate the results
-        total_count = len(filtered_data)
-        total_pages = max(1, (total_count + per_page - 1) // per_page)
-        
-        # Ensure page is valid
-        if page > total_pages and total_pages > 0:
-            page = 1
-        
-        # Calculate slice indices
-        start = (page - 1) * per_page
-        end = min(start + per_page, total_count)
-        
-        # Slice the data
-        paginated_data = filtered_data[start:end] if start < total_count else []
-        
-        return JsonResponse({
-            'status': 'success',
-            'data': paginated_data,
-            'meta': {
-                'total': total_count,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_previous': page > 1
-            }
-        })
+        filters = filters_from_query(request.GET)
+        stocks = compile_filters(filters).filter_queryset(Stock.objects.all())
+        
+        stock_page = get_page(
+            queryset_to_records(stocks),
+            sort_by=request.GET.get('sort_by', 'symbol'),
+            descending=request.GET.get('sort_dir', 'asc').lower() == 'desc',
+            page=int(request.GET.get('page', 1)),
+            per_page=int(request.GET.get('per_page', 20)),
+        )
+        return stock_page_response(stock_page)
         
     except Exception as e:
         logger.error(f"Error in get_stock_prices: {str(e)}")
@@ -438,89 +212,148 @@ def get_stock_prices(request):
             'error': str(e)
         }, status=500)
 
-def get_indices_live(request):
-    """API endpoint to get live indices data"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
+def conditional_json_response(request, data, etag, max_age, last_modified=None):
+    """
+    JSON response that honors If-None-Match/If-Modified-Since and can be cached for `max_age` seconds.
     
-    url = "https://api.mg-link.net/api/Data1/GetPSXIndicesLive"
-    data = get_data(url, token)
-    
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve indices data"}, status=500)
+    Returns 304 Not Modified, without serializing the data, if the client's copy is current.
+    """
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(orjson.dumps(data), content_type='application/json')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, max_age=max_age)
+    return response
+
+UPSTREAM_CACHE_KEY_PREFIX = "smartscreener:upstream"
+
+def cached_upstream_response(request, url, max_age):
+    """
+    Conditional JSON response of MGLink data, or None if the data could not be retrieved.
+
+    The serialized data and its ETag are cached by URL for `max_age` seconds, so clients
+    polling within that time are answered (with 304 Not Modified if their copy is current)
+    without calling MGLink, or serializing and hashing the data again.
+    """
+    cache_key = f"{UPSTREAM_CACHE_KEY_PREFIX}:{hashlib.blake2b(url.encode(), digest_size=16).hexdigest()}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        token = get_token()
+        if not token:
+            return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
+        data = get_data(url, token)
+        if not data:
+            return None
+        content = orjson.dumps(data)
+        cached = {
+            "content": content,
+            "etag": hashlib.blake2b(content, digest_size=16).hexdigest(),
+            "fetched_at": time.time(),
+        }
+        cache.set(cache_key, cached, timeout=max_age)
+
+    etag = quote_etag(cached["etag"])
+    last_modified = int(cached["fetched_at"])
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(cached["content"], content_type='application/json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(
+        response, max_age=max(0, int(max_age - (time.time() - cached["fetched_at"])))
+    )
+    return response
+
+def snapshot_response(request, name):
+    """Conditional JSON response of the latest snapshot of a feed, or None if there is none"""
+    snapshot = get_snapshot(name)
+    if snapshot is None or not snapshot.data:
+        return None
+    return conditional_json_response(
+        request,
+        snapshot.data,
+        etag=snapshot.etag or get_data_etag(snapshot.data),
+        max_age=get_snapshot_max_age(snapshot),
+        last_modified=int(snapshot.fetched_at),
+    )
+
+def get_indices_live(request):
+    """API endpoint to get live indices data, served from the latest snapshot"""
+    response = snapshot_response(request, "indices_live")
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Indices data is not available yet"}, status=503)
 
 def get_psx_announcements(request):
     """API endpoint to get PSX announcements"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
+    response = snapshot_response(request, "announcements")
+    if response is not None:
+        return response
     
     url = "https://api.mg-link.net/api/Data1/GetPSXAnnouncements"
-    data = get_data(url, token)
-    
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve announcements"}, status=500)
+    response = cached_upstream_response(request, url, get_feed_interval("announcements"))
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Failed to retrieve announcements"}, status=500)
 
 def get_news(request):
     """API endpoint to get news"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
+    response = snapshot_response(request, "news")
+    if response is not None:
+        return response
     
     url = "https://api.mg-link.net/api/Data1/GetMGNews_New"
-    data = get_data(url, token)
-    
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve news"}, status=500)
+    response = cached_upstream_response(request, url, get_feed_interval("news"))
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Failed to retrieve news"}, status=500)
 
 def get_commodities(request):
     """API endpoint to get commodities data"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
-    
     symbols = request.GET.get('symbols', 'Q1T')
     date = request.GET.get('date', '')
     
+    if symbols == 'Q1T' and not date:
+        # Default commodities are served from the latest snapshot
+        response = snapshot_response(request, "commodities")
+        if response is not None:
+            return response
+        return JsonResponse({"error": "Commodities data is not available yet"}, status=503)
+    
     url = f"https://api.mg-link.net/api/Data1/Commodities?symbols={symbols}"
     if date:
         url += f"&date={date}"
     
-    data = get_data(url, token)
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve commodities data"}, status=500)
+    response = cached_upstream_response(request, url, get_feed_interval("commodities"))
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Failed to retrieve commodities data"}, status=500)
 
 def get_currencies_live(request):
     """API endpoint to get live currencies data"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
-    
     symbols = request.GET.get('symbols', 'USDPKR,GBPUSD,EURUSD')
     
-    url = f"https://api.mg-link.net/api/Data/GetCurrenciesLive?Symbols={symbols}"
-    data = get_data(url, token)
+    if symbols == 'USDPKR,GBPUSD,EURUSD':
+        # Default currencies are served from the latest snapshot
+        response = snapshot_response(request, "currencies")
+        if response is not None:
+            return response
+        return JsonResponse({"error": "Currencies data is not available yet"}, status=503)
     
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve currencies data"}, status=500)
+    url = f"https://api.mg-link.net/api/Data/GetCurrenciesLive?Symbols={symbols}"
+    response = cached_upstream_response(request, url, get_feed_interval("currencies"))
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Failed to retrieve currencies data"}, status=500)
+
+# Economic data series change rarely
+ECONOMIC_DATA_MAX_AGE = 60 * 60
 
 def get_economic_data(request):
     """API endpoint to get economic data"""
-    token = get_token()
-    if not token:
-        return JsonResponse({"error": "Failed to authenticate with the API"}, status=401)
-    
     data_id = request.GET.get('data_id', '1')
     start_date = request.GET.get('start_date', '')
     end_date = request.GET.get('end_date', '')
@@ -529,12 +362,10 @@ def get_economic_data(request):
     if start_date and end_date:
         url += f"&StartDate={start_date}&EndDate={end_date}"
     
-    data = get_data(url, token)
-    
-    if data:
-        return JsonResponse(data, safe=False)
-    else:
-        return JsonResponse({"error": "Failed to retrieve economic data"}, status=500)
+    response = cached_upstream_response(request, url, ECONOMIC_DATA_MAX_AGE)
+    if response is not None:
+        return response
+    return JsonResponse({"error": "Failed to retrieve economic data"}, status=500)
 
 @csrf_exempt
 def screener(request):
@@ -549,59 +380,9 @@ def screener(request):
         order_by = request.GET.get('orderBy', 'Symbol')
         order_direction = request.GET.get('orderDirection', 'asc')
         
-        # Create a comprehensive filter dictionary that handles all possible filter parameters
-        filters = {
-            # Fundamentals tab filters
-            'exchange': request.GET.get('exchange'),
-            'index': request.GET.get('index'),
-            'sector': request.GET.get('sector'),
-            'industry': request.GET.get('industry'),
-            'country': request.GET.get('country'),
-            'market_cap': request.GET.get('market_cap'),
-            'div_yield': request.GET.get('div_yield'),
-            'avg_volume': request.GET.get('avg_volume'),
-            'rel_volume': request.GET.get('rel_volume'),
-            'current_volume': request.GET.get('current_volume'),
-            'price': request.GET.get('price'),
-            'target_price': request.GET.get('target_price'),
-            'ipo_date': request.GET.get('ipo_date'),
-            'shares_outstanding': request.GET.get('shares_outstanding'),
-            'float': request.GET.get('float'),
-            'analyst_recom': request.GET.get('analyst_recom'),
-            'option_short': request.GET.get('option_short'),
-            'earnings_date': request.GET.get('earnings_date'),
-            'trades': request.GET.get('trades'),
-            
-            # Technical tab filters
-            'pe_ratio': request.GET.get('pe_ratio'),
-            'forward_pe': request.GET.get('forward_pe'),
-            'peg': request.GET.get('peg'),
-            'ps': request.GET.get('ps'),
-            'pb': request.GET.get('pb'),
-            
-            # Performance tab filters
-            'performance': request.GET.get('performance'),
-            'performance_2': request.GET.get('performance_2'),
-            'volatility': request.GET.get('volatility'),
-            'rsi': request.GET.get('rsi'),
-            'gap': request.GET.get('gap'),
-            'sma_20': request.GET.get('sma_20'),
-            'sma_50': request.GET.get('sma_50'),
-            'sma_200': request.GET.get('sma_200'),
-            'change': request.GET.get('change'),
-            'change_open': request.GET.get('change_open'),
-            
-            # Legacy/compatibility filters
-            'marketCap': request.GET.get('marketCap'),
-            'pe': request.GET.get('pe'),
-            'dividendYield': request.GET.get('dividendYield'),
-            'volume': request.GET.get('volume'),
-            'targetPrice': request.GET.get('targetPrice'),
-            'signal': request.GET.get('signal')
-        }
-        
-        # Remove None values and empty strings
-        filters = {k: v for k, v in filters.items() if v is not None and v != '' and (isinstance(v, str) and v.lower() != 'any' or not isinstance(v, str))}
+        filters = filters_from_query(
+            request.GET, exclude=('page', 'per_page', 'orderBy', 'orderDirection')
+        )
         
         # Try to get live API data
         token = get_token()
@@ -615,7 +396,7 @@ def screener(request):
                     if 'MarketCap' not in stock:
                         stock['MarketCap'] = calculate_market_cap(stock)
                 
-                # Apply all filters using our enhanced filter_stocks function
+                # Apply all filters
                 filtered_stocks = filter_stocks(api_data, filters)
                 
                 # Create a DataFrame for advanced sorting
@@ -671,41 +452,11 @@ def screener(request):
                 })
         
         # Fall back to database data if API fails
-        from django.conf import settings
-        from django.db.models import Q
-        
         stocks = Stock.objects.all()
             
-        # Apply basic filters with ORM
-        if 'sector' in filters and filters['sector'] != 'Any':
-            stocks = stocks.filter(sector__iexact=filters['sector'])
-        
-        if 'industry' in filters and filters['industry'] != 'Any':
-            stocks = stocks.filter(industry__iexact=filters['industry'])
-            
-        # Convert queryset to list of dictionaries
-        stock_list = []
-        for stock in stocks:
-            stock_dict = {
-                'Symbol': stock.symbol,
-                'CompanyName': stock.company_name,
-                'Sector': stock.sector,
-                'Industry': stock.industry,
-                'Last': float(stock.last_price) if stock.last_price else None,
-                'LDCP': float(stock.previous_close) if stock.previous_close else None,
-                'Change': float(stock.price_change) if stock.price_change else None,
-                'PctChange': float(stock.percent_change) if stock.percent_change else None,
-                'Open': float(stock.open_price) if stock.open_price else None,
-                'High': float(stock.high_price) if stock.high_price else None,
-                'Low': float(stock.low_price) if stock.low_price else None,
-                'Volume': int(stock.volume) if stock.volume else None,
-                'MarketCap': float(stock.market_cap) if stock.market_cap else None,
-                'PE': float(stock.pe) if stock.pe else None,
-            }
-            stock_list.append(stock_dict)
-        
-        # Apply all filters using pandas helper
-        filtered_stocks = filter_stocks(stock_list, filters)
+        # Apply the filters in the database
+        stocks = compile_filters(filters).filter_queryset(stocks)
+        filtered_stocks = queryset_to_records(stocks)
         
         # Apply sorting with pandas
         df = pd.DataFrame(filtered_stocks)
@@ -788,14 +539,8 @@ def get_stock_daily_history(request):
         url = f"{base_url}&StartDate={start_date}&EndDate={end_date}"
     
     # Make the API request
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = mg_link_client.get(url)
         
         if response.status_code == 200:
             try:
@@ -809,7 +554,7 @@ def get_stock_daily_history(request):
             logger.error(f"API returned status code {response.status_code}")
             return JsonResponse({"error": f"API returned status code {response.status_code}"}, status=response.status_code)
             
-    except requests.exceptions.RequestException as e:
+    except RequestError as e:
         logger.error(f"Failed to retrieve stock history for {symbol}: {str(e)}")
         return JsonResponse({"error": "Failed to connect to API"}, status=500)
 
@@ -831,14 +576,8 @@ def get_technical_indicators(request):
     url = f"https://api.mg-link.net/api/Data1/TechnicalIndicators?Symbol={symbol}&Period={period}"
     
     # Make the API request
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = mg_link_client.get(url)
         
         if response.status_code == 200:
             try:
@@ -852,7 +591,7 @@ def get_technical_indicators(request):
             logger.error(f"API returned status code {response.status_code}")
             return JsonResponse({"error": f"API returned status code {response.status_code}"}, status=response.status_code)
             
-    except requests.exceptions.RequestException as e:
+    except RequestError as e:
         logger.error(f"Failed to retrieve technical indicators for {symbol}: {str(e)}")
         return JsonResponse({"error": "Failed to connect to API"}, status=500)
 
@@ -895,57 +634,10 @@ def get_stocks(request):
                         if 'LDCP' in stock and stock['LDCP'] and float(stock['LDCP']) != 0:
                             stock['PctChange'] = (float(stock['Change']) / float(stock['LDCP'])) * 100
                 
-                # Create comprehensive filters dictionary from all query parameters
-                # This now supports all filter types defined in the frontend
-                filters = {}
-                
-                # Loop through all request parameters and add them to the filters dictionary
-                # Skip pagination, sorting and other non-filter parameters
-                excluded_params = ['page', 'per_page', 'sort_by', 'sort_dir', 'csrfmiddlewaretoken']
-                for key, value in request.GET.items():
-                    if key not in excluded_params and value and value.lower() != 'any':
-                        filters[key] = value
-                        logger.debug(f"Added filter: {key}={value}")
-                
-                # Explicitly check for important filter parameters
-                # Fundamentals tab filters
-                if request.GET.get('exchange') and request.GET.get('exchange').lower() != 'any':
-                    filters['exchange'] = request.GET.get('exchange')
-                
-                if request.GET.get('sector') and request.GET.get('sector').lower() != 'any':
-                    filters['sector'] = request.GET.get('sector')
-                
-                if request.GET.get('industry') and request.GET.get('industry').lower() != 'any':
-                    filters['industry'] = request.GET.get('industry')
-                
-                if request.GET.get('market_cap') and request.GET.get('market_cap').lower() != 'any':
-                    filters['market_cap'] = request.GET.get('market_cap')
-                
-                # Technical tab filters
-                if request.GET.get('pe_ratio') and request.GET.get('pe_ratio').lower() != 'any':
-                    filters['pe_ratio'] = request.GET.get('pe_ratio')
-                
-                # Performance tab filters
-                if request.GET.get('rsi') and request.GET.get('rsi').lower() != 'any':
-                    filters['rsi'] = request.GET.get('rsi')
-                
-                if request.GET.get('performance') and request.GET.get('performance').lower() != 'any':
-                    filters['performance'] = request.GET.get('performance')
-                
-                # Symbol search (supports both symbol and tickers parameter names)
-                if request.GET.get('symbol'):
-                    filters['symbol'] = request.GET.get('symbol')
-                elif request.GET.get('tickers'):
-                    filters['symbol'] = request.GET.get('tickers')
-                
-                # Signal filter
-                if request.GET.get('signal') and request.GET.get('signal') != 'none':
-                    filters['signal'] = request.GET.get('signal')
-                
-                # Log filters being applied
+                filters = filters_from_query(request.GET)
                 logger.debug(f"Applying filters: {filters}")
                 
-                # Apply filters using the improved pandas-based filter_stocks function
+                # Apply all filters
                 filtered_data = filter_stocks(api_data, filters)
                 
                 # Create DataFrame for efficient sorting
@@ -1009,102 +701,12 @@ def get_stocks(request):
                 })
         
         # Fall back to database data if API fails
-        from django.db.models import Q
         stocks = Stock.objects.all()
         
-        # Apply basic filters that can be handled by ORM
-        if request.GET.get('symbol'):
-            stocks = stocks.filter(symbol__icontains=request.GET.get('symbol'))
-        
-        if request.GET.get('sector') and request.GET.get('sector').lower() != 'any':
-            stocks = stocks.filter(sector__iexact=request.GET.get('sector'))
-        
-        if request.GET.get('industry') and request.GET.get('industry').lower() != 'any':
-            stocks = stocks.filter(industry__iexact=request.GET.get('industry'))
-        
-        # For more complex filters, we'll convert to dictionaries and use pandas
-        stock_list = []
-        for stock in stocks:
-            stock_dict = {
-                'Symbol': stock.symbol,
-                'CompanyName': stock.company_name,
-                'Sector': stock.sector,
-                'Industry': stock.industry,
-                'Last': float(stock.last_price) if stock.last_price else None,
-                'LDCP': float(stock.previous_close) if stock.previous_close else None,
-                'Change': float(stock.price_change) if stock.price_change else None,
-                'PctChange': float(stock.percent_change) if stock.percent_change else None,
-                'Open': float(stock.open_price) if stock.open_price else None,
-                'High': float(stock.high_price) if stock.high_price else None,
-                'Low': float(stock.low_price) if stock.low_price else None,
-                'Volume': int(stock.volume) if stock.volume else None,
-                'MarketCap': float(stock.market_cap) if stock.market_cap else None,
-                'PE': float(stock.pe) if stock.pe else None
-            }
-            stock_list.append(stock_dict)
-        
-        # Collect all filter parameters
-        filters = {
-            # Fundamentals tab filters
-            'exchange': request.GET.get('exchange'),
-            'index': request.GET.get('index'),
-            'sector': request.GET.get('sector'),
-            'industry': request.GET.get('industry'),
-            'country': request.GET.get('country'),
-            'market_cap': request.GET.get('market_cap'),
-            'div_yield': request.GET.get('div_yield'),
-            'avg_volume': request.GET.get('avg_volume'),
-            'rel_volume': request.GET.get('rel_volume'),
-            'current_volume': request.GET.get('current_volume'),
-            'price': request.GET.get('price'),
-            'target_price': request.GET.get('target_price'),
-            'ipo_date': request.GET.get('ipo_date'),
-            'shares_outstanding': request.GET.get('shares_outstanding'),
-            'float': request.GET.get('float'),
-            'analyst_recom': request.GET.get('analyst_recom'),
-            'option_short': request.GET.get('option_short'),
-            'earnings_date': request.GET.get('earnings_date'),
-            'trades': request.GET.get('trades'),
-            
-            # Technical tab filters
-            'pe_ratio': request.GET.get('pe_ratio'),
-            'forward_pe': request.GET.get('forward_pe'),
-            'peg': request.GET.get('peg'),
-            'ps': request.GET.get('ps'),
-            'pb': request.GET.get('pb'),
-            
-            # Performance tab filters
-            'performance': request.GET.get('performance'),
-            'performance_2': request.GET.get('performance_2'),
-            'volatility': request.GET.get('volatility'),
-            'rsi': request.GET.get('rsi'),
-            'gap': request.GET.get('gap'),
-            'sma_20': request.GET.get('sma_20'),
-            'sma_50': request.GET.get('sma_50'),
-            'sma_200': request.GET.get('sma_200'),
-            'change': request.GET.get('change'),
-            'change_open': request.GET.get('change_open'),
-            
-            # Legacy filters
-            'price_min': request.GET.get('price_min'),
-            'price_max': request.GET.get('price_max'),
-            'volume_min': request.GET.get('volume_min'),
-            'volume_max': request.GET.get('volume_max'),
-            'change_min': request.GET.get('change_min'),
-            'change_max': request.GET.get('change_max'),
-            'pe_min': request.GET.get('pe_min'),
-            'pe_max': request.GET.get('pe_max'),
-            'market_cap_min': request.GET.get('market_cap_min'),
-            'market_cap_max': request.GET.get('market_cap_max'),
-            'symbol': request.GET.get('symbol'),
-            'signal': request.GET.get('signal')
-        }
-        
-        # Remove None values and empty strings
-        filters = {k: v for k, v in filters.items() if v is not None and v != '' and (not isinstance(v, str) or v.lower() != 'any')}
-        
-        # Apply all filters using the helper function with pandas
-        filtered_data = filter_stocks(stock_list, filters)
+        # Apply the filters in the database
+        filters = filters_from_query(request.GET)
+        stocks = compile_filters(filters).filter_queryset(stocks)
+        filtered_data = queryset_to_records(stocks)
             
         # Sort using pandas
         df = pd.DataFrame(filtered_data)
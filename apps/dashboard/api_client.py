@@ -1,12 +1,35 @@
-import requests
 import logging
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.utils import timezone
-import time
+import threading
+
+from helpers.caching import SyncTTLCache
+from helpers.exceptions.requests import RequestError
+from apps.live_rates.tokens import mg_link_token_manager
+from apps.live_rates.clients import mg_link_client
+from apps.live_rates.retries import mg_link_retry_policy
+from apps.live_rates.snapshots import get_snapshot_data
 
 logger = logging.getLogger(__name__)
 
+
+def sort_announcements(announcements):
+    """Sort announcements by date (newest first), if they have a DateTime field"""
+    try:
+        sorted_data = sorted(announcements, 
+                            key=lambda x: datetime.strptime(x.get('DateTime', '2000-01-01'), '%Y-%m-%dT%H:%M:%S') 
+                            if x.get('DateTime') else datetime.now(), 
+                            reverse=True)
+        
+        # Add debugging information
+        if sorted_data and len(sorted_data) > 0:
+            logger.info(f"First announcement: {sorted_data[0].get('Title', 'No title')} - {sorted_data[0].get('Category', 'No category')}")
+            
+        return sorted_data
+    except Exception as e:
+        logger.error(f"Error sorting announcements: {str(e)}")
+        return list(announcements)
+
 class MarketDataAPIClient:
     """Client for Market Data Web Services API"""
     
@@ -22,53 +45,48 @@ class MarketDataAPIClient:
         "currencies": "https://api.mg-link.net/api/Data/GetCurrenciesLive",
         "economic_data": "https://api.mg-link.net/api/Data1/EconomicData"
     }
+    # How long (in seconds) successful responses are shared between callers
+    RESPONSE_MEMO_TTL = 15
     
     def __init__(self):
-        """Initialize the API client with credentials"""
-        self.username = "EKCapital2024"  # Updated credential
-        self.password = "3KC@Pit@L!2024"  # Updated credential
-        self.token = None
-        self.token_expiry = None
+        """Initialize the API client with the shared token manager"""
+        self.token_manager = mg_link_token_manager
+        self.retry_policy = mg_link_retry_policy
+        # Short-lived memo of successful responses, keyed by request URL. Responses
+        # are shared between callers, so they must be treated as read-only.
+        self._response_memo = SyncTTLCache(maxsize=64, ttl=self.RESPONSE_MEMO_TTL)
+        self._request_locks = {}
+        self._request_locks_lock = threading.Lock()
+    
+    def _get_request_lock(self, key):
+        """Returns the lock used to coalesce concurrent requests for the given key"""
+        with self._request_locks_lock:
+            lock = self._request_locks.get(key)
+            if lock is None:
+                lock = self._request_locks[key] = threading.Lock()
+            return lock
+    
+    def clear_response_memo(self):
+        """Discard all memoized responses"""
+        self._response_memo.clear()
     
     def _get_auth_token(self):
-        """Get authentication token from the API"""
-        try:
-            headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-            body = {
-                'grant_type': 'password',
-                'username': self.username,
-                'password': self.password
-            }
-            
-            response = requests.post(self.AUTH_URL, data=body, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.token = data.get('access_token')
-                expires_in = data.get('expires_in', 3600)  # Default to 1 hour
-                self.token_expiry = timezone.now() + timedelta(seconds=int(expires_in))
-                logger.info("Successfully obtained API token")
-                return self.token
-            else:
-                logger.error(f"Token request failed: {response.status_code} - {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Error getting API token: {str(e)}")
-            return None
+        """Get a fresh authentication token, discarding the current one"""
+        return self.token_manager.refresh()
     
     def _ensure_token(self):
         """Ensure we have a valid token"""
-        if self.token is None or self.token_expiry is None or timezone.now() >= self.token_expiry:
-            return self._get_auth_token()
-        return self.token
+        return self.token_manager.get_token()
     
     def _make_api_request(self, endpoint, params=None):
-        """Make a request to the API with the given endpoint and parameters"""
-        token = self._ensure_token()
-        if not token:
-            logger.error("Failed to get authentication token")
-            return None
+        """
+        Make a request to the API with the given endpoint and parameters.
         
+        Failed requests are retried with backoff within a deadline, and slow ones
+        are hedged (see `mg_link_retry_policy`). Identical requests made within
+        `RESPONSE_MEMO_TTL` seconds share one upstream call. Concurrent identical
+        requests wait for the in-flight call instead of making their own.
+        """
         url = self.API_ENDPOINTS.get(endpoint)
         if not url:
             logger.error(f"Unknown API endpoint: {endpoint}")
@@ -81,22 +99,59 @@ class MarketDataAPIClient:
             else:
                 url += '?' + '&'.join([f"{k}={v}" for k, v in params.items()])
         
-        try:
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Authorization': f'Bearer {token}'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"API request failed: {response.status_code} - {response.text}")
-                return None
-        except Exception as e:
-            logger.error(f"Error making API request: {str(e)}")
-            return None
+        data = self._response_memo.get(url)
+        if data is not None:
+            return data
+        
+        with self._get_request_lock(url):
+            # The response may have been fetched while waiting for the lock
+            data = self._response_memo.get(url)
+            if data is None:
+                try:
+                    data = self.retry_policy.call(
+                        lambda: self._fetch(url),
+                        latency_stats=mg_link_client.get_stats(mg_link_client.get_endpoint(url)),
+                    )
+                except Exception as e:
+                    logger.error(f"Error making API request: {str(e)}")
+                    data = None
+                if data is not None:
+                    self._response_memo[url] = data
+        return data
+    
+    def _fetch(self, url):
+        """
+        Make a request to the given API URL, returning the decoded response.
+        
+        Returns None if the request is rejected, and raises `RequestError`
+        (which is retried) if it fails due to a server or connection error.
+        """
+        # Pooled client authenticates with the shared token, retrying once if it is rejected
+        response = mg_link_client.get(url)
+        
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code >= 500:
+            raise RequestError(f"API request failed: {response.status_code}")
+        logger.error(f"API request failed: {response.status_code} - {response.text}")
+        return None
+    
+    def _get_live_data(self, endpoint, params=None):
+        """
+        Get a live list feed from the API.
+        
+        Falls back to the last good snapshot of the feed if the request fails.
+        """
+        data = self._make_api_request(endpoint, params)
+        if isinstance(data, list) and data:
+            logger.info(f"Successfully fetched {len(data)} {endpoint} records")
+            return data
+        
+        if data is not None and not isinstance(data, list):
+            logger.warning(f"API returned non-list data for {endpoint}: {type(data)}")
+        logger.error(f"Failed to fetch {endpoint} data, returning the last snapshot")
+        snapshot_data = get_snapshot_data(endpoint, refresh=False)
+        return snapshot_data if isinstance(snapshot_data, list) else []
     
     def get_news(self, limit=5):
         """Get latest news"""
@@ -107,255 +162,24 @@ class MarketDataAPIClient:
     
     def get_announcements(self, limit=25):
         """Get latest PSX announcements"""
-        logger = logging.getLogger(__name__)
         logger.info("Fetching PSX announcements")
-        
-        # Try up to 3 times to get announcements
-        retry_count = 0
-        max_retries = 3
-        
-        while retry_count < max_retries:
-            data = self._make_api_request('announcements')
-            
-            if data:
-                if isinstance(data, list):
-                    logger.info(f"Successfully fetched {len(data)} announcements")
-                    # Sort announcements by date if DateTime field exists
-                    try:
-                        sorted_data = sorted(data, 
-                                            key=lambda x: datetime.strptime(x.get('DateTime', '2000-01-01'), '%Y-%m-%dT%H:%M:%S') 
-                                            if x.get('DateTime') else datetime.now(), 
-                                            reverse=True)
-                        
-                        # Add debugging information
-                        if sorted_data and len(sorted_data) > 0:
-                            logger.info(f"First announcement: {sorted_data[0].get('Title', 'No title')} - {sorted_data[0].get('Category', 'No category')}")
-                            
-                        return sorted_data[:limit] if len(sorted_data) > limit else sorted_data
-                    except Exception as e:
-                        logger.error(f"Error sorting announcements: {str(e)}")
-                        return data[:limit] if len(data) > limit else data
-                else:
-                    logger.warning(f"API returned non-list data for announcements: {type(data)}")
-                    # Exit the retry loop if we got a response but it's not a list
-                    break
-            
-            # If we get here, retry the request
-            retry_count += 1
-            logger.warning(f"Retrying announcements fetch, attempt {retry_count}/{max_retries}")
-            time.sleep(1)  # Wait a second before retrying
-        
-        # If we exhausted retries or didn't get valid data, return mock data
-        logger.error("Failed to fetch announcements data, returning mock data")
-        return self._get_mock_announcements()
-        
-    def _get_mock_announcements(self):
-        """Return mock announcements when the API fails"""
-        today = datetime.now()
-        yesterday = today - timedelta(days=1)
-        
-        return [
-            {
-                "ID": "1001",
-                "Symbol": "PSX",
-                "Title": "Market Timing for Ramadan",
-                "Category": "Notice",
-                "DateTime": today.strftime("%Y-%m-%dT%H:%M:%S"),
-                "PDFFile": "#",
-            },
-            {
-                "ID": "1002",
-                "Symbol": "ENGRO",
-                "Title": "Annual General Meeting",
-                "Category": "Notice",
-                "DateTime": yesterday.strftime("%Y-%m-%dT%H:%M:%S"),
-                "PDFFile": "#",
-            },
-            {
-                "ID": "1003",
-                "Symbol": "PSO",
-                "Title": "Announcement of Quarterly Results",
-                "Category": "Notice",
-                "DateTime": yesterday.strftime("%Y-%m-%dT%H:%M:%S"),
-                "PDFFile": "#",
-            },
-            {
-                "ID": "1004",
-                "Symbol": "OGDC",
-                "Title": "Dividend Announcement",
-                "Category": "Notice",
-                "DateTime": yesterday.strftime("%Y-%m-%dT%H:%M:%S"),
-                "PDFFile": "#",
-            },
-            {
-                "ID": "1005",
-                "Symbol": "LUCK",
-                "Title": "Credit Rating Update",
-                "Category": "PSX Notice",
-                "DateTime": yesterday.strftime("%Y-%m-%dT%H:%M:%S"),
-                "PDFFile": "#",
-            }
-        ]
+        sorted_data = sort_announcements(self._get_live_data('announcements'))
+        return sorted_data[:limit] if len(sorted_data) > limit else sorted_data
     
     def get_indices_live(self):
         """Get live PSX indices data"""
-        logger = logging.getLogger(__name__)
         logger.info("Fetching live PSX indices")
-        
-        # Try up to 3 times to get indices data
-        retry_count = 0
-        max_retries = 3
-        
-        while retry_count < max_retries:
-            data = self._make_api_request('indices_live') 
-            
-            if data:
-                logger.info(f"Successfully fetched indices data: {len(data) if isinstance(data, list) else 'Non-list data'}")
-                return data
-            
-            # If we get here, retry the request
-            retry_count += 1
-            logger.warning(f"Retrying indices fetch, attempt {retry_count}/{max_retries}")
-            time.sleep(1)  # Wait a second before retrying
-        
-        logger.error("Failed to fetch indices data, returning mock data")
-        return self._get_mock_indices()
-    
-    def _get_mock_indices(self):
-        """Return mock indices data when the API fails"""
-        return [
-            {
-                "IndexName": "KSE100",
-                "CurrentIndex": 93291.68,
-                "PreviousIndex": 92520.49,
-                "NetChange": 771.19,
-                "PNetChange": 0.83,
-                "Volume": 362829838
-            },
-            {
-                "IndexName": "KSE30",
-                "CurrentIndex": 32104.55,
-                "PreviousIndex": 31865.22,
-                "NetChange": 239.33,
-                "PNetChange": 0.75,
-                "Volume": 162345678
-            },
-            {
-                "IndexName": "KSE20",
-                "CurrentIndex": 29090.90,
-                "PreviousIndex": 28865.82,
-                "NetChange": 225.08,
-                "PNetChange": 0.78,
-                "Volume": 98765432
-            },
-            {
-                "IndexName": "KMI30",
-                "CurrentIndex": 18376.44,
-                "PreviousIndex": 18218.65,
-                "NetChange": 157.79,
-                "PNetChange": 0.87,
-                "Volume": 87654321
-            }
-        ]
+        return self._get_live_data('indices_live')
     
     def get_stock_prices_live(self):
         """Get live stock prices"""
-        logger = logging.getLogger(__name__)
         logger.info("Fetching live stock prices")
-        
-        # Try up to 3 times to get stock prices
-        retry_count = 0
-        max_retries = 3
-        
-        while retry_count < max_retries:
-            # For live data, we don't need to provide dates as per the API documentation
-            params = {
-                'StartDate': '',
-                'EndDate': ''
-            }
-            
-            data = self._make_api_request('stock_prices_live', params)
-            
-            if data:
-                if isinstance(data, list):
-                    logger.info(f"Successfully fetched {len(data)} stock prices")
-                    return data
-                else:
-                    logger.warning(f"API returned non-list data for stock prices: {type(data)}")
-                    break
-            
-            # If we get here, retry the request
-            retry_count += 1
-            logger.warning(f"Retrying stock prices fetch, attempt {retry_count}/{max_retries}")
-            time.sleep(1)  # Wait a second before retrying
-        
-        logger.error("Failed to fetch stock prices data, returning mock data")
-        return self._get_mock_stock_prices()
-    
-    def _get_mock_stock_prices(self):
-        """Return mock stock prices when the API fails"""
-        return [
-            {
-                "Symbol": "LUCK",
-                "Title": "Lucky Cement Limited",
-                "Sector": "Cement",
-                "CurrentRate": 725.80,
-                "PreviousRate": 715.25,
-                "Change": 10.55,
-                "PctChange": 1.47,
-                "Volume": 2750000,
-                "EPS": 47.5,
-                "ROE": 12.8
-            },
-            {
-                "Symbol": "ENGRO",
-                "Title": "Engro Corporation",
-                "Sector": "Fertilizer",
-                "CurrentRate": 290.30,
-                "PreviousRate": 285.50,
-                "Change": 4.80,
-                "PctChange": 1.68,
-                "Volume": 1850000,
-                "EPS": 28.7,
-                "ROE": 18.5
-            },
-            {
-                "Symbol": "PSO",
-                "Title": "Pakistan State Oil",
-                "Sector": "Oil & Gas",
-                "CurrentRate": 190.75,
-                "PreviousRate": 192.50,
-                "Change": -1.75,
-                "PctChange": -0.91,
-                "Volume": 1230000,
-                "EPS": 22.4,
-                "ROE": 15.2
-            },
-            {
-                "Symbol": "OGDC",
-                "Title": "Oil & Gas Development Company",
-                "Sector": "Oil & Gas",
-                "CurrentRate": 95.25,
-                "PreviousRate": 97.80,
-                "Change": -2.55,
-                "PctChange": -2.61,
-                "Volume": 1420000,
-                "EPS": 18.6,
-                "ROE": 14.7
-            },
-            {
-                "Symbol": "UBL",
-                "Title": "United Bank Limited",
-                "Sector": "Banking",
-                "CurrentRate": 146.30,
-                "PreviousRate": 144.75,
-                "Change": 1.55,
-                "PctChange": 1.07,
-                "Volume": 980000,
-                "EPS": 15.3,
-                "ROE": 11.2
-            }
-        ]
+        # For live data, we don't need to provide dates as per the API documentation
+        params = {
+            'StartDate': '',
+            'EndDate': ''
+        }
+        return self._get_live_data('stock_prices_live', params)
     
     def get_stock_prices_history(self, start_date=None, end_date=None):
         """Get historical stock prices"""
@@ -561,18 +385,20 @@ class MarketDataAPIClient:
             {"x": "Sialkot", "y": 24, "stocks": 6}
         ]
         
-    def get_stock_market_cap_data(self):
+    def get_stock_market_cap_data(self, stocks=None):
         """Get market cap data for individual stocks for the TreeMap
         
         Returns data with each stock as a separate cell, with its market cap
-        value determining the cell size.
+        value determining the cell size. Uses the given live stock prices if
+        provided, otherwise fetches them.
         """
         logger = logging.getLogger(__name__)
         logger.info("Fetching stock market cap data for TreeMap")
         
         try:
             # Get live stock data
-            stocks = self.get_stock_prices_live()
+            if stocks is None:
+                stocks = self.get_stock_prices_live()
             if not stocks or len(stocks) == 0:
                 logger.warning("No stock data available, using mock data for market cap distribution")
                 return self._get_mock_stock_market_cap()
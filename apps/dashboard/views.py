@@ -11,9 +11,11 @@ import logging
 import random
 from datetime import datetime
 
+from apps.live_rates.snapshots import get_snapshot_data
+
 # Import API client with fallback for tests
 try:
-    from .api_client import api_client
+    from .api_client import api_client, sort_announcements
 except ImportError:
     # Mock API client for testing
     class MockAPIClient:
@@ -23,7 +25,20 @@ except ImportError:
         def get_news(self, limit=5): return []
         def get_commodities(self, symbols=None): return []
         def get_currencies(self): return []
+        def get_stock_market_cap_data(self, stocks=None): return []
     api_client = MockAPIClient()
+    sort_announcements = list
+
+
+def get_feed(name):
+    """
+    Returns the data of the latest snapshot of a live MGLink feed.
+
+    Snapshots are published by the `refresh_snapshots` task, so views only wait
+    on MGLink if the task is not running. Returns an empty list if there is no snapshot.
+    """
+    data = get_snapshot_data(name)
+    return data if isinstance(data, list) else []
 
 
 class IndexView(generic.TemplateView):
@@ -37,27 +52,29 @@ class IndexView(generic.TemplateView):
         return self.render_to_response(context)
     
     def get_market_data(self) -> Dict[str, Any]:
-        """Get market data from the API"""
-        # Use API client to fetch data
+        """Get market data from the live feed snapshots"""
+        stocks = get_feed('stock_prices_live')
+        announcements = sort_announcements(get_feed('announcements'))
         market_data = {
-            'market_indices': api_client.get_indices_live(),
-            'top_gainers': self.get_top_stocks(filter_type='gainers', limit=5),
-            'top_losers': self.get_top_stocks(filter_type='losers', limit=5),
-            'top_industries': self.get_top_industries(filter_type='gainers', limit=5),
-            'worst_industries': self.get_top_industries(filter_type='losers', limit=5),
-            'announcements': api_client.get_announcements(limit=5),
-            'news': api_client.get_news(limit=5),
-            'board_meetings': self.filter_announcements_by_category('Board Meeting', limit=5),
-            'psx_notices': self.filter_announcements_by_category('Notice', limit=8),
-            'commodities': api_client.get_commodities(symbols='Q1T'),
-            'currencies': api_client.get_currencies()
+            'market_indices': get_feed('indices_live'),
+            'top_gainers': self.get_top_stocks(filter_type='gainers', limit=5, stocks=stocks),
+            'top_losers': self.get_top_stocks(filter_type='losers', limit=5, stocks=stocks),
+            'top_industries': self.get_top_industries(filter_type='gainers', limit=5, stocks=stocks),
+            'worst_industries': self.get_top_industries(filter_type='losers', limit=5, stocks=stocks),
+            'announcements': announcements[:5],
+            'news': get_feed('news')[:5],
+            'board_meetings': self.filter_announcements_by_category('Board Meeting', limit=5, announcements=announcements),
+            'psx_notices': self.filter_announcements_by_category('Notice', limit=8, announcements=announcements),
+            'commodities': get_feed('commodities'),
+            'currencies': get_feed('currencies')
         }
         
         return market_data
     
-    def get_top_stocks(self, filter_type='gainers', limit=5):
-        """Get top gainers or losers"""
-        stocks = api_client.get_stock_prices_live()
+    def get_top_stocks(self, filter_type='gainers', limit=5, stocks=None):
+        """Get top gainers or losers, from the given live stock prices if provided"""
+        if stocks is None:
+            stocks = get_feed('stock_prices_live')
         if not stocks:
             return []
         
@@ -72,9 +89,10 @@ class IndexView(generic.TemplateView):
         
         return sorted_stocks[:limit]
     
-    def get_top_industries(self, filter_type='gainers', limit=5):
-        """Get top performing or worst performing industries"""
-        stocks = api_client.get_stock_prices_live()
+    def get_top_industries(self, filter_type='gainers', limit=5, stocks=None):
+        """Get top performing or worst performing industries, from the given live stock prices if provided"""
+        if stocks is None:
+            stocks = get_feed('stock_prices_live')
         if not stocks:
             return []
             
@@ -127,9 +145,10 @@ class IndexView(generic.TemplateView):
         
         return sorted_industries[:limit]
     
-    def filter_announcements_by_category(self, category, limit=5):
-        """Filter announcements by category"""
-        announcements = api_client.get_announcements()
+    def filter_announcements_by_category(self, category, limit=5, announcements=None):
+        """Filter announcements by category, from the given announcements if provided"""
+        if announcements is None:
+            announcements = sort_announcements(get_feed('announcements'))
         if not announcements:
             return []
         
@@ -166,7 +185,7 @@ def get_market_overview(request):
     #     return JsonResponse({'error': 'Authentication required'}, status=401)
     
     # Get market indices data
-    indices = api_client.get_indices_live()
+    indices = get_feed('indices_live')
     
     if not indices:
         # Return mock data if API fails
@@ -290,7 +309,7 @@ def get_latest_news(request):
     #     return JsonResponse({'error': 'Authentication required'}, status=401)
     
     limit = int(request.GET.get('limit', 5))
-    news = api_client.get_news(limit=limit)
+    news = get_feed('news')[:limit]
     
     return JsonResponse(news, safe=False)
 
@@ -315,15 +334,15 @@ def get_financial_results(request):
     logger = logging.getLogger(__name__)
     
     try:
-        # Try to get real stock data from API
-        stock_data = api_client.get_stock_prices_live()
+        # Get real stock data from the live feed snapshot
+        stock_data = get_feed('stock_prices_live')
         
         if not stock_data:
             logger.warning("No stock data returned from API, using mock data")
             return JsonResponse(get_mock_financial_results(), safe=False)
         
         # Get announcements to cross-reference for financial results
-        announcements = api_client.get_announcements(limit=50)
+        announcements = sort_announcements(get_feed('announcements'))[:50]
         financial_announcements = []
         
         if announcements:
@@ -605,8 +624,8 @@ def get_portfolio_data(request):
             
         portfolio_data = []
         
-        # Get current prices for stocks from API
-        stock_prices = api_client.get_stock_prices_live()
+        # Get current prices for stocks from the live feed snapshot
+        stock_prices = get_feed('stock_prices_live')
         
         if not stock_prices:
             logger.error("Failed to fetch stock prices from API")
@@ -706,8 +725,8 @@ def get_treemap_data(request):
     try:
         logger = logging.getLogger(__name__)
         
-        # Fetch real stock market cap data from API
-        treemap_data = api_client.get_stock_market_cap_data()
+        # Calculate stock market cap data from the live feed snapshot
+        treemap_data = api_client.get_stock_market_cap_data(stocks=get_feed('stock_prices_live'))
         
         if treemap_data and len(treemap_data) > 0:
             logger.info(f"Fetched real market cap data for {len(treemap_data)} stocks")
@@ -0,0 +1,357 @@
+import time
+import typing
+import threading
+import statistics
+from collections import deque
+from urllib.parse import urlsplit
+import httpx
+
+from helpers.exceptions.requests import RequestError
+from .tokens import MGLinkTokenManager, mg_link_token_manager
+
+
+class CircuitOpenError(RequestError):
+    """Raised when a request is not sent because the endpoint's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Simple circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures, rejecting calls until
+    `reset_timeout` seconds have passed. A single trial call is then allowed through
+    (half-open). The circuit closes again if the trial call succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        :param failure_threshold: Number of consecutive failures after which the circuit opens
+        :param reset_timeout: Number of seconds after which an open circuit allows a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: typing.Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may be made"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_progress or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_progress = False
+
+
+class LatencyStats:
+    """Thread-safe latency statistics for a single endpoint"""
+
+    def __init__(self, sample_size: int = 500):
+        """
+        :param sample_size: Number of most recent latencies kept to compute percentiles
+        """
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: typing.Deque[float] = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, error: bool = False) -> None:
+        """
+        Record a request's latency.
+
+        :param latency: The request's latency in seconds
+        :param error: Whether the request failed
+        """
+        with self._lock:
+            self.count += 1
+            self.errors += int(error)
+            self.total += latency
+            self.max = max(self.max, latency)
+            self.samples.append(latency)
+
+    def percentile(
+        self, fraction: float, min_samples: int = 1
+    ) -> typing.Optional[float]:
+        """
+        Returns a percentile of the most recent latencies, in seconds.
+
+        :param fraction: The percentile as a fraction, e.g. 0.95
+        :param min_samples: Minimum number of samples required
+        :return: The percentile, or None if there are not enough samples
+        """
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """Returns the statistics, with latencies in milliseconds"""
+        with self._lock:
+            samples = sorted(self.samples)
+            count, errors, total, maximum = self.count, self.errors, self.total, self.max
+
+        if not samples:
+            return {"count": count, "errors": errors}
+
+        def percentile(fraction: float) -> float:
+            return samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": round(total / count * 1000, 2),
+            "median_ms": round(statistics.median(samples) * 1000, 2),
+            "p95_ms": round(percentile(0.95), 2),
+            "max_ms": round(maximum * 1000, 2),
+        }
+
+
+class BaseMGLinkClient:
+    """
+    Base for MGLink API clients.
+
+    Handles authentication (using the shared token manager), per-endpoint timeouts,
+    circuit breaking and latency statistics. Subclasses provide the actual (pooled)
+    HTTP client.
+    """
+
+    base_url = "https://api.mg-link.net"
+    default_headers = {
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+    }
+
+    def __init__(
+        self,
+        token_manager: MGLinkTokenManager,
+        *,
+        default_timeout: float = 30.0,
+        endpoint_timeouts: typing.Optional[typing.Dict[str, float]] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Initialize the client
+
+        :param token_manager: The token manager used to authenticate requests
+        :param default_timeout: Default request timeout in seconds
+        :param endpoint_timeouts: Request timeouts in seconds for specific endpoints, keyed by URL path
+        :param max_connections: Maximum number of concurrent connections
+        :param max_keepalive_connections: Maximum number of idle connections kept alive for reuse
+        :param keepalive_expiry: Number of seconds an idle connection is kept alive
+        :param failure_threshold: Number of consecutive failures after which an endpoint's circuit opens
+        :param reset_timeout: Number of seconds after which an open circuit allows a trial request
+        """
+        self.token_manager = token_manager
+        self.default_timeout = default_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: typing.Dict[str, CircuitBreaker] = {}
+        self._stats: typing.Dict[str, LatencyStats] = {}
+        self._registry_lock = threading.Lock()
+
+    @staticmethod
+    def get_endpoint(url: str) -> str:
+        """Returns the endpoint (URL path) of a URL"""
+        return urlsplit(url).path or "/"
+
+    def get_timeout(self, endpoint: str) -> httpx.Timeout:
+        timeout = self.endpoint_timeouts.get(endpoint, self.default_timeout)
+        return httpx.Timeout(timeout, connect=min(timeout, 10.0))
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._registry_lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout=self.reset_timeout,
+                )
+            return self._breakers[endpoint]
+
+    def get_stats(self, endpoint: str) -> LatencyStats:
+        with self._registry_lock:
+            if endpoint not in self._stats:
+                self._stats[endpoint] = LatencyStats()
+            return self._stats[endpoint]
+
+    def stats(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """Returns per-endpoint latency statistics and circuit breaker states"""
+        with self._registry_lock:
+            stats = dict(self._stats)
+            breakers = dict(self._breakers)
+        return {
+            endpoint: {
+                **endpoint_stats.as_dict(),
+                "circuit": breakers[endpoint].state if endpoint in breakers else "closed",
+            }
+            for endpoint, endpoint_stats in stats.items()
+        }
+
+    def _before_request(self, url: str) -> typing.Tuple[str, CircuitBreaker]:
+        endpoint = self.get_endpoint(url)
+        breaker = self.get_breaker(endpoint)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for MGLink endpoint {endpoint}")
+        return endpoint, breaker
+
+    def _after_request(
+        self,
+        endpoint: str,
+        breaker: CircuitBreaker,
+        started_at: float,
+        response: typing.Optional[httpx.Response],
+    ) -> None:
+        # Server errors and transport errors count as failures. Client errors do not,
+        # since they are caused by the request, not the endpoint's health.
+        failed = response is None or response.status_code >= 500
+        self.get_stats(endpoint).record(time.perf_counter() - started_at, error=failed)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    @staticmethod
+    def _auth_headers(
+        token: typing.Optional[str], headers: typing.Optional[typing.Dict[str, str]]
+    ) -> typing.Dict[str, str]:
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+
+class MGLinkClient(BaseMGLinkClient):
+    """
+    Synchronous MGLink API client.
+
+    Uses a single pooled `httpx.Client`, so connections (and TLS sessions)
+    are kept alive and reused across requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client: typing.Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+
+    def __del__(self):
+        # Close the request client when the object is destroyed
+        if self._client is not None:
+            self._client.close()
+
+    @property
+    def client(self) -> httpx.Client:
+        """Returns the pooled request client, creating it on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=type(self).base_url,
+                        headers=type(self).default_headers,
+                        limits=self.limits,
+                        http2=True,
+                        timeout=self.default_timeout,
+                    )
+        return self._client
+
+    def _send(
+        self, method: str, url: str, token: typing.Optional[str], **kwargs
+    ) -> httpx.Response:
+        endpoint, breaker = self._before_request(url)
+        kwargs["headers"] = self._auth_headers(token, kwargs.get("headers"))
+        kwargs.setdefault("timeout", self.get_timeout(endpoint))
+        started_at = time.perf_counter()
+        response = None
+        try:
+            response = self.client.request(method, url, **kwargs)
+            return response
+        except httpx.HTTPError as exc:
+            raise RequestError(exc) from exc
+        finally:
+            self._after_request(endpoint, breaker, started_at, response)
+
+    def request(
+        self, method: str, url: str, *, authenticate: bool = True, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request to MGLink.
+
+        Authenticated requests are retried once with a fresh token if the token is rejected.
+
+        :param method: The HTTP method
+        :param url: The endpoint URL. May be relative to `base_url`.
+        :param authenticate: Whether to authenticate the request
+        :param kwargs: Other keyword arguments passed to `httpx.Client.request`
+        :raises RequestError: If the request could not be sent, or the endpoint's circuit is open
+        """
+        token = self.token_manager.get_token() if authenticate else None
+        if authenticate and not token:
+            raise RequestError("Failed to obtain MGLink access token")
+
+        response = self._send(method, url, token, **kwargs)
+        if authenticate and response.status_code == 401:
+            token = self.token_manager.refresh(stale_token=token)
+            if token:
+                response = self._send(method, url, token, **kwargs)
+        return response
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        """Send a GET request to MGLink. See `request`."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        """Send a POST request to MGLink. See `request`."""
+        return self.request("POST", url, **kwargs)
+
+
+MGLINK_ENDPOINT_TIMEOUTS = {
+    "/api/Data1/PSXStockPrices": 60.0,
+    "/api/Data1/PSXStockDailyHistory": 45.0,
+    "/api/Data1/GetMGNews_New": 25.0,
+    "/api/Data1/GetPSXAnnouncements": 20.0,
+    "/api/Data1/GetPSXIndicesLive": 15.0,
+    "/api/Data/GetCurrenciesLive": 15.0,
+    "/api/Data1/Commodities": 15.0,
+}
+"""Request timeouts (in seconds) for MGLink endpoints that need a timeout other than the default"""
+
+mg_link_client = MGLinkClient(
+    mg_link_token_manager,
+    endpoint_timeouts=MGLINK_ENDPOINT_TIMEOUTS,
+)
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+
+from apps.live_rates.snapshots import SNAPSHOT_FEEDS, refresh_snapshots
+from apps.live_rates.scheduled_tasks import schedule_snapshots_refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh or schedule refreshes of the snapshots of live MGLink feeds."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--feeds",
+            nargs="+",
+            choices=list(SNAPSHOT_FEEDS),
+            help="Only refresh these feeds. Defaults to all feeds.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Refresh the feeds even if their snapshots are not due yet.",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="""
+            Schedule a task to refresh the snapshots of all feeds that are due.
+
+            Deletes the existing schedule if it already exists.
+
+            Defaults to repeating indefinitely every minute.
+            """,
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=-1,
+            help="Number of times to repeat the task. -1 to repeat indefinitely.",
+        )
+        parser.add_argument(
+            "--cron",
+            type=str,
+            default="* * * * *",
+            help="Cron expression defining the interval at which the task should run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            self.schedule_update(repeats=options["repeats"], cron=options["cron"])
+            return
+
+        try:
+            self.stdout.write("Refreshing snapshots...")
+            refreshed = refresh_snapshots(
+                names=options["feeds"], force=options["force"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Refreshed {len(refreshed)} snapshots: {', '.join(refreshed) or '-'}"
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(self.style.ERROR(f"Error refreshing snapshots: {exc}"))
+
+    def schedule_update(self, **kwargs):
+        try:
+            self.stdout.write(
+                f"Scheduling snapshots refresh to run every {kwargs.get('cron')}..."
+            )
+            schedule_snapshots_refresh(**kwargs)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Snapshots refresh scheduled to run every {kwargs.get('cron')}."
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(
+                self.style.ERROR(f"Error scheduling snapshots refresh: {exc}")
+            )
@@ -1,91 +1,34 @@
-from re import M
 import typing
 import datetime
-from django.views.decorators.debug import sensitive_variables
-import httpx
 import inflection
-from dcrypt import TextCrypt, CryptKey
-from django.utils import timezone
 from django.conf import settings
 from dateutil.parser import parse
 
 from helpers.exceptions.requests import RequestError
 from helpers.logging import log_exception
-
-
-crypt = TextCrypt(key=CryptKey(hash_algorithm="MD5"))
+from .clients import MGLinkClient, mg_link_client
 
 
 class MGLinkRateProvider:
-    """MGLink PSX rate provider client"""
+    """
+    MGLink PSX rate provider client.
+
+    Requests are sent with the shared MGLink client, which authenticates them
+    with the shared access token.
+    """
 
-    provider_auth_url = "https://api.mg-link.net/api/auth/token"
     provider_rates_url = "https://api.mg-link.net/api/Data1/PSXStockPrices"
     provider_timezone = settings.PAKISTAN_TIMEZONE
 
-    @sensitive_variables("username", "password")
-    def __init__(self, username: str, password: str, request_timeout: float = 30.0):
+    def __init__(self, client: MGLinkClient, request_timeout: float = 30.0):
         """
-        Initialize the client with the necessary credentials
+        Initialize the rate provider
 
-        :param username: client username
-        :param password: client password
-        :param request_timeout: client request timeout in seconds
+        :param client: The MGLink client used to send requests
+        :param request_timeout: Rates request timeout in seconds
         """
-        self.username = username
-        self.password = crypt.encrypt(password)
-        self.authentication_required_at = timezone.now()
-        self._client = httpx.Client(
-            headers={
-                "Content-Type": "application/x-www-form-urlencoded",
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0",
-            },
-            timeout=httpx.Timeout(request_timeout),
-        )
-
-    def __del__(self):
-        # Close the request client when the object is destroyed
-        self._client.close()
-
-    @property
-    def client(self):
-        """Returns request client, authenticating if necessary"""
-        # Authenticate 10 seconds before the token expires
-        if (self.authentication_required_at - timezone.now()).total_seconds() < 10:
-            self.authenticate()
-        return self._client
-
-    def authentication_successful(self, response_data: typing.Dict):
-        """Handles the response data from a successful authentication request"""
-        access_token = response_data["access_token"]
-        validity_period = float(response_data["expires_in"])
-        self._client.headers["Authorization"] = f"Bearer {access_token}"
-        self.authentication_required_at = timezone.now() + timezone.timedelta(
-            seconds=validity_period
-        )
-        return
-
-    def authenticate(self) -> None:
-        """Authenticate with the provider"""
-        try:
-            response = self._client.post(
-                url=type(self).provider_auth_url,
-                data={
-                    "grant_type": "password",
-                    "username": self.username,
-                    "password": crypt.decrypt(self.password),
-                },
-            )
-            if response.status_code != 200:
-                print(response.json())
-                response.raise_for_status()
-            else:
-                self.authentication_successful(response.json())
-        except Exception as exc:
-            log_exception(exc)
-            raise RequestError(exc) from exc
+        self.client = client
+        self.request_timeout = request_timeout
 
     def fetch_psx_rates(
         self,
@@ -109,8 +52,14 @@ class MGLinkRateProvider:
 
         try:
             response = self.client.get(
-                url=type(self).provider_rates_url,
+                type(self).provider_rates_url,
                 params=request_params,
+                headers={
+                    "Cache-Control": "no-cache, no-store, must-revalidate",
+                    "Pragma": "no-cache",
+                    "Expires": "0",
+                },
+                timeout=self.request_timeout,
             )
             if response.status_code != 200:
                 response.raise_for_status()
@@ -162,10 +111,6 @@ def cleaned_rates_data(rates_data: typing.List[typing.Dict]):
         yield clean_rate_data(rate_data)
 
 
-mg_link_provider = MGLinkRateProvider(
-    username=settings.MG_LINK_CLIENT_USERNAME,
-    password=settings.MG_LINK_CLIENT_PASSWORD,
-    request_timeout=90.0,
-)
+mg_link_provider = MGLinkRateProvider(mg_link_client, request_timeout=90.0)
 
 
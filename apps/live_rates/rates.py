@@ -7,6 +7,8 @@ from helpers.logging import log_exception
 from .rate_providers import cleaned_rates_data, mg_link_provider
 from .data_cleaners import MGLinkStockRateDataCleaner
 from apps.stocks.models import Stock, Rate, MarketType
+from apps.stocks.caching import invalidate_rates
+from apps.stocks.signals import send_rates_ingested
 
 
 def save_mg_link_psx_rates_data(mg_link_rates_data: typing.List[typing.Dict]):
@@ -55,9 +57,13 @@ def save_mg_link_psx_rates_data(mg_link_rates_data: typing.List[typing.Dict]):
         else:
             stocks_rates.append(stock_rate)
 
-    return Rate.objects.bulk_create(
+    created_rates = Rate.objects.bulk_create(
         stocks_rates, batch_size=5000, ignore_conflicts=False
     )
+    if created_rates:
+        invalidate_rates()
+        send_rates_ingested(created_rates)
+    return created_rates
 
 
 def get_time_in_pst(hour: int, minute: int = 0, second: int = 0) -> datetime.time:
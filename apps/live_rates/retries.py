@@ -0,0 +1,257 @@
+import time
+import typing
+import random
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from helpers.exceptions.requests import RequestError
+from .clients import CircuitOpenError, LatencyStats
+
+T = typing.TypeVar("T")
+
+
+class DeadlineExceeded(RequestError):
+    """Raised when a call does not complete within its retry policy's deadline"""
+
+
+class RetryPolicy:
+    """
+    Retry policy with exponential backoff, jitter, a total deadline and optional hedging.
+
+    Failed attempts are retried after a random delay of up to
+    `base_delay * 2 ** attempt` seconds (capped at `max_delay`), as long as the
+    retry fits in the deadline. If hedging is enabled, a second (hedged) attempt
+    is started when the first has not completed within the hedge delay, and the
+    first successful result is used. Failed attempts are not hedged, only retried.
+
+    Usable from both sync (`call`) and async (`acall`) callers. Sync attempts that
+    are not hedged are only bounded by the called function's own timeouts.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 1.0,
+        deadline: float = 10.0,
+        retry_on: typing.Tuple[typing.Type[BaseException], ...] = (RequestError,),
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_after: typing.Optional[float] = None,
+        max_hedge_workers: int = 8,
+    ):
+        """
+        Initialize the retry policy
+
+        :param max_attempts: Maximum number of attempts, including the first
+        :param base_delay: Base backoff delay in seconds
+        :param max_delay: Maximum backoff delay in seconds
+        :param deadline: Total number of seconds a call, including retries, may take
+        :param retry_on: Exceptions that are retried. Open circuits are never retried.
+        :param hedge: Whether to send a hedged attempt for slow attempts
+        :param hedge_percentile: Latency percentile after which a hedged attempt is sent
+        :param hedge_min_samples: Minimum number of latency samples required to use `hedge_percentile`
+        :param hedge_after: Hedge delay in seconds used until there are enough latency samples.
+            If None, attempts are not hedged until there are enough samples.
+        :param max_hedge_workers: Maximum number of threads used for hedged sync calls
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_on = retry_on
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after = hedge_after
+        self.max_hedge_workers = max_hedge_workers
+        self._executor: typing.Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Returns the thread pool used for hedged sync calls, creating it on first use"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_hedge_workers,
+                        thread_name_prefix="retry-hedge",
+                    )
+        return self._executor
+
+    def get_backoff(self, attempt: int) -> float:
+        """Returns the delay (with full jitter) before the given retry attempt (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def get_hedge_delay(
+        self, latency_stats: typing.Optional[LatencyStats] = None
+    ) -> typing.Optional[float]:
+        """
+        Returns the number of seconds after which a hedged attempt is sent, or None to not hedge.
+
+        :param latency_stats: Latency statistics of the called endpoint
+        """
+        if not self.hedge:
+            return None
+        if latency_stats is not None:
+            delay = latency_stats.percentile(
+                self.hedge_percentile, min_samples=self.hedge_min_samples
+            )
+            if delay is not None:
+                return delay
+        return self.hedge_after
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        return isinstance(exc, self.retry_on) and not isinstance(exc, CircuitOpenError)
+
+    def _next_delay(self, attempt: int, deadline: float) -> typing.Optional[float]:
+        """Returns the delay before the next attempt, or None if it would not fit in the deadline"""
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.get_backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _hedged_call(
+        self,
+        func: typing.Callable[[], T],
+        deadline: float,
+        hedge_delay: float,
+    ) -> T:
+        futures = {self.executor.submit(func)}
+        hedged = False
+        error: typing.Optional[BaseException] = None
+        while futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Call did not complete within its deadline")
+
+            timeout = remaining if hedged else min(hedge_delay, remaining)
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as exc:
+                    error = exc
+
+            if not hedged and not done:
+                # The attempt is slow, so also send the hedged attempt. A failed
+                # attempt is not hedged, but raised, so it is retried with backoff
+                futures.add(self.executor.submit(func))
+                hedged = True
+        raise error
+
+    def call(
+        self,
+        func: typing.Callable[[], T],
+        *,
+        latency_stats: typing.Optional[LatencyStats] = None,
+    ) -> T:
+        """
+        Call `func`, retrying (and hedging) it according to the policy.
+
+        :param func: The function to call
+        :param latency_stats: Latency statistics of the called endpoint, used to determine the hedge delay
+        :raises DeadlineExceeded: If the call does not complete within the deadline
+        :return: The function's result. Raises the last error if all attempts fail.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            hedge_delay = self.get_hedge_delay(latency_stats)
+            try:
+                if hedge_delay is None:
+                    return func()
+                return self._hedged_call(func, deadline, hedge_delay)
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                delay = self._next_delay(attempt, deadline) if self.is_retryable(exc) else None
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    async def _ahedged_call(
+        self,
+        func: typing.Callable[[], typing.Awaitable[T]],
+        deadline: float,
+        hedge_delay: float,
+    ) -> T:
+        tasks = {asyncio.ensure_future(func())}
+        hedged = False
+        error: typing.Optional[BaseException] = None
+        try:
+            while tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded("Call did not complete within its deadline")
+
+                timeout = remaining if hedged else min(hedge_delay, remaining)
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        return task.result()
+                    except Exception as exc:
+                        error = exc
+
+                if not hedged and not done:
+                    tasks.add(asyncio.ensure_future(func()))
+                    hedged = True
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acall(
+        self,
+        func: typing.Callable[[], typing.Awaitable[T]],
+        *,
+        latency_stats: typing.Optional[LatencyStats] = None,
+    ) -> T:
+        """
+        Await `func()`, retrying (and hedging) it according to the policy.
+
+        :param func: Function returning the awaitable to await
+        :param latency_stats: Latency statistics of the called endpoint, used to determine the hedge delay
+        :raises DeadlineExceeded: If the call does not complete within the deadline
+        :return: The awaitable's result. Raises the last error if all attempts fail.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            hedge_delay = self.get_hedge_delay(latency_stats)
+            try:
+                if hedge_delay is None:
+                    return await asyncio.wait_for(
+                        func(), timeout=max(deadline - time.monotonic(), 0)
+                    )
+                return await self._ahedged_call(func, deadline, hedge_delay)
+            except asyncio.TimeoutError as exc:
+                raise DeadlineExceeded("Call did not complete within its deadline") from exc
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                delay = self._next_delay(attempt, deadline) if self.is_retryable(exc) else None
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+
+mg_link_retry_policy = RetryPolicy(
+    max_attempts=3,
+    base_delay=0.1,
+    max_delay=1.0,
+    deadline=20.0,
+    hedge=True,
+    hedge_percentile=0.95,
+)
+"""Retry policy for idempotent MGLink data requests"""
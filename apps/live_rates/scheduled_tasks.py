@@ -40,3 +40,34 @@ def schedule_stock_rates_update(
         # Set the next run time to 10 seconds from now to avoid running the task immediately
         next_run=(timezone.now() + datetime.timedelta(seconds=10)),
     )
+
+
+def schedule_snapshots_refresh(
+    repeats: int = -1,
+    cron: str = "* * * * *",
+):
+    """
+    Schedule the task to refresh the snapshots of live MGLink feeds that are due.
+
+    Deletes the existing schedule if it already exists.
+
+    :param repeats: Number of times to repeat the task. -1 to repeat indefinitely.
+    :param cron: Cron expression defining the interval at which the task should run.
+        Should be at least as frequent as the shortest feed interval.
+    """
+    task_name = "apps.live_rates.snapshots.refresh_snapshots"
+    # Delete the schedule if it already exists
+    Schedule.objects.filter(func=task_name).delete()
+
+    schedule(
+        task_name,
+        q_options={
+            "retry": 80,
+            "save": False,
+        },
+        timeout=60,
+        schedule_type="C",
+        repeats=repeats,
+        cron=cron,
+        next_run=(timezone.now() + datetime.timedelta(seconds=10)),
+    )
@@ -0,0 +1,429 @@
+"""
+Versioned snapshots of live MGLink feeds.
+
+A scheduled task polls each feed at its configured interval and publishes the
+response to the cache. Views read the latest published snapshot instead of calling
+MGLink on the request thread, so page latency and upstream call volume do not
+depend on MGLink latency or site traffic.
+
+If the task is not running (e.g. without a django-q cluster, or with a per-process
+cache), a missing or stale snapshot is refreshed on demand by the first reader,
+while holding a cache lock so that only one reader calls MGLink at a time.
+
+Feed polling intervals (in seconds) can be overridden with the
+`MG_LINK_SNAPSHOT_INTERVALS` setting, e.g. `{"indices_live": 30}`.
+
+Each snapshot carries a content hash of its data (`etag`), so that views can answer
+conditional requests without serializing the data.
+
+For feeds with a record key (e.g. the stock symbol), the changes from the previous
+snapshot are also published as a delta, so that live streams only need to send
+the changed fields.
+"""
+
+import json
+import time
+import typing
+import hashlib
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+
+from helpers.logging import log_exception
+from helpers.exceptions.requests import RequestError
+from .clients import mg_link_client
+from .retries import mg_link_retry_policy
+
+
+class SnapshotFeed(typing.NamedTuple):
+    """A live MGLink feed that is published as snapshots"""
+
+    url: str
+    interval: int
+    """Default number of seconds between refreshes"""
+    key: typing.Optional[str] = None
+    """Key identifying records of the feed. If set, deltas between snapshots are published."""
+
+
+class Snapshot(typing.NamedTuple):
+    """A published snapshot of a feed"""
+
+    name: str
+    version: int
+    fetched_at: float
+    data: typing.Any
+    etag: typing.Optional[str] = None
+    """Content hash of the data"""
+
+
+SNAPSHOT_FEEDS: typing.Dict[str, SnapshotFeed] = {
+    "indices_live": SnapshotFeed(
+        "https://api.mg-link.net/api/Data1/GetPSXIndicesLive", 60, key="IndexName"
+    ),
+    "stock_prices_live": SnapshotFeed(
+        "https://api.mg-link.net/api/Data1/PSXStockPrices?StartDate=&EndDate=",
+        60,
+        key="Symbol",
+    ),
+    "announcements": SnapshotFeed(
+        "https://api.mg-link.net/api/Data1/GetPSXAnnouncements", 300
+    ),
+    "news": SnapshotFeed("https://api.mg-link.net/api/Data1/GetMGNews_New", 300),
+    "commodities": SnapshotFeed(
+        "https://api.mg-link.net/api/Data1/Commodities?symbols=Q1T", 300
+    ),
+    "currencies": SnapshotFeed(
+        "https://api.mg-link.net/api/Data/GetCurrenciesLive?Symbols=USDPKR,GBPUSD,EURUSD",
+        300,
+    ),
+}
+
+SNAPSHOT_CACHE_KEY_PREFIX = "mg_link:snapshot"
+
+SNAPSHOT_DELTA_TTL = 10 * 60
+"""Number of seconds deltas are kept for"""
+
+SNAPSHOT_STALE_INTERVALS = 3
+"""Number of missed refresh intervals after which readers refresh a snapshot on demand"""
+
+SNAPSHOT_PUBLISH_LOCK_TIMEOUT = 10
+"""Maximum number of seconds a process may hold, or wait for, a feed's publish lock"""
+
+
+class SnapshotDelta(typing.NamedTuple):
+    """Changes of a feed's records from the previous snapshot"""
+
+    name: str
+    version: int
+    changed: typing.Dict[str, typing.Dict[str, typing.Any]]
+    """Changed fields of each changed record, by record key. New records are included in full."""
+    removed: typing.List[str]
+    """Keys of the removed records"""
+
+
+def _get_cache_key(name: str) -> str:
+    return f"{SNAPSHOT_CACHE_KEY_PREFIX}:{name}"
+
+
+def _get_version_cache_key(name: str) -> str:
+    return f"{SNAPSHOT_CACHE_KEY_PREFIX}:{name}:version"
+
+
+def _get_delta_cache_key(name: str, version: int) -> str:
+    return f"{SNAPSHOT_CACHE_KEY_PREFIX}:{name}:delta:{version}"
+
+
+def _get_refresh_lock_key(name: str) -> str:
+    return f"{SNAPSHOT_CACHE_KEY_PREFIX}:{name}:refresh_lock"
+
+
+def _get_publish_lock_key(name: str) -> str:
+    return f"{SNAPSHOT_CACHE_KEY_PREFIX}:{name}:publish_lock"
+
+
+@contextlib.contextmanager
+def _publish_lock(name: str) -> typing.Iterator[None]:
+    """
+    Hold the feed's publish lock.
+
+    Snapshots are published by both the refresh task and on-demand refreshes, so
+    publishing is serialized to keep versions strictly increasing, and deltas
+    relative to the previous version.
+    """
+    lock_key = _get_publish_lock_key(name)
+    deadline = time.monotonic() + SNAPSHOT_PUBLISH_LOCK_TIMEOUT
+    while not cache.add(lock_key, True, timeout=SNAPSHOT_PUBLISH_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out waiting to publish a snapshot of feed {name}")
+        time.sleep(0.05)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+def get_feed_interval(name: str) -> int:
+    """Returns the number of seconds between refreshes of the given feed"""
+    intervals = getattr(settings, "MG_LINK_SNAPSHOT_INTERVALS", None) or {}
+    return int(intervals.get(name, SNAPSHOT_FEEDS[name].interval))
+
+
+def get_data_etag(data: typing.Any) -> str:
+    """Returns a content hash of feed data, usable as an (unquoted) HTTP entity tag"""
+    serialized = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(serialized.encode(), digest_size=16).hexdigest()
+
+
+def is_snapshot_stale(snapshot: Snapshot) -> bool:
+    """Returns whether the snapshot has missed several refreshes, i.e. the refresh task is not running"""
+    age = time.time() - snapshot.fetched_at
+    return age >= get_feed_interval(snapshot.name) * SNAPSHOT_STALE_INTERVALS
+
+
+def _refresh_on_demand(name: str) -> typing.Optional[Snapshot]:
+    """
+    Refresh a feed's snapshot, unless another reader is already refreshing it.
+
+    The lock is kept for the feed's interval if the refresh fails,
+    so a failing feed is not fetched again on every read.
+    """
+    lock_key = _get_refresh_lock_key(name)
+    try:
+        if not cache.add(lock_key, True, timeout=get_feed_interval(name)):
+            return None
+    except Exception as exc:
+        log_exception(exc)
+        return None
+
+    snapshot = refresh_snapshot(name)
+    if snapshot is not None:
+        cache.delete(lock_key)
+    return snapshot
+
+
+def get_snapshot(name: str, refresh: bool = True) -> typing.Optional[Snapshot]:
+    """
+    Returns the latest published snapshot of a feed.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`.
+    :param refresh: Refresh the snapshot on demand if it is missing or stale.
+    :return: The snapshot, or None if none has been published yet.
+    """
+    if name not in SNAPSHOT_FEEDS:
+        raise ValueError(f"Unknown snapshot feed: {name}")
+    try:
+        cached = cache.get(_get_cache_key(name))
+    except Exception as exc:
+        log_exception(exc)
+        return None
+    snapshot = Snapshot(name=name, **cached) if cached is not None else None
+
+    if refresh and (snapshot is None or is_snapshot_stale(snapshot)):
+        snapshot = _refresh_on_demand(name) or snapshot
+    return snapshot
+
+
+def get_snapshot_data(
+    name: str, default: typing.Any = None, refresh: bool = True
+) -> typing.Any:
+    """
+    Returns the data of the latest published snapshot of a feed.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`.
+    :param default: Value returned if no snapshot has been published yet.
+    :param refresh: Refresh the snapshot on demand if it is missing or stale.
+    """
+    snapshot = get_snapshot(name, refresh=refresh)
+    return snapshot.data if snapshot is not None else default
+
+
+def get_snapshot_version(name: str) -> typing.Optional[int]:
+    """
+    Returns the version of the latest published snapshot of a feed, without loading its data.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`.
+    :return: The version, or None if no snapshot has been published yet.
+    """
+    try:
+        return cache.get(_get_version_cache_key(name))
+    except Exception as exc:
+        log_exception(exc)
+        return None
+
+
+def get_snapshot_delta(name: str, version: int) -> typing.Optional[SnapshotDelta]:
+    """
+    Returns the changes of a snapshot from the previous one.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`, with a record key.
+    :param version: The version of the snapshot.
+    :return: The delta, or None if it is not available (anymore).
+    """
+    try:
+        cached = cache.get(_get_delta_cache_key(name, version))
+    except Exception as exc:
+        log_exception(exc)
+        return None
+    if cached is None:
+        return None
+    return SnapshotDelta(name=name, version=version, **cached)
+
+
+def diff_records(
+    previous: typing.Iterable[typing.Dict[str, typing.Any]],
+    current: typing.Iterable[typing.Dict[str, typing.Any]],
+    key: str,
+) -> typing.Tuple[typing.Dict[str, typing.Dict[str, typing.Any]], typing.List[str]]:
+    """
+    Returns the changes between two lists of records.
+
+    :param previous: The previous records.
+    :param current: The current records.
+    :param key: Key identifying the records. Records without it are ignored.
+    :return: The changed fields of each changed (or new) record, by record key,
+        and the keys of the removed records.
+    """
+    previous_records = {
+        record[key]: record for record in previous if record.get(key) is not None
+    }
+    changed = {}
+    current_keys = set()
+    for record in current:
+        record_key = record.get(key)
+        if record_key is None:
+            continue
+        current_keys.add(record_key)
+        previous_record = previous_records.get(record_key)
+        if previous_record is None:
+            changed[record_key] = record
+            continue
+        fields = {
+            field: value
+            for field, value in record.items()
+            if previous_record.get(field) != value
+        }
+        if fields:
+            changed[record_key] = fields
+    removed = [record_key for record_key in previous_records if record_key not in current_keys]
+    return changed, removed
+
+
+def _publish_delta(snapshot: Snapshot, previous: typing.Optional[Snapshot]) -> None:
+    key = SNAPSHOT_FEEDS[snapshot.name].key
+    if key is None or previous is None:
+        return
+    if not isinstance(previous.data, list) or not isinstance(snapshot.data, list):
+        return
+    changed, removed = diff_records(previous.data, snapshot.data, key)
+    cache.set(
+        _get_delta_cache_key(snapshot.name, snapshot.version),
+        {"changed": changed, "removed": removed},
+        timeout=SNAPSHOT_DELTA_TTL,
+    )
+
+
+def publish_snapshot(name: str, data: typing.Any) -> Snapshot:
+    """
+    Publish a new snapshot of a feed, replacing the current one.
+
+    Snapshots do not expire, so the last good snapshot is served until it is replaced.
+    If the feed has a record key, the delta from the current snapshot is published too.
+    Snapshots of a feed are published one at a time, under the feed's publish lock.
+
+    :param name: The feed name.
+    :param data: The feed data.
+    :return: The published snapshot.
+    :raises TimeoutError: If the publish lock could not be acquired.
+    """
+    with _publish_lock(name):
+        current = get_snapshot(name, refresh=False)
+        snapshot = Snapshot(
+            name=name,
+            version=(current.version + 1) if current is not None else 1,
+            fetched_at=time.time(),
+            data=data,
+            etag=get_data_etag(data),
+        )
+        cache.set(
+            _get_cache_key(name),
+            {
+                "version": snapshot.version,
+                "fetched_at": snapshot.fetched_at,
+                "data": snapshot.data,
+                "etag": snapshot.etag,
+            },
+            timeout=None,
+        )
+        try:
+            _publish_delta(snapshot, current)
+        except Exception as exc:
+            log_exception(exc)
+        # Published last, so that readers of the version find the snapshot and delta
+        cache.set(_get_version_cache_key(name), snapshot.version, timeout=None)
+        return snapshot
+
+
+def _get_feed_response(url: str):
+    response = mg_link_client.get(url)
+    if response.status_code >= 500:
+        # Server errors are retried
+        raise RequestError(f"MGLink request failed with status {response.status_code}")
+    response.raise_for_status()
+    return response
+
+
+def fetch_feed(name: str) -> typing.Any:
+    """
+    Fetch the current data of a feed from MGLink.
+
+    Failed requests are retried, and slow requests hedged, according to `mg_link_retry_policy`.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`.
+    :raises RequestError: If the request could not be sent.
+    :raises ValueError: If MGLink does not return any data.
+    """
+    url = SNAPSHOT_FEEDS[name].url
+    response = mg_link_retry_policy.call(
+        lambda: _get_feed_response(url),
+        latency_stats=mg_link_client.get_stats(mg_link_client.get_endpoint(url)),
+    )
+    data = response.json()
+    if not data:
+        raise ValueError(f"MGLink returned no data for feed {name}")
+    return data
+
+
+def refresh_snapshot(name: str) -> typing.Optional[Snapshot]:
+    """
+    Fetch a feed and publish it as a new snapshot.
+
+    :param name: The feed name. One of `SNAPSHOT_FEEDS`.
+    :return: The published snapshot, or None if the feed could not be fetched,
+        in which case the current snapshot is kept.
+    """
+    try:
+        return publish_snapshot(name, fetch_feed(name))
+    except Exception as exc:
+        log_exception(exc)
+        return None
+
+
+def get_snapshot_max_age(snapshot: Snapshot) -> int:
+    """Returns the number of seconds until the snapshot is due to be replaced"""
+    age = time.time() - snapshot.fetched_at
+    return max(0, int(get_feed_interval(snapshot.name) - age))
+
+
+def is_snapshot_due(name: str) -> bool:
+    """Returns whether the feed's snapshot is older than the feed's interval"""
+    snapshot = get_snapshot(name, refresh=False)
+    if snapshot is None:
+        return True
+    # Allow some leeway so that a feed with an interval equal to the
+    # task schedule's interval is refreshed on every run
+    return time.time() - snapshot.fetched_at >= get_feed_interval(name) - 5
+
+
+def refresh_snapshots(
+    names: typing.Optional[typing.Iterable[str]] = None, force: bool = False
+) -> typing.List[str]:
+    """
+    Refresh the snapshots of all feeds that are due, concurrently.
+
+    :param names: Names of the feeds to refresh. Defaults to all feeds.
+    :param force: Refresh the feeds even if they are not due.
+    :return: Names of the feeds that were refreshed.
+    """
+    names = list(names or SNAPSHOT_FEEDS)
+    for name in names:
+        if name not in SNAPSHOT_FEEDS:
+            raise ValueError(f"Unknown snapshot feed: {name}")
+
+    due = [name for name in names if force or is_snapshot_due(name)]
+    if not due:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(due)) as executor:
+        snapshots = list(executor.map(refresh_snapshot, due))
+    return [name for name, snapshot in zip(due, snapshots) if snapshot is not None]
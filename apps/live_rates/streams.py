@@ -0,0 +1,209 @@
+"""
+Server-Sent Events streams of live MGLink feeds.
+
+A stream sends the latest snapshot of each feed on connect, followed by the deltas
+(changed fields per record) of new snapshots as they are published by the snapshot
+refresh task. If a delta is not available, e.g. because the client fell too far
+behind, the full snapshot is sent again.
+
+Under ASGI, streams are served by an async generator and last until the client
+disconnects. Under WSGI, each stream holds a worker thread, so streams are served by
+a sync generator that ends after `STREAM_MAX_DURATION` seconds. Clients (`EventSource`)
+then reconnect after the advertised retry delay and receive the snapshots again.
+"""
+
+import json
+import time
+import typing
+import asyncio
+from asgiref.sync import sync_to_async
+
+from .snapshots import (
+    SNAPSHOT_FEEDS,
+    get_snapshot,
+    get_snapshot_delta,
+    get_snapshot_version,
+)
+
+STREAM_FEEDS = [name for name, feed in SNAPSHOT_FEEDS.items() if feed.key is not None]
+"""Feeds that can be streamed. Only feeds with a record key have deltas."""
+
+STREAM_POLL_INTERVAL = 1.0
+"""Number of seconds between checks for new snapshots"""
+
+STREAM_KEEPALIVE_INTERVAL = 15.0
+"""Number of seconds of inactivity after which a keep-alive comment is sent"""
+
+STREAM_MAX_DURATION = 25.0
+"""Number of seconds after which sync (WSGI) streams end, so they do not hold a worker indefinitely"""
+
+
+def format_event(event: str, data: typing.Any, id: typing.Optional[str] = None) -> str:
+    """Returns a Server-Sent Event"""
+    lines = []
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _select(
+    records: typing.Dict[str, typing.Any], keys: typing.Optional[typing.Set[str]]
+) -> typing.Dict[str, typing.Any]:
+    if keys is None:
+        return records
+    return {key: value for key, value in records.items() if key in keys}
+
+
+def _snapshot_event(name: str, keys: typing.Optional[typing.Set[str]]) -> typing.Tuple[typing.Optional[int], typing.Optional[str]]:
+    snapshot = get_snapshot(name)
+    if snapshot is None:
+        return None, None
+
+    record_key = SNAPSHOT_FEEDS[name].key
+    data = snapshot.data
+    if keys is not None and isinstance(data, list):
+        data = [record for record in data if record.get(record_key) in keys]
+    event = format_event(
+        "snapshot",
+        {"feed": name, "version": snapshot.version, "key": record_key, "data": data},
+        id=f"{name}:{snapshot.version}",
+    )
+    return snapshot.version, event
+
+
+def _delta_events(
+    name: str, since: int, version: int, keys: typing.Optional[typing.Set[str]]
+) -> typing.Optional[typing.List[str]]:
+    events = []
+    for delta_version in range(since + 1, version + 1):
+        delta = get_snapshot_delta(name, delta_version)
+        if delta is None:
+            return None
+
+        changed = _select(delta.changed, keys)
+        removed = [key for key in delta.removed if keys is None or key in keys]
+        if changed or removed:
+            events.append(
+                format_event(
+                    "delta",
+                    {
+                        "feed": name,
+                        "version": delta.version,
+                        "changed": changed,
+                        "removed": removed,
+                    },
+                    id=f"{name}:{delta.version}",
+                )
+            )
+    return events
+
+
+def _poll(
+    versions: typing.Dict[str, typing.Optional[int]],
+    keys: typing.Optional[typing.Set[str]],
+) -> typing.List[str]:
+    """Returns the events of the feeds' new snapshots, and updates `versions` in place"""
+    events = []
+    for name, sent_version in versions.items():
+        version = get_snapshot_version(name)
+        if version is None or version == sent_version:
+            continue
+
+        delta_events = None
+        if sent_version is not None and version > sent_version:
+            delta_events = _delta_events(name, sent_version, version, keys)
+        if delta_events is None:
+            # Missing deltas, or the snapshot was never sent
+            version, event = _snapshot_event(name, keys)
+            delta_events = [event] if event is not None else []
+        events.extend(delta_events)
+        versions[name] = version
+    return events
+
+
+class FeedStream:
+    """State of a stream of the snapshots and deltas of live feeds"""
+
+    def __init__(
+        self,
+        names: typing.Iterable[str],
+        keys: typing.Optional[typing.Iterable[str]] = None,
+        poll_interval: float = STREAM_POLL_INTERVAL,
+        keepalive_interval: float = STREAM_KEEPALIVE_INTERVAL,
+    ):
+        """
+        :param names: Names of the feeds to stream. Must be in `STREAM_FEEDS`.
+        :param keys: Only stream the records with these keys (e.g. symbols). Defaults to all records.
+        :param poll_interval: Number of seconds between checks for new snapshots.
+        :param keepalive_interval: Number of seconds of inactivity after which a keep-alive comment is sent.
+        """
+        names = list(names)
+        for name in names:
+            if name not in STREAM_FEEDS:
+                raise ValueError(f"Feed cannot be streamed: {name}")
+        self.keys = set(keys) if keys is not None else None
+        self.poll_interval = poll_interval
+        self.keepalive_interval = keepalive_interval
+        self.versions: typing.Dict[str, typing.Optional[int]] = {name: None for name in names}
+        self.last_sent = time.monotonic()
+
+    def start(self) -> str:
+        """Returns the first message of the stream"""
+        # Tell clients how long to wait before reconnecting
+        return f"retry: {int(self.poll_interval * 5000)}\n\n"
+
+    def poll(self) -> typing.List[str]:
+        """Returns the messages to send since the last poll, including keep-alives"""
+        events = _poll(self.versions, self.keys)
+        if events:
+            self.last_sent = time.monotonic()
+        elif time.monotonic() - self.last_sent >= self.keepalive_interval:
+            events = [": keep-alive\n\n"]
+            self.last_sent = time.monotonic()
+        return events
+
+
+async def stream_feeds(
+    names: typing.Iterable[str],
+    keys: typing.Optional[typing.Iterable[str]] = None,
+    poll_interval: float = STREAM_POLL_INTERVAL,
+    keepalive_interval: float = STREAM_KEEPALIVE_INTERVAL,
+) -> typing.AsyncIterator[str]:
+    """
+    Stream the snapshots and deltas of live feeds as Server-Sent Events, until the client disconnects.
+
+    For ASGI servers. See `FeedStream` for the parameters.
+    """
+    stream = FeedStream(names, keys, poll_interval, keepalive_interval)
+    yield stream.start()
+    poll = sync_to_async(stream.poll, thread_sensitive=False)
+    while True:
+        for event in await poll():
+            yield event
+        await asyncio.sleep(poll_interval)
+
+
+def iter_feeds(
+    names: typing.Iterable[str],
+    keys: typing.Optional[typing.Iterable[str]] = None,
+    poll_interval: float = STREAM_POLL_INTERVAL,
+    keepalive_interval: float = STREAM_KEEPALIVE_INTERVAL,
+    max_duration: float = STREAM_MAX_DURATION,
+) -> typing.Iterator[str]:
+    """
+    Stream the snapshots and deltas of live feeds as Server-Sent Events, for a limited time.
+
+    For WSGI servers. See `FeedStream` for the parameters.
+
+    :param max_duration: Number of seconds after which the stream ends.
+    """
+    stream = FeedStream(names, keys, poll_interval, keepalive_interval)
+    yield stream.start()
+    ends_at = time.monotonic() + max_duration
+    while True:
+        yield from stream.poll()
+        if time.monotonic() + poll_interval >= ends_at:
+            return
+        time.sleep(poll_interval)
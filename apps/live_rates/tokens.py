@@ -0,0 +1,182 @@
+import time
+import typing
+from django.core.cache import cache
+from django.views.decorators.debug import sensitive_variables
+import httpx
+from dcrypt import TextCrypt, CryptKey
+from django.conf import settings
+
+from helpers.logging import log_exception
+
+
+crypt = TextCrypt(key=CryptKey(hash_algorithm="MD5"))
+
+
+class MGLinkTokenManager:
+    """
+    Shared MGLink access token manager.
+
+    The access token and its expiry are stored in the Django cache, so that all
+    workers/processes reuse the same token instead of authenticating on every request.
+    Tokens are refreshed proactively before they expire, and a cache lock ensures
+    only one process refreshes the token at a time.
+    """
+
+    auth_url = "https://api.mg-link.net/api/auth/token"
+    cache_key = "mg_link:access_token"
+    lock_key = "mg_link:access_token:lock"
+
+    @sensitive_variables("username", "password")
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        *,
+        refresh_margin: float = 120.0,
+        lock_timeout: float = 30.0,
+        request_timeout: float = 30.0,
+    ):
+        """
+        Initialize the token manager with the necessary credentials
+
+        :param username: client username
+        :param password: client password
+        :param refresh_margin: Number of seconds before the token expires at which it should be refreshed
+        :param lock_timeout: Maximum number of seconds a process may hold the refresh lock
+        :param request_timeout: Authentication request timeout in seconds
+        """
+        self.username = username
+        self.password = crypt.encrypt(password)
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.request_timeout = request_timeout
+
+    def _get_cached(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        try:
+            return cache.get(self.cache_key)
+        except Exception as exc:
+            log_exception(exc)
+            return None
+
+    def _needs_refresh(self, cached: typing.Optional[typing.Dict[str, typing.Any]]) -> bool:
+        return cached is None or time.time() >= cached["expires_at"] - self.refresh_margin
+
+    def fetch_token(self) -> typing.Dict[str, typing.Any]:
+        """
+        Request a new access token from MGLink.
+
+        :return: A dictionary of the access token and its expiry timestamp.
+        """
+        response = httpx.post(
+            type(self).auth_url,
+            data={
+                "grant_type": "password",
+                "username": self.username,
+                "password": crypt.decrypt(self.password),
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self.request_timeout,
+        )
+        response.raise_for_status()
+        response_data = response.json()
+        access_token = response_data.get("access_token")
+        if not access_token:
+            raise ValueError("Access token not found in MGLink authentication response")
+
+        validity_period = float(response_data.get("expires_in") or 3600)
+        return {
+            "access_token": access_token,
+            "expires_at": time.time() + validity_period,
+        }
+
+    def _refresh(
+        self, cached: typing.Optional[typing.Dict[str, typing.Any]] = None
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        Fetch a new token while holding the refresh lock, and store it in the cache
+
+        :param cached: The currently cached token, if any.
+        """
+        if cache.add(self.lock_key, True, timeout=self.lock_timeout):
+            try:
+                cached = self.fetch_token()
+                timeout = max(int(cached["expires_at"] - time.time()), 1)
+                cache.set(self.cache_key, cached, timeout=timeout)
+            finally:
+                cache.delete(self.lock_key)
+            return cached
+
+        if cached is not None and time.time() < cached["expires_at"]:
+            # Another process is refreshing the token early. The current token is still valid
+            return cached
+
+        # Another process is refreshing the token. Wait for it to finish
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            cached = self._get_cached()
+            if not self._needs_refresh(cached) or cache.get(self.lock_key) is None:
+                break
+        return cached if not self._needs_refresh(cached) else None
+
+    def get_token(self) -> typing.Optional[str]:
+        """
+        Returns a valid access token, refreshing it if necessary.
+
+        Returns None if a token could not be obtained.
+        """
+        cached = self._get_cached()
+        if not self._needs_refresh(cached):
+            return cached["access_token"]
+
+        try:
+            refreshed = self._refresh(cached)
+        except Exception as exc:
+            log_exception(exc)
+            refreshed = None
+
+        if refreshed is None and cached is not None and time.time() < cached["expires_at"]:
+            # Refresh failed but the current token has not expired yet
+            return cached["access_token"]
+        if refreshed is None:
+            # Waited for another process that failed to refresh the token. Try once more ourselves
+            try:
+                refreshed = self.fetch_token()
+                cache.set(
+                    self.cache_key,
+                    refreshed,
+                    timeout=max(int(refreshed["expires_at"] - time.time()), 1),
+                )
+            except Exception as exc:
+                log_exception(exc)
+                return None
+        return refreshed["access_token"]
+
+    def invalidate(self, stale_token: typing.Optional[str] = None) -> None:
+        """
+        Remove the cached access token, e.g. after it was rejected by the API.
+
+        :param stale_token: The token that was rejected. If given, the cached token is
+            only removed if it is still this token, so a token that was just refreshed
+            by another process is kept.
+        """
+        cached = self._get_cached()
+        if cached is None:
+            return
+        if stale_token is None or cached["access_token"] == stale_token:
+            cache.delete(self.cache_key)
+
+    def refresh(self, stale_token: typing.Optional[str] = None) -> typing.Optional[str]:
+        """
+        Returns a new access token after the given token was rejected (e.g. with a 401).
+
+        :param stale_token: The token that was rejected.
+        """
+        self.invalidate(stale_token)
+        return self.get_token()
+
+
+mg_link_token_manager = MGLinkTokenManager(
+    username=settings.MG_LINK_CLIENT_USERNAME,
+    password=settings.MG_LINK_CLIENT_PASSWORD,
+)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = "live_rates"
+
+
+urlpatterns = [
+    path("stream/", views.ticker_stream_view, name="ticker_stream"),
+]
@@ -1,3 +1,41 @@
-from django.shortcuts import render
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .streams import STREAM_FEEDS, iter_feeds, stream_feeds
+
+
+@require_GET
+def ticker_stream_view(request):
+    """
+    Server-Sent Events stream of live stock prices and indices.
+
+    Under ASGI, the stream lasts until the client disconnects. Under WSGI, it ends
+    after `STREAM_MAX_DURATION` seconds so it does not hold a worker indefinitely,
+    and the client reconnects.
+
+    Query parameters:
+    - feeds: Comma-separated feeds to stream. Defaults to all streamable feeds.
+    - symbols: Comma-separated record keys (stock symbols or index names) to stream.
+        Defaults to all records.
+    """
+    feeds = [name for name in request.GET.get("feeds", "").split(",") if name]
+    feeds = feeds or STREAM_FEEDS
+    unknown_feeds = [name for name in feeds if name not in STREAM_FEEDS]
+    if unknown_feeds:
+        return JsonResponse(
+            {"error": f"Unknown feeds: {', '.join(unknown_feeds)}"}, status=400
+        )
+    symbols = [symbol.strip() for symbol in request.GET.get("symbols", "").split(",") if symbol.strip()]
+
+    # The response must be consumed by an iterator of the server's kind,
+    # otherwise Django buffers the whole (never ending) stream
+    if isinstance(request, ASGIRequest):
+        events = stream_feeds(feeds, keys=symbols or None)
+    else:
+        events = iter_feeds(feeds, keys=symbols or None)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Disable proxy buffering (nginx)
+    response["X-Accel-Buffering"] = "no"
+    return response
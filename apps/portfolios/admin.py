@@ -1,6 +1,15 @@
 from django.contrib import admin
-from .models import Portfolio, Investment
+from .models import (
+    Portfolio,
+    Investment,
+    Holding,
+    TransactionUpload,
+    PortfolioDailySnapshot,
+)
 
 
 admin.site.register(Portfolio)
 admin.site.register(Investment)
+admin.site.register(Holding)
+admin.site.register(TransactionUpload)
+admin.site.register(PortfolioDailySnapshot)
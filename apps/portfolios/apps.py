@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PortfoliosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.portfolios"
+
+    def ready(self):
+        # Import signals here to avoid circular imports
+        from . import signals  # noqa: F401
@@ -0,0 +1,131 @@
+"""
+Comparison of the transactions made on two dates.
+
+The transactions on both dates are totalled per stock in a single grouped query,
+with the cost (fees included) computed in SQL, and the totals are then joined by ticker.
+"""
+
+import datetime
+import decimal
+import typing
+from django.db import models
+
+from .models import Investment, TransactionType
+from .valuation import TWO_PLACES, get_investment_value_expressions
+
+
+class TransactionTotals(typing.NamedTuple):
+    """Totals of the transactions in a stock on a date"""
+
+    buy_qty: decimal.Decimal
+    sell_qty: decimal.Decimal
+    net_qty: decimal.Decimal
+    avg_rate: decimal.Decimal
+    """Average rate of the transactions, weighted by quantity"""
+    total_cost: decimal.Decimal
+
+
+EMPTY_TOTALS = TransactionTotals(
+    buy_qty=decimal.Decimal(0),
+    sell_qty=decimal.Decimal(0),
+    net_qty=decimal.Decimal(0),
+    avg_rate=decimal.Decimal(0),
+    total_cost=decimal.Decimal(0),
+)
+
+
+def _to_decimal(value) -> decimal.Decimal:
+    # Some database backends return annotated decimals as floats
+    if value is None:
+        return decimal.Decimal(0)
+    return decimal.Decimal(str(value))
+
+
+def get_transaction_totals(
+    investments: models.QuerySet[Investment], dates: typing.Iterable[datetime.date]
+) -> typing.Dict[typing.Tuple[datetime.date, str], typing.Tuple[str, TransactionTotals]]:
+    """
+    Returns the totals of the transactions in each stock on each of the dates.
+
+    :param investments: The transactions.
+    :param dates: The transaction dates.
+    :return: A mapping of (date, ticker) to the stock's title and totals.
+    """
+    cost = get_investment_value_expressions()["cost"]
+    rows = (
+        investments.filter(transaction_date__in=list(dates), stock__isnull=False)
+        .order_by()
+        .values("transaction_date", "stock__ticker", "stock__title")
+        .annotate(
+            buy_qty=models.Sum(
+                "quantity", filter=models.Q(transaction_type=TransactionType.BUY)
+            ),
+            sell_qty=models.Sum(
+                "quantity", filter=models.Q(transaction_type=TransactionType.SELL)
+            ),
+            total_qty=models.Sum("quantity"),
+            rate_qty=models.Sum(models.F("rate") * models.F("quantity")),
+            total_cost=models.Sum(cost),
+        )
+    )
+
+    totals = {}
+    for row in rows:
+        buy_qty = _to_decimal(row["buy_qty"])
+        sell_qty = _to_decimal(row["sell_qty"])
+        total_qty = _to_decimal(row["total_qty"])
+        avg_rate = (
+            _to_decimal(row["rate_qty"]) / total_qty if total_qty else decimal.Decimal(0)
+        )
+        totals[(row["transaction_date"], row["stock__ticker"])] = (
+            row["stock__title"],
+            TransactionTotals(
+                buy_qty=buy_qty,
+                sell_qty=sell_qty,
+                net_qty=buy_qty - sell_qty,
+                avg_rate=avg_rate,
+                total_cost=_to_decimal(row["total_cost"]).quantize(
+                    TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+                ),
+            ),
+        )
+    return totals
+
+
+def compare_transactions(
+    investments: models.QuerySet[Investment],
+    date1: typing.Optional[datetime.date],
+    date2: typing.Optional[datetime.date],
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Compare the transactions in each stock on two dates.
+
+    :param investments: The transactions.
+    :param date1: The first date.
+    :param date2: The date compared against.
+    :return: A comparison per stock traded on either date, ordered by ticker.
+        Differences are of the first date's totals from the second's.
+    """
+    dates = [date for date in (date1, date2) if date]
+    if not dates:
+        return []
+
+    totals = get_transaction_totals(investments, dates)
+    comparison_data = []
+    for ticker in sorted({ticker for _, ticker in totals}):
+        title1, totals1 = totals.get((date1, ticker), (None, EMPTY_TOTALS))
+        title2, totals2 = totals.get((date2, ticker), (None, EMPTY_TOTALS))
+        comparison_data.append(
+            {
+                "ticker": ticker,
+                "name": title1 or title2,
+                "date1": totals1._asdict(),
+                "date2": totals2._asdict(),
+                "diff": {
+                    "qty": totals1.net_qty - totals2.net_qty,
+                    "rate": totals1.avg_rate - totals2.avg_rate,
+                    "cost": totals1.total_cost - totals2.total_cost,
+                },
+            }
+        )
+    return comparison_data
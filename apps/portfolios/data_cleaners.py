@@ -60,6 +60,7 @@ class InvestmentDataCleaner(cl.ModelDataCleaner[Investment]):
         "stock",
         "quantity",
         "brokerage_fee",
+        "import_hash",
         "added_at",
         "updated_at",
     ]
@@ -1,14 +1,13 @@
-from concurrent.futures import ThreadPoolExecutor
 import datetime
-import decimal
-import functools
 import typing
-import asyncio
-from asgiref.sync import sync_to_async
+import numpy as np
 from django.db import models
 
 from .models import Investment, Portfolio
+from .performance import get_portfolio_return_curve
+from .snapshots import get_portfolio_snapshots_curve
 from apps.stocks.models import KSE100Rate, Stock
+from apps.stocks.helpers import get_kse100_closes
 from helpers.utils.colors import random_colors
 from helpers.utils.models import get_objects_within_datetime_range
 from helpers.utils.datetime import (
@@ -17,7 +16,6 @@ from helpers.utils.datetime import (
     timedelta_code_to_datetime_range,
 )
 from helpers.caching import ttl_cache
-from helpers.utils.misc import merge_dicts
 
 
 def get_portfolio_stocks(portfolio: Portfolio):
@@ -30,16 +28,11 @@ def get_portfolio_stocks(portfolio: Portfolio):
 
 def get_portfolio_allocation_data(portfolio: Portfolio) -> typing.Dict[str, float]:
     """
-    Returns a mapping of the ticker symbols of stocks invested in,
+    Returns a mapping of the ticker symbols of stocks held,
     to the respective cost amounts invested in them, in a portfolio
     """
-    allocation_data = {}
-
-    for investment in portfolio.investments.select_related("stock").all():
-        allocation_data[investment.symbol] = allocation_data.get(
-            investment.symbol, 0.00
-        ) + float(abs(investment.cost))
-    return allocation_data
+    holdings = portfolio.holdings.exclude(quantity=0).select_related("stock")
+    return {holding.stock.ticker: float(abs(holding.cost)) for holding in holdings}
 
 
 def get_portfolio_allocation_piechart_data(portfolio: Portfolio) -> str:
@@ -49,8 +42,8 @@ def get_portfolio_allocation_piechart_data(portfolio: Portfolio) -> str:
     return {"data": allocation_data, "colors": colors}
 
 
-# The investments based function for fetching allocation
-# data is slightly efficient than the portfolio based function
+# Allocation data of arbitrary investments, e.g. a page of a portfolio's investments.
+# Use the portfolio based function for the allocation of the portfolio's holdings
 def get_investments_allocation_data(
     investments: models.QuerySet[Investment],
 ) -> typing.Dict[str, float]:
@@ -133,6 +126,9 @@ def get_kse_performance_data(
     Returns the KSE100 performance data for the time period
     specified by the datetime filter.
 
+    The KSE100 closes for the whole period are loaded in a single query.
+    Dates without a close take the close of the nearest previous trading day.
+
     :param dt_filter: The datetime filter to use.
     :param timezone: The preferred timezone to use.
     """
@@ -144,77 +140,44 @@ def get_kse_performance_data(
             if earliest_rate:
                 start_date = earliest_rate.date
 
-        delta = None
-
-        def get_kse_performance_data_for_period(period_start, period_end):
-            nonlocal kse_performance_data, delta
-            if delta is None:
-                delta = period_end - period_start
-
-            pre_period_start = period_start - delta
-
-            pre_period_start_price = KSE100Rate.get_close_on_date(pre_period_start)
-            period_start_price = KSE100Rate.get_close_on_date(period_start)
-            period_end_price = KSE100Rate.get_close_on_date(period_end)
-
-            percentage_change_at_period_start = 0.00
-            percentage_change_at_period_end = 0.00
-            if pre_period_start_price and period_start_price:
-                percentage_change_at_period_start = (
-                    (period_start_price - pre_period_start_price)
-                    / pre_period_start_price
-                ) * 100
-
-            if period_start_price and period_end_price:
-                percentage_change_at_period_end = (
-                    (period_end_price - period_start_price) / period_start_price
-                ) * 100
-
-            return {
-                period_start.isoformat(): percentage_change_at_period_start,
-                period_end.isoformat(): percentage_change_at_period_end,
-            }
-
-        async def main():
-            async_func = sync_to_async(get_kse_performance_data_for_period)
-            tasks = []
-            for periods in split(start_date, end_date, parts=5):
-                task = asyncio.create_task(async_func(*periods))
-                tasks.append(task)
-
-            return await asyncio.gather(*tasks)
-
-        results = asyncio.run(main())
-        # Merge the results such that the most recent result updates the existing one
-        kse_performance_data = functools.reduce(merge_dicts, results)
-        return kse_performance_data
+        periods = list(split(start_date, end_date, parts=5))
+        period_starts = np.array([start for start, _ in periods], dtype="datetime64[D]")
+        period_ends = np.array([end for _, end in periods], dtype="datetime64[D]")
+        # Each period start is compared with the close a period length before it
+        delta = np.timedelta64(periods[0][1] - periods[0][0], "D")
+        pre_period_starts = period_starts - delta
 
+        kse100_closes = get_kse100_closes(pre_period_starts[0].item(), end_date)
+        pre_period_start_prices = kse100_closes.on_or_before(pre_period_starts)
+        period_start_prices = kse100_closes.on_or_before(period_starts)
+        period_end_prices = kse100_closes.on_or_before(period_ends)
 
-def get_portfolio_percentage_return_on_dates(
-    portfolio: Portfolio, *dates: datetime.date
-):
-    if not dates:
-        raise ValueError()
+        percentage_changes_at_period_starts = _percentage_changes(
+            pre_period_start_prices, period_start_prices
+        )
+        percentage_changes_at_period_ends = _percentage_changes(
+            period_start_prices, period_end_prices
+        )
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        result = executor.map(portfolio.get_percentage_return_on_investments, dates)
-    return list(result)
+        # A period's start is the previous period's end. The change at the start wins
+        kse_performance_data = {}
+        for period_start, period_end, change_at_start, change_at_end in zip(
+            period_starts.tolist(),
+            period_ends.tolist(),
+            percentage_changes_at_period_starts.tolist(),
+            percentage_changes_at_period_ends.tolist(),
+        ):
+            kse_performance_data[period_start.isoformat()] = change_at_start
+            kse_performance_data[period_end.isoformat()] = change_at_end
+        return kse_performance_data
 
 
-@ttl_cache
-def get_investment_percentage_return_on_dates(
-    investment: Investment, *dates: datetime.date
-):
-    if not dates:
-        raise ValueError()
-
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        result = executor.map(
-            lambda date: investment.get_percentage_return_on_date(date)
-            or decimal.Decimal(0),
-            dates,
-        )
-    return list(result)
+def _percentage_changes(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Returns the percentage changes from `old` to `new`, or 0 where either is missing or `old` is 0"""
+    valid = ~np.isnan(old) & ~np.isnan(new) & (old != 0)
+    changes = np.zeros(len(old))
+    np.divide((new - old) * 100, old, out=changes, where=valid)
+    return changes
 
 
 def get_portfolio_performance_data(
@@ -223,79 +186,28 @@ def get_portfolio_performance_data(
     timezone: str = None,
     stocks: typing.Optional[typing.List[str]] = None,
 ) -> typing.Dict[str, typing.Dict[str, float]]:
-    portfolio_investments = (
-        portfolio.investments.only(
-            "transaction_type",
-            "stock",
-            "rate",
-            "quantity",
-            "brokerage_fee",
-            *Investment.ADDITIONAL_FEES,
-        )
-        .select_related("stock")
-        # .prefetch_related("stock__rates")
-    )
+    """
+    Returns the percentage return on the portfolio's investments on every trading day
+    within the time period specified by the datetime filter.
 
+    :param portfolio: The portfolio to get performance data for.
+    :param dt_filter: The datetime filter to use.
+    :param timezone: The preferred timezone to use.
+    :param stocks: Return performance data for each of these stocks (ticker symbols),
+        instead of the whole portfolio.
+    """
     with activate_timezone(timezone):
         start_date, end_date = datetime_filter_to_date_range(dt_filter)
         if not start_date:
             # If the start date is None, use the date the portfolio was created
             start_date = portfolio.created_at.date()
 
-        def get_portfolio_percentage_return_values_for_period(period_start, period_end):
-            nonlocal percentage_return_values
-            percentage_returns = get_portfolio_percentage_return_on_dates(
-                portfolio, period_start, period_end
-            )
-            return {
-                period_start.isoformat(): float(percentage_returns[0]),
-                period_end.isoformat(): float(percentage_returns[1]),
-            }
-
-        def get_investment_percentage_return_values_for_period(
-            period_start, period_end
-        ):
-            nonlocal percentage_return_values
-            nonlocal stocks
-            period_start_iso_fmt = period_start.isoformat()
-            period_end_iso_fmt = period_end.isoformat()
-            result = {}
-
-            for stock in stocks:
-                investment: Investment = portfolio_investments.filter(
-                    stock__ticker=stock
-                ).first()
-                if not investment:
-                    continue
-                percentage_returns = get_investment_percentage_return_on_dates(
-                    investment, period_start, period_end
-                )
-                result[stock] = {
-                    period_start_iso_fmt: float(percentage_returns[0]),
-                    period_end_iso_fmt: float(percentage_returns[1]),
-                }
-            return result
-
         if stocks:
-            func = get_investment_percentage_return_values_for_period
-        else:
-            func = get_portfolio_percentage_return_values_for_period
-
-        async def main():
-            async_func = sync_to_async(func)
-            tasks = []
-            for period in split(start_date, end_date, parts=5):
-                task = asyncio.create_task(async_func(*period))
-                tasks.append(task)
-
-            return await asyncio.gather(*tasks)
-
-        results = asyncio.run(main())
-        # Merge the results such that the most recent result updates the existing one
-        percentage_return_values = functools.reduce(merge_dicts, results)
-        if stocks:
-            return percentage_return_values
-        return {"all": percentage_return_values}
+            return get_portfolio_return_curve(
+                portfolio, start_date, end_date, stocks=stocks
+            )
+        # The whole portfolio's past performance is read from its daily snapshots
+        return {"all": get_portfolio_snapshots_curve(portfolio, start_date, end_date)}
 
 
 def get_portfolio_performance_graph_data(
@@ -0,0 +1,246 @@
+"""
+Holdings ledger.
+
+A portfolio's holding in a stock is its net position from all of its investments in
+the stock, at average cost. Trades that open or add to the position change its average
+cost per unit (fees included). Trades that reduce or close the position realize the
+difference between their cost per unit and the average cost.
+
+When an investment is added, it is applied to the stored holding. Holdings are rebuilt
+from the investments in the stock otherwise, i.e. on changes, deletes, back-dated
+investments and bulk uploads.
+"""
+
+import decimal
+import typing
+from django.db import models, transaction
+
+from .models import Holding, Investment, Portfolio, TransactionType
+from .valuation import get_investment_value_expressions
+from apps.stocks.models import Stock
+
+
+TWO_PLACES = decimal.Decimal("0.01")
+FOUR_PLACES = decimal.Decimal("0.0001")
+
+TRADE_ORDERING = (
+    models.F("transaction_date").asc(nulls_first=True),
+    models.F("transaction_time").asc(nulls_first=True),
+    models.F("added_at").asc(),
+)
+"""Order in which investments are applied to holdings"""
+
+HoldingKey = typing.Tuple[typing.Any, typing.Any]
+"""(portfolio ID, stock ID)"""
+
+
+class Position(typing.NamedTuple):
+    """A position in a stock"""
+
+    quantity: decimal.Decimal = decimal.Decimal("0.00")
+    average_cost: decimal.Decimal = decimal.Decimal("0.0000")
+    realized_return: decimal.Decimal = decimal.Decimal("0.00")
+
+
+def apply_trade(
+    position: Position,
+    transaction_type: str,
+    quantity: decimal.Decimal,
+    cost: decimal.Decimal,
+) -> Position:
+    """
+    Returns the position after a trade, at average cost.
+
+    :param position: The position before the trade.
+    :param transaction_type: The type of the trade. A `TransactionType`.
+    :param quantity: The quantity traded.
+    :param cost: The cost of the trade, as `Investment.cost`.
+    """
+    if not quantity:
+        return position
+
+    held, average_cost, realized_return = position
+    unit_cost = cost / quantity
+    traded = quantity if transaction_type == TransactionType.BUY else -quantity
+
+    if not held or (held > 0) == (traded > 0):
+        # Opening or adding to the position
+        average_cost = (abs(held) * average_cost + quantity * unit_cost) / (
+            abs(held) + quantity
+        )
+    else:
+        closed = min(quantity, abs(held))
+        direction = 1 if held > 0 else -1
+        realized_return += closed * (unit_cost - average_cost) * direction
+        if quantity > closed:
+            # The trade closed the position, and opened one in the other direction
+            average_cost = unit_cost
+        elif quantity == abs(held):
+            average_cost = decimal.Decimal(0)
+
+    return Position(
+        quantity=held + traded,
+        average_cost=average_cost.quantize(FOUR_PLACES, rounding=decimal.ROUND_HALF_UP),
+        realized_return=realized_return.quantize(
+            TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+        ),
+    )
+
+
+def get_trades(investments: models.QuerySet) -> models.QuerySet:
+    """
+    Returns the trades of investments, in the order they are applied to holdings.
+
+    Works with historical (migration) models too.
+
+    :param investments: The investments.
+    :return: A queryset of (portfolio ID, stock ID, transaction type, quantity, cost) tuples.
+    """
+    return (
+        investments.filter(portfolio__isnull=False, stock__isnull=False)
+        .annotate(cost_amount=get_investment_value_expressions()["cost"])
+        .order_by(*TRADE_ORDERING)
+        .values_list(
+            "portfolio_id", "stock_id", "transaction_type", "quantity", "cost_amount"
+        )
+    )
+
+
+def _to_cost(cost) -> decimal.Decimal:
+    # Some database backends return annotated decimals as floats
+    return decimal.Decimal(str(cost)).quantize(TWO_PLACES, rounding=decimal.ROUND_HALF_UP)
+
+
+def compute_positions(
+    trades: typing.Iterable[typing.Tuple],
+) -> typing.Dict[HoldingKey, Position]:
+    """
+    Returns the positions from trades.
+
+    :param trades: (portfolio ID, stock ID, transaction type, quantity, cost) tuples, in order.
+    """
+    positions: typing.Dict[HoldingKey, Position] = {}
+    for portfolio_id, stock_id, transaction_type, quantity, cost in trades:
+        key = (portfolio_id, stock_id)
+        positions[key] = apply_trade(
+            positions.get(key, Position()),
+            transaction_type,
+            decimal.Decimal(quantity),
+            _to_cost(cost),
+        )
+    return positions
+
+
+def _pks(objects: typing.Iterable, model: typing.Type[models.Model]) -> typing.Set:
+    return {obj.pk if isinstance(obj, model) else obj for obj in objects}
+
+
+@transaction.atomic
+def rebuild_holdings(
+    portfolios: typing.Iterable[typing.Union[Portfolio, typing.Any]],
+    stocks: typing.Optional[typing.Iterable[typing.Union[Stock, typing.Any]]] = None,
+) -> int:
+    """
+    Rebuild holdings from investments.
+
+    :param portfolios: The portfolios, or their IDs, whose holdings should be rebuilt.
+    :param stocks: Only rebuild the holdings in these stocks, or stock IDs.
+    :return: The number of holdings written.
+    """
+    portfolio_ids = _pks(portfolios, Portfolio)
+    investments = Investment.objects.filter(portfolio_id__in=portfolio_ids)
+    holdings = Holding.objects.filter(portfolio_id__in=portfolio_ids)
+    if stocks is not None:
+        stock_ids = _pks(stocks, Stock)
+        investments = investments.filter(stock_id__in=stock_ids)
+        holdings = holdings.filter(stock_id__in=stock_ids)
+
+    positions = compute_positions(get_trades(investments))
+    stale_holding_ids = [
+        holding_id
+        for holding_id, portfolio_id, stock_id in holdings.values_list(
+            "id", "portfolio_id", "stock_id"
+        )
+        if (portfolio_id, stock_id) not in positions
+    ]
+    if stale_holding_ids:
+        Holding.objects.filter(id__in=stale_holding_ids).delete()
+
+    Holding.objects.bulk_create(
+        [
+            Holding(
+                portfolio_id=portfolio_id,
+                stock_id=stock_id,
+                quantity=position.quantity,
+                average_cost=position.average_cost,
+                realized_return=position.realized_return,
+            )
+            for (portfolio_id, stock_id), position in positions.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["portfolio", "stock"],
+        update_fields=["quantity", "average_cost", "realized_return", "updated_at"],
+    )
+    return len(positions)
+
+
+def _is_back_dated(investment: Investment) -> bool:
+    """Whether other investments in the holding are applied after the investment"""
+    date, time = investment.transaction_date, investment.transaction_time
+    if date is None:
+        later = models.Q(transaction_date__isnull=False)
+    elif time is None:
+        later = models.Q(transaction_date__gt=date) | models.Q(
+            transaction_date=date, transaction_time__isnull=False
+        )
+    else:
+        later = models.Q(transaction_date__gt=date) | models.Q(
+            transaction_date=date, transaction_time__gt=time
+        )
+    return (
+        Investment.objects.filter(
+            portfolio_id=investment.portfolio_id, stock_id=investment.stock_id
+        )
+        .exclude(pk=investment.pk)
+        .filter(later)
+        .exists()
+    )
+
+
+@transaction.atomic
+def add_investment_to_holding(investment: Investment) -> None:
+    """
+    Apply a new investment to its holding.
+
+    The holding is rebuilt instead if the investment is back-dated.
+    """
+    if investment.portfolio_id is None or investment.stock_id is None:
+        return
+    if _is_back_dated(investment):
+        rebuild_holdings([investment.portfolio_id], [investment.stock_id])
+        return
+
+    holding = (
+        Holding.objects.select_for_update()
+        .filter(portfolio_id=investment.portfolio_id, stock_id=investment.stock_id)
+        .first()
+    )
+    if holding is None:
+        holding = Holding(
+            portfolio_id=investment.portfolio_id, stock_id=investment.stock_id
+        )
+        position = Position()
+    else:
+        position = Position(
+            holding.quantity, holding.average_cost, holding.realized_return
+        )
+
+    _, _, transaction_type, quantity, cost = get_trades(
+        Investment.objects.filter(pk=investment.pk)
+    ).get()
+    position = apply_trade(
+        position, transaction_type, decimal.Decimal(quantity), _to_cost(cost)
+    )
+    holding.quantity, holding.average_cost, holding.realized_return = position
+    holding.save()
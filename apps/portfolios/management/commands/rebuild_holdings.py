@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.portfolios.models import Portfolio
+from apps.portfolios.holdings import rebuild_holdings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the holdings of portfolios from their investments."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--portfolios",
+            nargs="+",
+            help="IDs of the portfolios to rebuild. Defaults to all portfolios.",
+        )
+
+    def handle(self, *args, **options):
+        portfolio_ids = options["portfolios"]
+        if portfolio_ids is None:
+            portfolio_ids = Portfolio.objects.values_list("id", flat=True)
+
+        self.stdout.write("Rebuilding holdings...")
+        written = 0
+        portfolio_ids = list(portfolio_ids)
+        # Rebuild in chunks to bound memory use
+        for index in range(0, len(portfolio_ids), 100):
+            written += rebuild_holdings(portfolio_ids[index : index + 100])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {written} holdings of {len(portfolio_ids)} portfolios"
+            )
+        )
@@ -0,0 +1,100 @@
+import datetime
+from django.core.management.base import BaseCommand
+
+from apps.portfolios.models import Portfolio
+from apps.portfolios.snapshots import (
+    invalidate_portfolio_snapshots,
+    update_portfolio_snapshots,
+)
+
+
+class Command(BaseCommand):
+    help = "Write, backfill or schedule the writing of the daily snapshots of portfolios."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--portfolios",
+            nargs="+",
+            help="IDs of the portfolios to update. Defaults to all portfolios.",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=datetime.date.fromisoformat,
+            help="Write snapshots up to this date (YYYY-MM-DD). Defaults to today.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Delete the existing snapshots, and backfill them again.",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="""
+            Schedule a task to write the snapshots of all portfolios every night.
+
+            Deletes the existing schedule if it already exists.
+
+            Defaults to repeating indefinitely at 19:00 on weekdays.
+            """,
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=-1,
+            help="Number of times to repeat the task. -1 to repeat indefinitely.",
+        )
+        parser.add_argument(
+            "--cron",
+            type=str,
+            default="0 19 * * 1-5",
+            help="Cron expression defining the interval at which the task should run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            self.schedule_update(repeats=options["repeats"], cron=options["cron"])
+            return
+
+        portfolios = Portfolio.objects.order_by()
+        if options["portfolios"]:
+            portfolios = portfolios.filter(id__in=options["portfolios"])
+
+        self.stdout.write("Updating portfolio snapshots...")
+        written = 0
+        count = 0
+        for portfolio in portfolios.iterator(chunk_size=100):
+            if options["rebuild"]:
+                invalidate_portfolio_snapshots(portfolio.pk)
+            try:
+                written += update_portfolio_snapshots(
+                    portfolio, end_date=options["end_date"]
+                )
+            except Exception as exc:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Error updating the snapshots of portfolio {portfolio.pk}: {exc}"
+                    )
+                )
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written} snapshots of {count} portfolios")
+        )
+
+    def schedule_update(self, **kwargs):
+        from apps.portfolios.scheduled_tasks import schedule_portfolio_snapshots_update
+
+        try:
+            self.stdout.write(
+                f"Scheduling portfolio snapshots update to run every {kwargs.get('cron')}..."
+            )
+            schedule_portfolio_snapshots_update(**kwargs)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Portfolio snapshots update scheduled to run every {kwargs.get('cron')}."
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(
+                self.style.ERROR(f"Error scheduling portfolio snapshots update: {exc}")
+            )
@@ -0,0 +1,185 @@
+# Generated by Django 5.1 on 2026-10-19 18:40
+
+import decimal
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+TWO_PLACES = decimal.Decimal("0.01")
+FOUR_PLACES = decimal.Decimal("0.0001")
+
+# Frozen copies of the investment fees and the holdings ledger at the time of this migration
+ADDITIONAL_FEES = (
+    "commission",
+    "cdc",
+    "psx",
+    "secp",
+    "nccpl",
+    "cvt",
+    "whts",
+    "whtc",
+    "adv_tax",
+    "sst",
+    "laga",
+    "nlaga",
+    "fed",
+    "misc",
+)
+
+
+def get_cost(investment):
+    """Returns the cost of an investment, as `Investment.cost`"""
+    base_cost = (investment["rate"] * investment["quantity"]).quantize(
+        TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+    )
+    additional_fees = sum(
+        (investment[field] or decimal.Decimal(0) for field in ADDITIONAL_FEES),
+        decimal.Decimal(0),
+    ).quantize(TWO_PLACES, rounding=decimal.ROUND_HALF_UP)
+    total_fees = (additional_fees + investment["brokerage_fee"]) * investment["quantity"]
+    if investment["transaction_type"] == "sell":
+        return base_cost - total_fees
+    return base_cost + total_fees
+
+
+def apply_trade(position, transaction_type, quantity, cost):
+    """Returns the (quantity, average cost, realized return) position after a trade, at average cost"""
+    if not quantity:
+        return position
+
+    held, average_cost, realized_return = position
+    unit_cost = cost / quantity
+    traded = quantity if transaction_type == "buy" else -quantity
+
+    if not held or (held > 0) == (traded > 0):
+        average_cost = (abs(held) * average_cost + quantity * unit_cost) / (
+            abs(held) + quantity
+        )
+    else:
+        closed = min(quantity, abs(held))
+        direction = 1 if held > 0 else -1
+        realized_return += closed * (unit_cost - average_cost) * direction
+        if quantity > closed:
+            average_cost = unit_cost
+        elif quantity == abs(held):
+            average_cost = decimal.Decimal(0)
+
+    return (
+        held + traded,
+        average_cost.quantize(FOUR_PLACES, rounding=decimal.ROUND_HALF_UP),
+        realized_return.quantize(TWO_PLACES, rounding=decimal.ROUND_HALF_UP),
+    )
+
+
+def build_holdings(apps, schema_editor):
+    """Build the holdings of existing investments"""
+    Investment = apps.get_model("portfolios", "Investment")
+    Holding = apps.get_model("portfolios", "Holding")
+
+    trades = (
+        Investment.objects.filter(portfolio__isnull=False, stock__isnull=False)
+        .order_by(
+            models.F("transaction_date").asc(nulls_first=True),
+            models.F("transaction_time").asc(nulls_first=True),
+            models.F("added_at").asc(),
+        )
+        .values(
+            "portfolio_id",
+            "stock_id",
+            "transaction_type",
+            "quantity",
+            "rate",
+            "brokerage_fee",
+            *ADDITIONAL_FEES,
+        )
+    )
+    empty_position = (decimal.Decimal("0.00"), decimal.Decimal("0.0000"), decimal.Decimal("0.00"))
+    positions = {}
+    for trade in trades.iterator(chunk_size=2000):
+        key = (trade["portfolio_id"], trade["stock_id"])
+        positions[key] = apply_trade(
+            positions.get(key, empty_position),
+            trade["transaction_type"],
+            trade["quantity"],
+            get_cost(trade),
+        )
+
+    Holding.objects.bulk_create(
+        [
+            Holding(
+                portfolio_id=portfolio_id,
+                stock_id=stock_id,
+                quantity=quantity,
+                average_cost=average_cost,
+                realized_return=realized_return,
+            )
+            for (portfolio_id, stock_id), (quantity, average_cost, realized_return) in positions.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolios", "0008_alter_investment_adv_tax_and_more"),
+        ("stocks", "0011_alter_rate_added_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Holding",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "average_cost",
+                    models.DecimalField(decimal_places=4, default=0, max_digits=16),
+                ),
+                (
+                    "realized_return",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "portfolio",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holdings",
+                        to="portfolios.portfolio",
+                    ),
+                ),
+                (
+                    "stock",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="stocks.stock",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Holding",
+                "verbose_name_plural": "Holdings",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("portfolio", "stock"),
+                        name="unique_portfolio_stock_holding",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_holdings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1 on 2026-10-19 18:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0010_investment_import_hash_transactionupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioDailySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('invested_capital', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('cash', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('total_return', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('daily_return', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('cumulative_return', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_snapshots', to='portfolios.portfolio')),
+            ],
+            options={
+                'verbose_name': 'Portfolio daily snapshot',
+                'verbose_name_plural': 'Portfolio daily snapshots',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('portfolio', 'date'), name='unique_portfolio_daily_snapshot')],
+            },
+        ),
+    ]
@@ -1,18 +1,16 @@
 import functools
 import decimal
 import uuid
-import math
 import datetime
 import typing
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from concurrent.futures import ThreadPoolExecutor
 from asgiref.sync import sync_to_async
 import asyncio
 
-from helpers.caching import ttl_cache
+from apps.stocks.models import Stock
 from helpers.utils.time import timeit
 
 
@@ -81,13 +79,21 @@ class Portfolio(models.Model):
     @property
     def investments_costs(self):
         """Calculates and returns the cost of each investment in the portfolio."""
+        from .valuation import annotate_investment_values
 
-        def get_cost(investment):
-            return investment.cost
+        return annotate_investment_values(self.investments.all()).values_list(
+            "cost_amount", flat=True
+        )
 
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            costs = executor.map(get_cost, self.investments.all())
-        return costs
+    @functools.cached_property
+    def valuation(self):
+        """
+        The current valuation of the portfolio's investments.
+
+        Can be set in advance for many portfolios at once,
+        with the valuations from `valuation.get_portfolio_valuations`.
+        """
+        return self.get_valuation()
 
     @functools.cached_property
     def invested_capital(self):
@@ -96,10 +102,7 @@ class Portfolio(models.Model):
 
         the total capital used as investment cost
         """
-        total_investments_cost = math.fsum(self.investments_costs)
-        return decimal.Decimal.from_float(total_investments_cost).quantize(
-            decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
-        )
+        return self.valuation.invested_capital
 
     @property
     def total_return_on_investments(self):
@@ -134,32 +137,37 @@ class Portfolio(models.Model):
         """
         return self.get_total_investments_value()
 
+    def get_valuation(self, date: typing.Optional[datetime.date] = None):
+        """
+        Values the portfolio's investments in a single query.
+
+        Valuations are cached in the valuation cache until the portfolio's
+        investments change or new rates are ingested.
+
+        :param date: The date to value the investments on. If not provided, the latest rates are used.
+        :return: A `valuation.PortfolioValuation`.
+        """
+        from .valuation import get_cached_portfolio_valuation
+
+        return get_cached_portfolio_valuation(self.pk, date)
+
     def get_returns_on_investments(self, date: typing.Optional[datetime.date] = None):
         """
         Calculates and returns the return on each investment in the portfolio.
 
         :param date: The date to calculate the return on investments. If not provided, the current date is used.
-        :return: A generator of the return on investments for each investment in the portfolio.
+        :return: The return on investments for each investment in the portfolio.
         """
+        from .valuation import annotate_investment_values
 
-        def get_return_value(investment):
-            if date:
-                return_value = investment.get_return_value_on_date(date)
-            else:
-                return_value = investment.return_value
+        return_values = annotate_investment_values(
+            self.investments.all(), date
+        ).values_list("return_amount", flat=True)
+        return [
+            return_value if return_value is not None else decimal.Decimal(0.00)
+            for return_value in return_values
+        ]
 
-            if return_value is None:
-                return decimal.Decimal(0.00)
-            return return_value
-
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            return_values = executor.map(
-                get_return_value,
-                self.investments.all(),
-            )
-        return return_values
-
-    @ttl_cache(ttl=30)
     def get_total_return_on_investments(
         self, date: typing.Optional[datetime.date] = None
     ):
@@ -168,10 +176,9 @@ class Portfolio(models.Model):
 
         :param date: The date to calculate the return on investments. If not provided, the current date is used.
         """
-        total_return_on_investments = math.fsum(self.get_returns_on_investments(date))
-        return decimal.Decimal.from_float(total_return_on_investments).quantize(
-            decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
-        )
+        if date is None:
+            return self.valuation.total_return
+        return self.get_valuation(date).total_return
 
     def get_total_investments_value(self, date: typing.Optional[datetime.date] = None):
         """
@@ -323,6 +330,10 @@ class Investment(models.Model):
     ticket = models.CharField(max_length=100, blank=True, null=True)
     terminal = models.CharField(max_length=100, blank=True, null=True)
     bill = models.CharField(max_length=100, blank=True, null=True)
+    import_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False, db_index=True
+    )
+    """Content hash of the transactions file row the investment was imported from, if any."""
 
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -436,7 +447,6 @@ class Investment(models.Model):
             decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
         )
 
-    @ttl_cache(ttl=30)
     def get_value_on_date(
         self, date: datetime.date
     ) -> typing.Optional[decimal.Decimal]:
@@ -445,7 +455,8 @@ class Investment(models.Model):
 
         :param date: The date to calculate the value of the investment. If not provided, the current date is used.
         """
-        stock_price_on_date = self.stock.get_price_on_date(date)
+        # Use the stock's ID, to not fetch the stock just to get its (cached) price
+        stock_price_on_date = Stock.get_price_on_date_by_id(self.stock_id, date)
         if not stock_price_on_date:
             return None
 
@@ -486,3 +497,174 @@ class Investment(models.Model):
         return percentage_return.quantize(
             decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
         )
+
+
+class Holding(models.Model):
+    """
+    Model definition for a holding.
+
+    The position in a stock held by a portfolio, from all of the portfolio's investments in the stock.
+    Holdings are maintained by `holdings.py` as investments are added, changed or deleted.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    portfolio = models.ForeignKey(
+        "portfolios.Portfolio", on_delete=models.CASCADE, related_name="holdings"
+    )
+    stock = models.ForeignKey(
+        "stocks.Stock", on_delete=models.CASCADE, related_name="+"
+    )
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    """Net quantity held. Negative for a short position."""
+    average_cost = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    """Average cost per unit of the quantity held, including fees."""
+    realized_return = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    """Profit or loss realized from closing (part of) the position, at the average cost."""
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Holding")
+        verbose_name_plural = _("Holdings")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["portfolio", "stock"], name="unique_portfolio_stock_holding"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.quantity} {self.stock} @ {self.average_cost}"
+
+    @property
+    def cost(self) -> decimal.Decimal:
+        """The cost of the quantity held, at the average cost."""
+        cost = self.quantity * self.average_cost
+        return cost.quantize(decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP)
+
+
+class TransactionUploadStatus(models.TextChoices):
+    """Processing statuses of a transactions upload."""
+
+    PENDING = "pending", _("Pending")
+    PROCESSING = "processing", _("Processing")
+    COMPLETED = "completed", _("Completed")
+    FAILED = "failed", _("Failed")
+
+
+class TransactionUpload(models.Model):
+    """
+    Model definition for a transactions upload.
+
+    An uploaded transactions file, staged to storage and processed in the background
+    by `transactions_upload.process_transactions_upload`.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        "accounts.UserAccount",
+        on_delete=models.CASCADE,
+        related_name="transaction_uploads",
+    )
+    file = models.FileField(
+        upload_to="portfolios/transaction_uploads/%Y/%m/", blank=True, null=True
+    )
+    file_name = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    """SHA-256 hash of the file's content."""
+    status = models.CharField(
+        max_length=20,
+        choices=TransactionUploadStatus.choices,
+        default=TransactionUploadStatus.PENDING,
+    )
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_parsed = models.PositiveIntegerField(default=0)
+    """Number of rows validated and cleaned."""
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    """Number of rows skipped because they were imported before."""
+    errors = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Transaction upload")
+        verbose_name_plural = _("Transaction uploads")
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether the upload is done processing, successfully or not."""
+        return self.status in (
+            TransactionUploadStatus.COMPLETED,
+            TransactionUploadStatus.FAILED,
+        )
+
+    def update_progress(self, **fields) -> None:
+        """Set and save the given fields of the upload only."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if self.is_finished and self.completed_at is None:
+            self.completed_at = timezone.now()
+            fields["completed_at"] = self.completed_at
+        self.save(update_fields=[*fields, "updated_at"])
+
+    def get_progress(self) -> typing.Dict[str, typing.Any]:
+        """Returns the processing status and progress of the upload."""
+        return {
+            "id": str(self.id),
+            "file_name": self.file_name,
+            "status": self.status,
+            "is_finished": self.is_finished,
+            "rows_total": self.rows_total,
+            "rows_parsed": self.rows_parsed,
+            "rows_imported": self.rows_imported,
+            "rows_skipped": self.rows_skipped,
+            "errors": self.errors,
+            "created_at": self.created_at.isoformat(),
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+
+class PortfolioDailySnapshot(models.Model):
+    """
+    Model definition for a portfolio's daily snapshot.
+
+    The end-of-day valuation of a portfolio's investments on a trading day.
+    Snapshots are written by `snapshots.py`, and are deleted when the portfolio's
+    investments or capital change.
+    """
+
+    portfolio = models.ForeignKey(
+        "portfolios.Portfolio", on_delete=models.CASCADE, related_name="daily_snapshots"
+    )
+    date = models.DateField()
+    value = models.DecimalField(max_digits=20, decimal_places=2)
+    """The capital plus the total return."""
+    invested_capital = models.DecimalField(max_digits=20, decimal_places=2)
+    cash = models.DecimalField(max_digits=20, decimal_places=2)
+    """The capital less the invested capital."""
+    total_return = models.DecimalField(max_digits=20, decimal_places=2)
+    daily_return = models.DecimalField(max_digits=20, decimal_places=2)
+    """Percentage change in value from the previous snapshot."""
+    cumulative_return = models.DecimalField(max_digits=20, decimal_places=2)
+    """Percentage return on the invested capital."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Portfolio daily snapshot")
+        verbose_name_plural = _("Portfolio daily snapshots")
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["portfolio", "date"], name="unique_portfolio_daily_snapshot"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.portfolio} on {self.date}: {self.value}"
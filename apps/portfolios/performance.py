@@ -0,0 +1,227 @@
+"""
+Vectorized portfolio performance.
+
+The daily close prices of the stocks invested in are loaded for the whole period in a
+single query, which keeps only the last rate of each stock on each day, into a
+(trading days x stocks) matrix. Gaps are forward-filled, and the
+return curve of the portfolio (or of each stock invested in) is computed with NumPy
+array operations over all the investments at once.
+"""
+
+import datetime
+import typing
+import numpy as np
+from django.db import models
+from django.db.models.functions import RowNumber, TruncDate
+
+from .models import Investment, Portfolio
+from .valuation import annotate_investment_values
+from apps.stocks.models import Rate
+from apps.stocks.helpers import get_latest_prices
+
+
+class CloseMatrix(typing.NamedTuple):
+    """Daily close prices of stocks"""
+
+    dates: typing.List[datetime.date]
+    """Trading days, in ascending order"""
+    stock_ids: typing.List[typing.Any]
+    closes: np.ndarray
+    """
+    Close prices with shape (len(dates), len(stock_ids)), rounded to 2 decimal places.
+    NaN where the stock has no price yet.
+    """
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Returns a copy of a 2D array, with NaNs replaced by the last non-NaN value above them"""
+    rows = np.arange(values.shape[0])[:, np.newaxis]
+    last_valid_rows = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(last_valid_rows, axis=0, out=last_valid_rows)
+    return values[last_valid_rows, np.arange(values.shape[1])]
+
+
+def load_close_matrix(
+    stock_ids: typing.Iterable[typing.Any],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> CloseMatrix:
+    """
+    Load the daily close prices of stocks within a date range.
+
+    The trading days are the days on which any of the stocks has a rate.
+    The close price of a stock on a day is its last rate's close on that day.
+    Days on which a stock has no rate take its previous close,
+    including the last close before the start date.
+
+    :param stock_ids: IDs of the stocks.
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    """
+    stock_ids = list(dict.fromkeys(stock_ids))
+    # Only the last rate of each stock on each day is loaded
+    rates = list(
+        Rate.objects.filter(
+            stock_id__in=stock_ids,
+            added_at__date__gte=start_date,
+            added_at__date__lte=end_date,
+        )
+        .annotate(
+            date=TruncDate("added_at"),
+            row_number=models.Window(
+                RowNumber(),
+                partition_by=[models.F("stock_id"), TruncDate("added_at")],
+                order_by=models.F("added_at").desc(),
+            ),
+        )
+        .filter(row_number=1)
+        .order_by()
+        .values_list("date", "stock_id", "close")
+    )
+    if not rates:
+        return CloseMatrix(
+            dates=[], stock_ids=stock_ids, closes=np.empty((0, len(stock_ids)))
+        )
+
+    rate_dates, rate_stock_ids, rate_closes = zip(*rates)
+    dates, rows = np.unique(np.array(rate_dates, dtype="datetime64[D]"), return_inverse=True)
+    columns = {stock_id: column for column, stock_id in enumerate(stock_ids)}
+    rate_columns = np.fromiter(
+        (columns[stock_id] for stock_id in rate_stock_ids), dtype=np.intp, count=len(rates)
+    )
+
+    # Row 0 holds the last close before the start date, to fill leading gaps from
+    previous_prices = get_latest_prices(
+        stock_ids, date=start_date - datetime.timedelta(days=1)
+    )
+    closes = np.full((len(dates) + 1, len(stock_ids)), np.nan)
+    closes[0] = [float(previous_prices.get(stock_id, np.nan)) for stock_id in stock_ids]
+
+    closes[rows + 1, rate_columns] = np.asarray(rate_closes, dtype=float)
+
+    closes = np.round(forward_fill(closes)[1:], 2)
+    return CloseMatrix(dates=dates.tolist(), stock_ids=stock_ids, closes=closes)
+
+
+def get_return_percentages(returns: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """Returns `returns` as percentages of the absolute `costs`, or 0 where the cost is 0"""
+    costs = np.abs(costs)
+    percentages = np.divide(
+        returns * 100, costs, out=np.zeros_like(returns), where=costs != 0
+    )
+    return np.round(percentages, 2)
+
+
+class InvestmentReturns(typing.NamedTuple):
+    """Daily returns of investments"""
+
+    dates: typing.List[datetime.date]
+    """Trading days, in ascending order"""
+    stock_ids: typing.List[typing.Any]
+    """IDs of the stocks invested in. The columns of the close matrix."""
+    tickers: typing.Dict[typing.Any, str]
+    """Ticker symbols of the stocks invested in, by stock ID"""
+    columns: np.ndarray
+    """Stock (close matrix column) of each investment"""
+    costs: np.ndarray
+    """Cost of each investment"""
+    returns: np.ndarray
+    """
+    Returns with shape (len(dates), number of investments), rounded to 2 decimal places.
+    0 where the investment's stock has no (non-zero) price.
+    """
+
+
+def load_investment_returns(
+    investments: models.QuerySet[Investment],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> typing.Optional[InvestmentReturns]:
+    """
+    Load the return on each investment on every trading day within a date range.
+
+    :param investments: The investments.
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    :return: The returns, or None if there are no investments.
+    """
+    investments = list(
+        annotate_investment_values(investments)
+        .order_by()
+        .values_list("stock_id", "stock__ticker", "quantity", "cost_amount")
+    )
+    if not investments:
+        return None
+
+    stock_ids, tickers, quantities, costs = zip(*investments)
+    matrix = load_close_matrix(stock_ids, start_date, end_date)
+    columns = {stock_id: column for column, stock_id in enumerate(matrix.stock_ids)}
+    investment_columns = np.fromiter(
+        (columns[stock_id] for stock_id in stock_ids), dtype=np.intp, count=len(stock_ids)
+    )
+    quantities = np.asarray(quantities, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+
+    # (trading days x investments). Investments without a (non-zero) price have no return
+    prices = matrix.closes[:, investment_columns]
+    values = np.round(prices * quantities, 2)
+    returns = np.where(np.nan_to_num(prices) > 0, np.round(values - costs, 2), 0.0)
+    return InvestmentReturns(
+        dates=matrix.dates,
+        stock_ids=matrix.stock_ids,
+        tickers=dict(zip(stock_ids, tickers)),
+        columns=investment_columns,
+        costs=costs,
+        returns=returns,
+    )
+
+
+def get_portfolio_return_curve(
+    portfolio: Portfolio,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    stocks: typing.Optional[typing.List[str]] = None,
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """
+    Returns the percentage return on the portfolio's investments on every trading day
+    within a date range.
+
+    :param portfolio: The portfolio.
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    :param stocks: Return a curve for each of these stocks (ticker symbols),
+        instead of a single curve for the whole portfolio.
+    :return: A mapping of the curve names ("all", or the ticker symbols)
+        to mappings of ISO formatted dates to percentage returns.
+    :raises ValueError: If the start date is after the end date.
+    """
+    if start_date > end_date:
+        raise ValueError("The start date cannot be after the end date")
+
+    investments = portfolio.investments.all()
+    if stocks:
+        investments = investments.filter(stock__ticker__in=stocks)
+    investment_returns = load_investment_returns(investments, start_date, end_date)
+    if investment_returns is None:
+        return {} if stocks else {"all": {}}
+
+    dates = [date.isoformat() for date in investment_returns.dates]
+    returns, costs = investment_returns.returns, investment_returns.costs
+    if not stocks:
+        percentages = get_return_percentages(returns.sum(axis=1), costs.sum())
+        return {"all": dict(zip(dates, percentages.tolist()))}
+
+    # Aggregate the investments in each stock
+    columns = investment_returns.columns
+    stock_count = len(investment_returns.stock_ids)
+    stock_returns = np.zeros((len(dates), stock_count))
+    np.add.at(stock_returns, (slice(None), columns), returns)
+    stock_costs = np.bincount(columns, weights=costs, minlength=stock_count)
+    percentages = get_return_percentages(stock_returns, stock_costs)
+
+    return {
+        investment_returns.tickers[stock_id]: dict(
+            zip(dates, percentages[:, column].tolist())
+        )
+        for column, stock_id in enumerate(investment_returns.stock_ids)
+    }
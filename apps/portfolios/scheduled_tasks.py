@@ -0,0 +1,35 @@
+import datetime
+from django_q.tasks import schedule
+from django_q.models import Schedule
+from django.utils import timezone
+
+
+def schedule_portfolio_snapshots_update(
+    repeats: int = -1,
+    cron: str = "0 19 * * 1-5",
+):
+    """
+    Schedule the nightly task to write the daily snapshots of all portfolios.
+
+    Deletes the existing schedule if it already exists.
+
+    :param repeats: Number of times to repeat the task. -1 to repeat indefinitely.
+    :param cron: Cron expression defining the interval at which the task should run.
+        Should be after the market closes, in the django-q cluster's timezone.
+    """
+    task_name = "apps.portfolios.snapshots.update_all_portfolio_snapshots"
+    # Delete the schedule if it already exists
+    Schedule.objects.filter(func=task_name).delete()
+
+    schedule(
+        task_name,
+        q_options={
+            "retry": 3700,
+            "save": True,
+        },
+        timeout=3600,
+        schedule_type="C",
+        repeats=repeats,
+        cron=cron,
+        next_run=(timezone.now() + datetime.timedelta(seconds=10)),
+    )
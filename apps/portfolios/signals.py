@@ -0,0 +1,116 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Investment, Portfolio
+from .holdings import add_investment_to_holding, rebuild_holdings
+from .snapshots import invalidate_portfolio_snapshots, invalidate_snapshots_since
+from apps.stocks.models import Stock
+from apps.stocks.signals import rates_ingested
+from .valuation import invalidate_portfolio_valuations
+
+
+@receiver(pre_save, sender=Investment)
+def remember_investment_holding(sender, instance: Investment, raw=False, **kwargs):
+    """Remember the holding of a changed investment, in case it is moved to another holding"""
+    if raw or instance._state.adding:
+        return
+    instance._previous_holding_key = (
+        Investment.objects.filter(pk=instance.pk)
+        .values_list("portfolio_id", "stock_id")
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Portfolio)
+def remember_portfolio_capital(sender, instance: Portfolio, raw=False, **kwargs):
+    """Remember the capital of a changed portfolio"""
+    if raw or instance._state.adding:
+        return
+    instance._previous_capital = (
+        Portfolio.objects.filter(pk=instance.pk).values_list("capital", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Portfolio)
+def invalidate_portfolio_capital_snapshots(
+    sender, instance: Portfolio, created=False, raw=False, **kwargs
+):
+    """Invalidate the snapshots of a portfolio whose capital changed"""
+    if raw or created:
+        return
+    previous_capital = getattr(instance, "_previous_capital", None)
+    if previous_capital is not None and previous_capital != instance.capital:
+        invalidate_portfolio_snapshots(instance.pk)
+
+
+@receiver(post_save, sender=Investment)
+def update_investment_holding(
+    sender, instance: Investment, created=False, raw=False, **kwargs
+):
+    """Update the holding, and invalidate the cached valuations, of an added or changed investment"""
+    if raw:
+        return
+    if created:
+        add_investment_to_holding(instance)
+        invalidate_portfolio_valuations(instance.portfolio_id)
+        invalidate_portfolio_snapshots(instance.portfolio_id)
+        return
+
+    holding_keys = {(instance.portfolio_id, instance.stock_id)}
+    previous_holding_key = getattr(instance, "_previous_holding_key", None)
+    if previous_holding_key:
+        holding_keys.add(previous_holding_key)
+    for portfolio_id, stock_id in holding_keys:
+        if portfolio_id is not None and stock_id is not None:
+            rebuild_holdings([portfolio_id], [stock_id])
+    portfolio_ids = {portfolio_id for portfolio_id, _ in holding_keys}
+    invalidate_portfolio_valuations(*portfolio_ids)
+    invalidate_portfolio_snapshots(*portfolio_ids)
+
+
+@receiver(post_delete, sender=Investment)
+def rebuild_deleted_investment_holding(
+    sender, instance: Investment, origin=None, **kwargs
+):
+    """Rebuild the holding, and invalidate the cached valuations and snapshots, of a deleted investment"""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin is not None and origin_model is not Investment:
+        # The investment was deleted with its portfolio or stock, whose receivers
+        # invalidate each affected portfolio once, and so was the holding
+        return
+    invalidate_portfolio_valuations(instance.portfolio_id)
+    invalidate_portfolio_snapshots(instance.portfolio_id)
+    if instance.portfolio_id is not None and instance.stock_id is not None:
+        rebuild_holdings([instance.portfolio_id], [instance.stock_id])
+
+
+@receiver(post_delete, sender=Portfolio)
+def invalidate_deleted_portfolio_valuations(sender, instance: Portfolio, **kwargs):
+    """Invalidate the cached valuations of a deleted portfolio. Its snapshots are deleted with it."""
+    invalidate_portfolio_valuations(instance.pk)
+
+
+@receiver(pre_delete, sender=Stock)
+def remember_stock_portfolios(sender, instance: Stock, **kwargs):
+    """Remember the portfolios with investments in a stock that is being deleted"""
+    instance._invested_portfolio_ids = set(
+        Investment.objects.filter(stock_id=instance.pk).values_list(
+            "portfolio_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Stock)
+def invalidate_deleted_stock_portfolios(sender, instance: Stock, **kwargs):
+    """Invalidate the cached valuations and snapshots of the portfolios invested in a deleted stock"""
+    portfolio_ids = getattr(instance, "_invested_portfolio_ids", None)
+    if portfolio_ids:
+        invalidate_portfolio_valuations(*portfolio_ids)
+        invalidate_portfolio_snapshots(*portfolio_ids)
+
+
+@receiver(rates_ingested)
+def invalidate_rates_snapshots(sender, start_date, stock_ids, **kwargs):
+    """Invalidate the snapshots computed from rates before the ingested rates"""
+    invalidate_snapshots_since(start_date, stock_ids)
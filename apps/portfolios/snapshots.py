@@ -0,0 +1,257 @@
+"""
+Daily portfolio snapshots.
+
+A snapshot is the end-of-day valuation of a portfolio's investments on a trading day,
+as the portfolio performance curve computes it. Snapshots are computed in bulk by a
+nightly task (and backfilled on demand), so that the performance graph reads past
+days with a single indexed range scan, and only computes the days since the latest
+snapshot on demand.
+
+Snapshots are computed from all of the portfolio's current investments, so they are
+deleted whenever the portfolio's investments or capital change, and recomputed.
+Snapshots on and after the date of ingested rates are deleted too, since they were
+computed from the earlier rates.
+Trading days are in the Pakistan timezone.
+"""
+
+import datetime
+import decimal
+import logging
+import typing
+import numpy as np
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .models import Investment, Portfolio, PortfolioDailySnapshot
+from .performance import (
+    get_portfolio_return_curve,
+    get_return_percentages,
+    load_investment_returns,
+)
+from helpers.utils.datetime import timedelta_code_to_datetime_range
+
+
+SNAPSHOTS_HISTORY = "5Y"
+"""How far back snapshots are backfilled. At least the longest performance graph filter."""
+
+TWO_PLACES = decimal.Decimal("0.01")
+
+logger = logging.getLogger(__name__)
+
+
+def _to_amount(value: float) -> decimal.Decimal:
+    return decimal.Decimal(str(value)).quantize(
+        TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+    )
+
+
+def get_snapshots_start_date(portfolio: Portfolio) -> datetime.date:
+    """Returns the date from which the portfolio's snapshots are backfilled"""
+    with timezone.override(settings.PAKISTAN_TIMEZONE):
+        history_start, _ = timedelta_code_to_datetime_range(SNAPSHOTS_HISTORY)
+        start_date = min(history_start.date(), timezone.localdate(portfolio.created_at))
+    # A day earlier, to cover the date ranges of timezones behind Pakistan's
+    return start_date - datetime.timedelta(days=1)
+
+
+def compute_portfolio_snapshots(
+    portfolio: Portfolio,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    previous_snapshot: typing.Optional[PortfolioDailySnapshot] = None,
+) -> typing.List[PortfolioDailySnapshot]:
+    """
+    Compute the portfolio's snapshots on every trading day within a date range.
+
+    :param portfolio: The portfolio.
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    :param previous_snapshot: The snapshot before the range, if any.
+        The daily return of the first snapshot is relative to it.
+    :return: The (unsaved) snapshots, in date order.
+    """
+    if start_date > end_date:
+        return []
+    with timezone.override(settings.PAKISTAN_TIMEZONE):
+        investment_returns = load_investment_returns(
+            portfolio.investments.all(), start_date, end_date
+        )
+    if investment_returns is None or not investment_returns.dates:
+        return []
+
+    total_returns = investment_returns.returns.sum(axis=1)
+    invested_capital = investment_returns.costs.sum()
+    cumulative_returns = get_return_percentages(total_returns, invested_capital)
+    total_returns = np.round(total_returns, 2)
+    invested_capital = _to_amount(round(float(invested_capital), 2))
+
+    capital = portfolio.capital
+    previous_value = previous_snapshot.value if previous_snapshot else None
+    snapshots = []
+    for date, total_return, cumulative_return in zip(
+        investment_returns.dates, total_returns.tolist(), cumulative_returns.tolist()
+    ):
+        total_return = _to_amount(total_return)
+        value = capital + total_return
+        daily_return = decimal.Decimal(0)
+        if previous_value:
+            daily_return = (value - previous_value) / abs(previous_value) * 100
+        snapshots.append(
+            PortfolioDailySnapshot(
+                portfolio=portfolio,
+                date=date,
+                value=value,
+                invested_capital=invested_capital,
+                cash=capital - invested_capital,
+                total_return=total_return,
+                daily_return=daily_return.quantize(
+                    TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+                ),
+                cumulative_return=_to_amount(cumulative_return),
+            )
+        )
+        previous_value = value
+    return snapshots
+
+
+def update_portfolio_snapshots(
+    portfolio: Portfolio, end_date: typing.Optional[datetime.date] = None
+) -> int:
+    """
+    Write the portfolio's snapshots on the trading days after its latest snapshot.
+
+    If the portfolio has no snapshots, they are backfilled from `get_snapshots_start_date`.
+
+    :param portfolio: The portfolio.
+    :param end_date: Write snapshots up to this date (inclusive). Defaults to today.
+        Only pass today after the market has closed.
+    :return: The number of snapshots written.
+    """
+    if end_date is None:
+        end_date = timezone.localdate(timezone=settings.PAKISTAN_TIMEZONE)
+
+    latest_snapshot = portfolio.daily_snapshots.order_by("-date").first()
+    if latest_snapshot is not None:
+        start_date = latest_snapshot.date + datetime.timedelta(days=1)
+    else:
+        start_date = get_snapshots_start_date(portfolio)
+
+    snapshots = compute_portfolio_snapshots(
+        portfolio, start_date, end_date, previous_snapshot=latest_snapshot
+    )
+    PortfolioDailySnapshot.objects.bulk_create(
+        snapshots,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["portfolio", "date"],
+        update_fields=[
+            "value",
+            "invested_capital",
+            "cash",
+            "total_return",
+            "daily_return",
+            "cumulative_return",
+        ],
+    )
+    return len(snapshots)
+
+
+def update_all_portfolio_snapshots(
+    end_date: typing.Optional[datetime.date] = None,
+) -> int:
+    """
+    Write the snapshots of all portfolios on the trading days after their latest snapshots.
+
+    This is the nightly task. It should run after the market has closed.
+
+    :param end_date: Write snapshots up to this date (inclusive). Defaults to today.
+    :return: The number of snapshots written.
+    """
+    written = 0
+    for portfolio in Portfolio.objects.order_by().iterator(chunk_size=100):
+        try:
+            written += update_portfolio_snapshots(portfolio, end_date=end_date)
+        except Exception:
+            logger.exception(f"Failed to update the snapshots of portfolio {portfolio.pk}")
+    return written
+
+
+def invalidate_portfolio_snapshots(*portfolio_ids: typing.Any) -> None:
+    """Delete the snapshots of portfolios. Call after their investments or capital change."""
+    if portfolio_ids:
+        PortfolioDailySnapshot.objects.filter(portfolio_id__in=portfolio_ids).delete()
+
+
+def invalidate_snapshots_since(
+    date: datetime.date, stock_ids: typing.Optional[typing.Iterable[typing.Any]] = None
+) -> None:
+    """
+    Delete the snapshots on and after a date. Call after the rates of that date change.
+
+    :param date: The (Pakistan) trading date.
+    :param stock_ids: Only delete the snapshots of portfolios with investments in these
+        stocks. Defaults to all portfolios.
+    """
+    snapshots = PortfolioDailySnapshot.objects.filter(date__gte=date)
+    if stock_ids is not None:
+        snapshots = snapshots.filter(
+            portfolio_id__in=Investment.objects.filter(
+                stock_id__in=list(stock_ids)
+            ).values("portfolio_id")
+        )
+    snapshots.delete()
+
+
+def get_portfolio_snapshots_curve(
+    portfolio: Portfolio, start_date: datetime.date, end_date: datetime.date
+) -> typing.Dict[str, float]:
+    """
+    Returns the percentage return on the portfolio's investments on every trading day
+    within a date range, from the portfolio's snapshots.
+
+    Days after the latest snapshot are computed on demand. Snapshots up to yesterday
+    are backfilled first if the portfolio has none.
+
+    :param portfolio: The portfolio.
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    :return: A mapping of ISO formatted dates to percentage returns.
+    :raises ValueError: If the start date is after the end date.
+    """
+    if start_date > end_date:
+        raise ValueError("The start date cannot be after the end date")
+    if start_date < get_snapshots_start_date(portfolio):
+        # Before the snapshots' history
+        return get_portfolio_return_curve(portfolio, start_date, end_date)["all"]
+
+    latest_date = portfolio.daily_snapshots.aggregate(latest_date=models.Max("date"))[
+        "latest_date"
+    ]
+    if latest_date is None:
+        # Today's snapshot is written by the nightly task, once the day's prices are final
+        today = timezone.localdate(timezone=settings.PAKISTAN_TIMEZONE)
+        update_portfolio_snapshots(
+            portfolio, end_date=today - datetime.timedelta(days=1)
+        )
+        latest_date = portfolio.daily_snapshots.aggregate(
+            latest_date=models.Max("date")
+        )["latest_date"]
+
+    curve = {}
+    if latest_date is not None and latest_date >= start_date:
+        snapshots = portfolio.daily_snapshots.filter(
+            date__gte=start_date, date__lte=end_date
+        ).values_list("date", "cumulative_return")
+        curve = {
+            date.isoformat(): float(cumulative_return)
+            for date, cumulative_return in snapshots
+        }
+        start_date = latest_date + datetime.timedelta(days=1)
+
+    if start_date <= end_date:
+        with timezone.override(settings.PAKISTAN_TIMEZONE):
+            curve.update(
+                get_portfolio_return_curve(portfolio, start_date, end_date)["all"]
+            )
+    return curve
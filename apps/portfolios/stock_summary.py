@@ -3,12 +3,11 @@ import typing
 import decimal
 import functools
 import attrs
-from concurrent.futures import ThreadPoolExecutor
 from django.db import models
 
-from .helpers import datetime_filter_to_date_range, get_stocks_invested_from_investments
+from .helpers import datetime_filter_to_date_range
 from .models import TransactionType, Portfolio, Investment
-from apps.stocks.models import Rate
+from apps.stocks.helpers import get_latest_prices
 from helpers.utils.decimals import to_n_decimal_places
 from helpers.utils.datetime import activate_timezone
 
@@ -45,48 +44,33 @@ class StockSummary:
     )
 
 
-def get_stock_summary_from_investments(
-    stock: str, investments: models.QuerySet[Investment]
-) -> StockSummary:
-    investments_for_stock = investments.filter(stock__ticker=stock)
-    # If no investments exists, return a stock summary with the default attributes
-    if not investments_for_stock.exists():
-        return StockSummary(symbol=stock)
-
-    annotated_qs = investments_for_stock.annotate(
-        signed_quantity=models.Case(
-            models.When(
-                transaction_type=TransactionType.SELL, then=-models.F("quantity")
-            ),
-            default=models.F("quantity"),
-            output_field=models.IntegerField(),
-        )
-    )
-    aggregation = annotated_qs.aggregate(
-        net_quantity=models.Sum("signed_quantity"),
-        average_rate=models.Avg("rate"),
-    )
+HOLDINGS_SUMMARY_FILTER = "ALL"
+"""Summary filter for the portfolio's current holdings, from all of its investments"""
 
-    net_quantity: int = aggregation["net_quantity"]
-    average_rate = aggregation["average_rate"]
-    net_average_cost = float(net_quantity * average_rate)
-    latest_rate_record = (
-        Rate.objects.only("stock", "added_at", "close")
-        .filter(stock__ticker=stock)
-        .order_by("-added_at")
-        .first()
-    )
 
-    market_rate = None
+def build_stock_summary(
+    symbol: str,
+    net_quantity,
+    average_rate,
+    market_rate,
+) -> StockSummary:
+    """
+    Returns a stock's summary from its net quantity, average rate and market rate.
+
+    :param symbol: The stock's ticker symbol.
+    :param net_quantity: The net quantity invested in.
+    :param average_rate: The average rate (cost per unit) of the quantity invested in.
+    :param market_rate: The current/latest (market) rate of the stock, if any.
+    """
+    net_average_cost = None
+    if average_rate is not None:
+        net_average_cost = float(net_quantity) * float(average_rate)
+
     market_value = None
     net_return_on_investments = None
     percentage_return_on_investments = None
-    if latest_rate_record:
-        # Get the current/latest (market) rate
-        market_rate = latest_rate_record.close
-
     if market_rate and net_average_cost:
-        market_value = abs(net_quantity) * market_rate
+        market_value = abs(float(net_quantity)) * float(market_rate)
         net_return_on_investments = market_value - net_average_cost
         percentage_return_on_investments = (
             net_return_on_investments / abs(net_average_cost)
@@ -94,7 +78,7 @@ def get_stock_summary_from_investments(
 
     return StockSummary(
         **{
-            "symbol": stock,
+            "symbol": symbol,
             "net_quantity": net_quantity,
             "average_rate": average_rate,
             "net_average_cost": net_average_cost,
@@ -106,6 +90,58 @@ def get_stock_summary_from_investments(
     )
 
 
+def get_stocks_summaries_from_investments(
+    investments: models.QuerySet[Investment],
+) -> typing.List[StockSummary]:
+    """Returns the summaries of the stocks invested in, from the given investments"""
+    aggregation = (
+        investments.order_by()
+        .values("stock_id", "stock__ticker")
+        .annotate(
+            net_quantity=models.Sum(
+                models.Case(
+                    models.When(
+                        transaction_type=TransactionType.SELL,
+                        then=-models.F("quantity"),
+                    ),
+                    default=models.F("quantity"),
+                )
+            ),
+            average_rate=models.Avg("rate"),
+        )
+    )
+    aggregation = list(aggregation)
+    market_rates = get_latest_prices(row["stock_id"] for row in aggregation)
+    return [
+        build_stock_summary(
+            row["stock__ticker"],
+            net_quantity=row["net_quantity"],
+            average_rate=row["average_rate"],
+            market_rate=market_rates.get(row["stock_id"]),
+        )
+        for row in aggregation
+    ]
+
+
+def get_stocks_summaries_from_holdings(portfolio: Portfolio) -> typing.List[StockSummary]:
+    """Returns the summaries of the stocks currently held in a portfolio"""
+    holdings = list(
+        portfolio.holdings.exclude(quantity=0).values_list(
+            "stock_id", "stock__ticker", "quantity", "average_cost"
+        )
+    )
+    market_rates = get_latest_prices(stock_id for stock_id, *_ in holdings)
+    return [
+        build_stock_summary(
+            ticker,
+            net_quantity=quantity,
+            average_rate=average_cost,
+            market_rate=market_rates.get(stock_id),
+        )
+        for stock_id, ticker, quantity, average_cost in holdings
+    ]
+
+
 def _update_stock_summary_with_percentage_allocation(
     stock_summary: StockSummary,
     total_quantity_of_stocks_invested_in: int,
@@ -115,7 +151,9 @@ def _update_stock_summary_with_percentage_allocation(
         return stock_summary
 
     percentage_allocation = (
-        stock_summary.net_quantity / abs(total_quantity_of_stocks_invested_in) * 100
+        float(stock_summary.net_quantity)
+        / abs(total_quantity_of_stocks_invested_in)
+        * 100
     )
     stock_summary.percentage_allocation = percentage_allocation
     return stock_summary
@@ -124,32 +162,35 @@ def _update_stock_summary_with_percentage_allocation(
 def generate_portfolio_stocks_summary(
     portfolio: Portfolio, dt_filter: str = "5D", timezone: str = None
 ) -> typing.List[StockSummary]:
-    with activate_timezone(timezone):
-        start_date, _ = datetime_filter_to_date_range(dt_filter)
-        portfolio_investments = portfolio.investments.filter(
-            transaction_date__gte=start_date
-        ).select_related("stock")
+    """
+    Returns the summaries of the stocks invested in by a portfolio, and their total.
+
+    :param portfolio: The portfolio.
+    :param dt_filter: Summarize the investments made within this datetime filter's period.
+        Use `HOLDINGS_SUMMARY_FILTER` to summarize the portfolio's current holdings.
+    :param timezone: The preferred timezone to use.
+    """
+    if dt_filter == HOLDINGS_SUMMARY_FILTER:
+        stocks_summaries = get_stocks_summaries_from_holdings(portfolio)
+    else:
+        with activate_timezone(timezone):
+            start_date, _ = datetime_filter_to_date_range(dt_filter)
+            portfolio_investments = portfolio.investments.filter(
+                transaction_date__gte=start_date
+            )
+        stocks_summaries = get_stocks_summaries_from_investments(portfolio_investments)
 
     # If no investments exists, return a summary for the total only
-    if not portfolio_investments.exists():
+    if not stocks_summaries:
         return [StockSummary(symbol="TOTAL")]
 
-    stocks_invested_in = get_stocks_invested_from_investments(portfolio_investments)
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        stocks_summaries = list(
-            executor.map(
-                lambda stock: get_stock_summary_from_investments(
-                    stock, portfolio_investments
-                ),
-                stocks_invested_in,
-            )
-        )
-
     net_total_quantity_of_stocks_invested_in = math.fsum(
         summary.net_quantity for summary in stocks_summaries
     )
     net_total_average_cost = math.fsum(
-        summary.net_quantity for summary in stocks_summaries
+        summary.net_average_cost
+        for summary in stocks_summaries
+        if summary.net_average_cost
     )
     total_market_value = math.fsum(
         summary.market_value for summary in stocks_summaries if summary.market_value
@@ -1,16 +1,32 @@
 import csv
 import typing
+import hashlib
+import logging
+import numpy as np
 import pandas as pd
 import io
 import decimal
+import datetime
+from django.apps import apps as django_apps
 from django.core.files import File
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.db import transaction
+from django.utils import timezone
 
-from apps.portfolios.models import Investment, Portfolio
+from apps.portfolios.models import (
+    Investment,
+    Portfolio,
+    TransactionType,
+    TransactionUpload,
+    TransactionUploadStatus,
+)
 from apps.stocks.models import Stock
 from apps.accounts.models import UserAccount
 from .data_cleaners import InvestmentDataCleaner
+from helpers.data_utils.cleaners import DataCleaningError
+from .holdings import rebuild_holdings
+from .snapshots import invalidate_portfolio_snapshots
+from .valuation import invalidate_portfolio_valuations
 from helpers.utils.misc import comma_separated_to_int_float
 
 
@@ -53,46 +69,84 @@ EXPECTED_TRANSACTION_COLUMNS = [
 ]
 
 
+NUMBER_COLUMNS = (
+    "BUY",
+    "SELL",
+    "RATE",
+    "COMM",
+    "CDC",
+    "CVT",
+    "WHTS",
+    "WHTC",
+    "LAGA",
+    "SECP",
+    "NLAGA",
+    "FED",
+    "MISC",
+)
+
+MAX_REPORTED_ROWS = 10
+"""Maximum number of row numbers reported in an upload error"""
+
+UPLOAD_CHUNK_SIZE = 1000
+"""Number of rows of a transactions upload processed at a time"""
+
+PROCESS_UPLOAD_TASK = "apps.portfolios.transactions_upload.process_transactions_upload"
+
+PROCESS_UPLOAD_TIMEOUT = 30 * 60
+"""
+Number of seconds a transactions upload task may run for. An unfinished upload
+without progress for longer was abandoned, e.g. because its worker died.
+"""
+
+logger = logging.getLogger(__name__)
+
+
 class TransactionUploadError(Exception):
     pass
 
 
-@transaction.atomic
-def handle_transactions_file(transactions_file: File, user: UserAccount) -> None:
-    """
-    Process the uploaded transactions file with debug logging.
-    """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    NUMBER_COLUMNS = (
-        "BUY",
-        "SELL",
-        "RATE",
-        "COMM",
-        "CDC",
-        "CVT",
-        "WHTS",
-        "WHTC",
-        "LAGA",
-        "SECP",
-        "NLAGA",
-        "FED",
-        "MISC",
+def _raise_for_rows(index: pd.Index, message: str) -> None:
+    """Raise an upload error for the rows of the transactions file with the given (DataFrame) index"""
+    if index.empty:
+        return
+    # Row numbers in the file. The first row is the header
+    row_numbers = [str(label + 2) for label in index[:MAX_REPORTED_ROWS]]
+    if len(index) > MAX_REPORTED_ROWS:
+        row_numbers.append(f"and {len(index) - MAX_REPORTED_ROWS} more")
+    rows = "row" if len(index) == 1 else "rows"
+    raise TransactionUploadError(
+        f"Error processing {rows} {', '.join(row_numbers)}. {message}"
     )
+
+
+def _map_distinct(series: pd.Series, func: typing.Callable) -> pd.Series:
+    """Apply a function once per distinct value of a series"""
+    codes, values = pd.factorize(series, use_na_sentinel=False)
+    mapped = np.empty(len(values), dtype=object)
+    mapped[:] = [func(value) for value in values.tolist()]
+    return pd.Series(mapped[codes], index=series.index)
+
+
+def _to_2dp_decimal(value) -> decimal.Decimal:
+    return decimal.Decimal.from_float(float(value)).quantize(
+        decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+    )
+
+
+def read_transactions_file(transactions_file: File) -> pd.DataFrame:
+    """
+    Read the transactions in an uploaded transactions file.
+
+    :raises TransactionUploadError: If the file does not have the expected columns.
+    """
     converters = {column: comma_separated_to_int_float for column in NUMBER_COLUMNS}
-    
-    logger.info(f"Starting to process transactions file for user: {user}")
-    
     df = pd.read_csv(
         transactions_file,
         skip_blank_lines=True,
         keep_default_na=False,
         converters=converters,
     )
-    
-    logger.info(f"CSV loaded with {len(df)} rows")
-    logger.info(f"CSV columns: {list(df.columns)}")
 
     # Ensure all expected columns are present in the DataFrame
     missing_columns = set(EXPECTED_TRANSACTION_COLUMNS) - set(df.columns)
@@ -100,88 +154,425 @@ def handle_transactions_file(transactions_file: File, user: UserAccount) -> None
         raise TransactionUploadError(
             f"Missing columns in transactions file: {', '.join(missing_columns)}"
         )
+    return df
+
 
-    new_investments = []
-    for row in df.itertuples(index=True):
-        try:
-            data: typing.Dict = {
-                col: getattr(row, col) for col in EXPECTED_TRANSACTION_COLUMNS
+def clean_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Validate and clean the transactions read from a transactions file, all at once.
+
+    :param df: The transactions, as read by `read_transactions_file`.
+    :return: The cleaned investment field values, plus the "ticker", "stock_title"
+        and "portfolio_name" of each transaction. Indexed like `df`.
+    :raises TransactionUploadError: If any transaction is invalid.
+    """
+    quantities = {}
+    for column in ("BUY", "SELL"):
+        quantity = pd.to_numeric(df[column].replace("", 0), errors="coerce")
+        _raise_for_rows(
+            df.index[quantity.isna()], f"'{column}' quantity must be a number."
+        )
+        quantities[column] = quantity
+
+    buy_quantity, sell_quantity = quantities["BUY"], quantities["SELL"]
+    _raise_for_rows(
+        df.index[(buy_quantity != 0) & (sell_quantity != 0)],
+        "A transaction can either be 'BUY' or 'SELL' type, not both.",
+    )
+    _raise_for_rows(
+        df.index[(buy_quantity == 0) & (sell_quantity == 0)],
+        "Either 'BUY' or 'SELL' quantity must be provided.",
+    )
+
+    tickers = df["SYMBOL"].astype(str).str.strip().str.upper()
+    _raise_for_rows(df.index[tickers == ""], "'SYMBOL' must be provided.")
+    portfolio_names = df["UIN"].astype(str).str.strip()
+    _raise_for_rows(df.index[portfolio_names == ""], "'UIN' must be provided.")
+
+    try:
+        cleaned = InvestmentDataCleaner.clean_frame(df)
+    except DataCleaningError as exc:
+        _raise_for_rows(pd.Index(exc.index), str(exc))
+        raise
+
+    is_buy = buy_quantity != 0
+    cleaned["transaction_type"] = np.where(
+        is_buy, TransactionType.BUY.value, TransactionType.SELL.value
+    )
+    cleaned["quantity"] = _map_distinct(
+        buy_quantity.where(is_buy, sell_quantity), _to_2dp_decimal
+    )
+    cleaned["ticker"] = tickers
+    cleaned["stock_title"] = df["SYMBOL_TITLE"].astype(str).str.strip()
+    cleaned["portfolio_name"] = portfolio_names
+    return cleaned
+
+
+def hash_transaction_rows(df: pd.DataFrame) -> pd.Series:
+    """
+    Returns the content hash of each row of a transactions file.
+
+    Identical rows in the same file are told apart by their occurrence,
+    so that each is imported once.
+    """
+    contents = (
+        df[EXPECTED_TRANSACTION_COLUMNS]
+        .astype(str)
+        .apply(lambda column: column.str.strip())
+        .agg("\x1f".join, axis=1)
+    )
+    occurrences = contents.groupby(contents).cumcount().astype(str)
+    return (contents + "\x1e" + occurrences).map(
+        lambda content: hashlib.sha256(content.encode()).hexdigest()
+    )
+
+
+def get_imported_row_hashes(
+    row_hashes: typing.Iterable[str], user: UserAccount
+) -> typing.Set[str]:
+    """Returns the row hashes, of those given, that the user has already imported"""
+    row_hashes = list(row_hashes)
+    imported = set()
+    for start in range(0, len(row_hashes), UPLOAD_CHUNK_SIZE):
+        imported.update(
+            Investment.objects.filter(
+                portfolio__owner=user,
+                import_hash__in=row_hashes[start : start + UPLOAD_CHUNK_SIZE],
+            ).values_list("import_hash", flat=True)
+        )
+    return imported
+
+
+def get_or_create_stocks(titles: typing.Dict[str, str]) -> typing.Dict[str, Stock]:
+    """
+    Returns the stocks with the given tickers, creating the missing ones.
+
+    :param titles: A mapping of tickers to stock titles. Titles are set on stocks without one.
+    :return: A mapping of tickers to stocks.
+    """
+    stocks = {stock.ticker: stock for stock in Stock.objects.filter(ticker__in=titles)}
+    new_stocks = [
+        Stock(ticker=ticker, title=title or None)
+        for ticker, title in titles.items()
+        if ticker not in stocks
+    ]
+    if new_stocks:
+        # Ignore stocks created by concurrent uploads in the meantime, and fetch them instead
+        Stock.objects.bulk_create(new_stocks, ignore_conflicts=True)
+        stocks = {
+            stock.ticker: stock for stock in Stock.objects.filter(ticker__in=titles)
+        }
+
+    untitled_stocks = [
+        stock for stock in stocks.values() if not stock.title and titles[stock.ticker]
+    ]
+    for stock in untitled_stocks:
+        stock.title = titles[stock.ticker]
+    if untitled_stocks:
+        Stock.objects.bulk_update(untitled_stocks, ["title"])
+    return stocks
+
+
+def get_or_create_portfolios(
+    names: typing.Iterable[str], owner: UserAccount
+) -> typing.Dict[str, Portfolio]:
+    """
+    Returns the owner's portfolios with the given names, creating the missing ones.
+
+    :return: A mapping of names to portfolios.
+    """
+    names = set(names)
+    portfolios = {
+        portfolio.name: portfolio
+        for portfolio in Portfolio.objects.filter(owner=owner, name__in=names)
+    }
+    new_portfolios = [
+        Portfolio(name=name, owner=owner) for name in names if name not in portfolios
+    ]
+    if new_portfolios:
+        Portfolio.objects.bulk_create(new_portfolios, ignore_conflicts=True)
+        portfolios = {
+            portfolio.name: portfolio
+            for portfolio in Portfolio.objects.filter(owner=owner, name__in=names)
+        }
+    return portfolios
+
+
+def load_transactions(
+    cleaned: pd.DataFrame, user: UserAccount, update_holdings: bool = True
+) -> typing.List[Investment]:
+    """
+    Create the investments of cleaned transactions, with their stocks and portfolios.
+
+    :param cleaned: The transactions, as cleaned by `clean_transactions`.
+        May have an "import_hash" column, with the row hashes from `hash_transaction_rows`.
+    :param user: The owner of the portfolios.
+    :param update_holdings: Whether to rebuild the affected holdings and invalidate the
+        portfolios' cached valuations. Skip if done after loading many batches of transactions.
+    :return: The created investments.
+    """
+    if cleaned.empty:
+        return []
+
+    titles = (
+        cleaned.loc[cleaned["stock_title"] != "", ["ticker", "stock_title"]]
+        .drop_duplicates("ticker")
+        .set_index("ticker")["stock_title"]
+        .to_dict()
+    )
+    with transaction.atomic():
+        stocks = get_or_create_stocks(
+            {ticker: titles.get(ticker, "") for ticker in cleaned["ticker"].unique()}
+        )
+        portfolios = get_or_create_portfolios(cleaned["portfolio_name"].unique(), user)
+
+        investments = cleaned.drop(columns=["ticker", "stock_title", "portfolio_name"])
+        investments["stock_id"] = cleaned["ticker"].map(
+            {ticker: stock.pk for ticker, stock in stocks.items()}
+        )
+        investments["portfolio_id"] = cleaned["portfolio_name"].map(
+            {name: portfolio.pk for name, portfolio in portfolios.items()}
+        )
+
+        # Brokerage fee is a percentage of the base cost
+        base_costs = _map_distinct(
+            investments["rate"] * investments["quantity"],
+            lambda cost: cost.quantize(
+                decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+            ),
+        )
+        brokerage_rates = cleaned["portfolio_name"].map(
+            {
+                name: (portfolio.brokerage_percentage or decimal.Decimal(0)) / 100
+                for name, portfolio in portfolios.items()
             }
-            
-            logger.info(f"Processing row {row.Index + 1}: {data}")
-
-            unique_id = data["UIN"]
-            stock_ticker = data["SYMBOL"].upper()
-            stock_title = data["SYMBOL_TITLE"]
-            buy_quantity = data["BUY"]
-            sell_quantity = data["SELL"]
-            
-            logger.info(f"UIN: {unique_id}, Stock: {stock_ticker}, Buy: {buy_quantity}, Sell: {sell_quantity}")
-
-            if buy_quantity and sell_quantity:
-                raise TransactionUploadError(
-                    "A transaction can either be 'BUY' or 'SELL' type, not both."
-                )
-            if not (buy_quantity or sell_quantity):
-                raise TransactionUploadError(
-                    "Either 'BUY' or 'SELL' quantity must be provided."
-                )
-
-            transaction_type = "buy" if buy_quantity else "sell"
-            quantity = decimal.Decimal.from_float(
-                float(buy_quantity) if buy_quantity else float(sell_quantity)
-            ).quantize(decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP)
-            
-            logger.info(f"Transaction type: {transaction_type}, Quantity: {quantity}")
-            
-            data_cleaner = InvestmentDataCleaner(data)
-            data_cleaner.clean()
-
-            # Get or create the stock with the symbol/ticker
-            stock, created = Stock.objects.get_or_create(ticker=stock_ticker)
-            if created or not stock.title:
-                stock.title = stock_title
-                stock.save()
-                logger.info(f"Stock {'created' if created else 'updated'}: {stock.ticker}")
-
-            # Create portfolio with unique ID
-            portfolio, portfolio_created = Portfolio.objects.get_or_create(name=unique_id, owner=user)
-            logger.info(f"Portfolio {'created' if portfolio_created else 'found'}: {portfolio.name}")
-            
-            investment = data_cleaner.new_instance(
-                portfolio=portfolio,
-                stock=stock,
-                quantity=quantity,
-                transaction_type=transaction_type,
+        )
+        investments["brokerage_fee"] = brokerage_rates * base_costs
+
+        created_investments = Investment.objects.bulk_create(
+            [Investment(**values) for values in investments.to_dict("records")],
+            batch_size=5000,
+        )
+
+        if update_holdings:
+            update_portfolio_holdings(
+                set(investments["portfolio_id"]), set(investments["stock_id"])
+            )
+    return created_investments
+
+
+def update_portfolio_holdings(
+    portfolio_ids: typing.Set[typing.Any], stock_ids: typing.Set[typing.Any]
+) -> None:
+    """
+    Rebuild the portfolios' holdings in the stocks, and invalidate their cached valuations and snapshots.
+
+    Bulk creation of investments does not send signals, so this must be done explicitly.
+    """
+    if not portfolio_ids:
+        return
+    rebuild_holdings(portfolio_ids, stock_ids)
+    invalidate_portfolio_valuations(*portfolio_ids)
+    invalidate_portfolio_snapshots(*portfolio_ids)
+
+
+def handle_transactions_file(
+    transactions_file: File, user: UserAccount
+) -> typing.List[Investment]:
+    """
+    Process an uploaded transactions file.
+
+    The whole file is validated before anything is saved.
+
+    :param transactions_file: The transactions file.
+    :param user: The owner of the portfolios the transactions are added to.
+        Portfolios are identified by the transactions' 'UIN', and created if they do not exist.
+    :return: The created investments. Rows the user imported before are skipped.
+    :raises TransactionUploadError: If the file or any of its transactions is invalid.
+    """
+    df = read_transactions_file(transactions_file)
+    row_hashes = hash_transaction_rows(df)
+    df = df[~row_hashes.isin(get_imported_row_hashes(row_hashes, user))]
+    cleaned = clean_transactions(df)
+    cleaned["import_hash"] = row_hashes[cleaned.index]
+    created_investments = load_transactions(cleaned, user)
+    logger.info(
+        f"Created {len(created_investments)} investments from transactions file for user: {user}"
+    )
+    return created_investments
+
+
+def stage_transactions_upload(
+    transactions_file: File, user: UserAccount
+) -> TransactionUpload:
+    """
+    Stage an uploaded transactions file to storage, and queue it for processing.
+
+    Re-uploading a file that is still being processed returns the earlier upload,
+    after queueing it again if it was abandoned. Otherwise the file is processed
+    again, and rows that were already imported are skipped.
+
+    :param transactions_file: The transactions file.
+    :param user: The owner of the portfolios the transactions are added to.
+    :return: The upload, whose progress can be followed.
+    """
+    content_hash = hashlib.sha256()
+    for chunk in transactions_file.chunks():
+        content_hash.update(chunk)
+    content_hash = content_hash.hexdigest()
+    transactions_file.seek(0)
+
+    unfinished_upload = TransactionUpload.objects.filter(
+        owner=user,
+        content_hash=content_hash,
+        status__in=[
+            TransactionUploadStatus.PENDING,
+            TransactionUploadStatus.PROCESSING,
+        ],
+    ).first()
+    if unfinished_upload is not None:
+        restart_abandoned_transactions_upload(unfinished_upload)
+        return unfinished_upload
+
+    upload = TransactionUpload(
+        owner=user, file_name=transactions_file.name, content_hash=content_hash
+    )
+    upload.file.save(transactions_file.name, transactions_file)
+    logger.info(f"Staged transactions upload {upload.pk} for user: {user}")
+    enqueue_transactions_upload(upload)
+    return upload
+
+
+def restart_abandoned_transactions_upload(upload: TransactionUpload) -> bool:
+    """
+    Queue an unfinished transactions upload again if it has made no progress
+    for `PROCESS_UPLOAD_TIMEOUT` seconds.
+
+    :param upload: The upload.
+    :return: Whether the upload was queued again.
+    """
+    now = timezone.now()
+    # Conditional update, so that concurrent re-uploads only queue the upload once
+    restarted = TransactionUpload.objects.filter(
+        pk=upload.pk,
+        status__in=[
+            TransactionUploadStatus.PENDING,
+            TransactionUploadStatus.PROCESSING,
+        ],
+        updated_at__lt=now - datetime.timedelta(seconds=PROCESS_UPLOAD_TIMEOUT),
+    ).update(status=TransactionUploadStatus.PENDING, updated_at=now)
+    if not restarted:
+        return False
+
+    logger.warning(f"Restarting abandoned transactions upload {upload.pk}")
+    upload.refresh_from_db()
+    enqueue_transactions_upload(upload)
+    return True
+
+
+def enqueue_transactions_upload(upload: TransactionUpload) -> None:
+    """
+    Queue a staged transactions upload for processing by a django-q cluster.
+
+    The upload is processed immediately if django-q is not installed.
+    """
+    if not django_apps.is_installed("django_q"):
+        process_transactions_upload(upload.pk)
+        upload.refresh_from_db()
+        return
+
+    from django_q.tasks import async_task
+
+    transaction.on_commit(
+        lambda: async_task(
+            PROCESS_UPLOAD_TASK,
+            upload.pk,
+            task_name=f"transactions-upload-{upload.pk}",
+            timeout=PROCESS_UPLOAD_TIMEOUT,
+        )
+    )
+
+
+def _chunks(df: pd.DataFrame) -> typing.Iterator[pd.DataFrame]:
+    for start in range(0, len(df), UPLOAD_CHUNK_SIZE):
+        yield df.iloc[start : start + UPLOAD_CHUNK_SIZE]
+
+
+def process_transactions_upload(upload_id: typing.Any) -> None:
+    """
+    Process a staged transactions upload, in chunks of `UPLOAD_CHUNK_SIZE` rows.
+
+    The upload's progress is saved as each chunk is parsed and imported.
+    Rows the owner has already imported are skipped, so processing an upload again,
+    e.g. after a failure, only imports the remaining rows.
+    All rows are validated before any is imported. If any row is invalid,
+    the upload fails with the errors, and nothing is imported.
+
+    :param upload_id: The ID of the `TransactionUpload`.
+    """
+    upload = TransactionUpload.objects.select_related("owner").get(pk=upload_id)
+    if upload.is_finished:
+        return
+    upload.update_progress(
+        status=TransactionUploadStatus.PROCESSING,
+        rows_parsed=0,
+        rows_imported=0,
+        errors=[],
+    )
+
+    portfolio_ids, stock_ids = set(), set()
+    try:
+        with upload.file.open("rb") as transactions_file:
+            df = read_transactions_file(transactions_file)
+
+        row_hashes = hash_transaction_rows(df)
+        is_imported = row_hashes.isin(get_imported_row_hashes(row_hashes, upload.owner))
+        df = df[~is_imported]
+        upload.update_progress(
+            rows_total=len(row_hashes), rows_skipped=int(is_imported.sum())
+        )
+
+        cleaned_chunks, errors = [], []
+        for chunk in _chunks(df):
+            try:
+                cleaned_chunks.append(clean_transactions(chunk))
+            except TransactionUploadError as exc:
+                errors.append(str(exc))
+            upload.update_progress(rows_parsed=upload.rows_parsed + len(chunk))
+        if errors:
+            upload.update_progress(status=TransactionUploadStatus.FAILED, errors=errors)
+            return
+
+        for cleaned in cleaned_chunks:
+            cleaned["import_hash"] = row_hashes[cleaned.index]
+            created_investments = load_transactions(
+                cleaned, upload.owner, update_holdings=False
+            )
+            portfolio_ids.update(
+                investment.portfolio_id for investment in created_investments
             )
-            investment.brokerage_fee = (
-                portfolio.brokerage_percentage / 100
-            ) * investment.base_cost
-            
-            logger.info(f"Investment object created: {investment}")
-            new_investments.append(investment)
-            
-        except TransactionUploadError as exc:
-            # Capture any TransactionUploadError and raise it with the row number
-            # for easy row identification and debugging
-            raise TransactionUploadError(
-                f"Error processing row {row.Index + 2}. {exc}"
-            ) from exc
-
-    logger.info(f"About to bulk create {len(new_investments)} investments")
-    
-    # Add this debug check before bulk_create
-    for i, inv in enumerate(new_investments):
-        logger.info(f"Investment {i}: Portfolio={inv.portfolio}, Stock={inv.stock}, Quantity={inv.quantity}, Type={inv.transaction_type}")
-    
-    created_investments = Investment.objects.bulk_create(new_investments, batch_size=5000)
-    logger.info(f"Bulk create completed. Created {len(created_investments)} investments")
-    
-    # Verify the data was saved
-    total_investments = Investment.objects.filter(portfolio__owner=user).count()
-    logger.info(f"Total investments in DB for user {user}: {total_investments}")
-    
-    return None
+            stock_ids.update(investment.stock_id for investment in created_investments)
+            upload.update_progress(
+                rows_imported=upload.rows_imported + len(created_investments)
+            )
+    except TransactionUploadError as exc:
+        upload.update_progress(status=TransactionUploadStatus.FAILED, errors=[str(exc)])
+    except Exception as exc:
+        logger.exception(f"Failed to process transactions upload {upload.pk}")
+        upload.update_progress(
+            status=TransactionUploadStatus.FAILED,
+            errors=[
+                f"Upload failed! Error: {exc}. Ensure the file is in the correct format and contains the required data."
+            ],
+        )
+    else:
+        upload.update_progress(status=TransactionUploadStatus.COMPLETED)
+        logger.info(
+            f"Imported {upload.rows_imported} investments from transactions upload {upload.pk}"
+        )
+    finally:
+        update_portfolio_holdings(portfolio_ids, stock_ids)
+
 
 def get_transactions_upload_template() -> InMemoryUploadedFile:
     """
@@ -12,6 +12,11 @@ urlpatterns = [
         views.transactions_upload_template_download_view,
         name="transactions_upload_template_download",
     ),
+    path(
+        "transaction-uploads/<uuid:upload_id>/status",
+        views.transaction_upload_status_view,
+        name="transaction_upload_status",
+    ),
     path("new", views.portfolio_create_view, name="portfolio_create"),
     # path("image-test", views.image_test_view, name="image_test"),
     
@@ -0,0 +1,211 @@
+"""
+Set-based valuation of investments and portfolios.
+
+Cost, market value and return of investments are computed in SQL, joined against
+the latest (or on-date) stock rates, so that valuing any number of investments or
+portfolios costs a single query.
+"""
+
+import decimal
+import datetime
+import typing
+from django.db import models
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from .models import Investment, Portfolio, TransactionType
+from apps.stocks.models import Rate
+from apps.stocks.caching import RATES_NAMESPACE, valuation_cache
+
+
+TWO_PLACES = decimal.Decimal("0.01")
+
+_ZERO = models.Value(decimal.Decimal(0))
+
+
+def _amount(expression) -> models.ExpressionWrapper:
+    return models.ExpressionWrapper(
+        expression, output_field=models.DecimalField(max_digits=20, decimal_places=2)
+    )
+
+
+def _sum(*expressions) -> models.Func:
+    """Flat sum of expressions. Avoids deeply nested SQL from chained additions."""
+    return models.Func(
+        *expressions,
+        template="(%(expressions)s)",
+        arg_joiner=" + ",
+        output_field=models.DecimalField(max_digits=20, decimal_places=4),
+    )
+
+
+def get_rate_subquery(
+    stock_ref: str = "stock_id", date: typing.Optional[datetime.date] = None
+) -> models.Subquery:
+    """
+    Returns a subquery of the close rate of a stock.
+
+    :param stock_ref: Reference to the stock ID in the outer query.
+    :param date: Use the last rate on this date. If not provided, the latest rate is used.
+    """
+    rates = Rate.objects.filter(stock_id=models.OuterRef(stock_ref))
+    if date is not None:
+        rates = rates.filter(added_at__date=date)
+    return models.Subquery(rates.order_by("-added_at").values("close")[:1])
+
+
+def get_investment_value_expressions(
+    prefix: str = "", date: typing.Optional[datetime.date] = None
+) -> typing.Dict[str, models.Expression]:
+    """
+    Returns expressions of the cost, market rate, market value and return of investments.
+
+    The expressions mirror the `Investment` properties of the same purpose.
+    The market value and return are null if there is no (non-zero) market rate.
+
+    :param prefix: Lookup prefix of the investment, e.g. "investments__" from a `Portfolio` query.
+    :param date: Value the investments on this date. If not provided, the latest rates are used.
+    """
+    quantity = models.F(f"{prefix}quantity")
+    additional_fees = Round(
+        _sum(
+            *(
+                Coalesce(models.F(f"{prefix}{field}"), _ZERO)
+                for field in Investment.ADDITIONAL_FEES
+            )
+        ),
+        2,
+    )
+
+    base_cost = Round(models.F(f"{prefix}rate") * quantity, 2)
+    total_fees = (additional_fees + models.F(f"{prefix}brokerage_fee")) * quantity
+    cost = _amount(
+        models.Case(
+            models.When(
+                **{f"{prefix}transaction_type": TransactionType.SELL},
+                then=base_cost - total_fees,
+            ),
+            default=base_cost + total_fees,
+        )
+    )
+    market_rate = NullIf(
+        Cast(
+            Round(get_rate_subquery(f"{prefix}stock_id", date), 2),
+            models.DecimalField(max_digits=14, decimal_places=2),
+        ),
+        _ZERO,
+    )
+    market_value = _amount(NullIf(Round(market_rate * quantity, 2), _ZERO))
+    return {
+        "cost": cost,
+        "market_rate": market_rate,
+        "market_value": market_value,
+        "return_value": _amount(market_value - cost),
+    }
+
+
+def annotate_investment_values(
+    queryset: models.QuerySet[Investment], date: typing.Optional[datetime.date] = None
+) -> models.QuerySet[Investment]:
+    """
+    Annotate investments with their `cost_amount`, `market_rate`, `market_value` and `return_amount`.
+
+    :param queryset: The investments.
+    :param date: Value the investments on this date. If not provided, the latest rates are used.
+    """
+    expressions = get_investment_value_expressions(date=date)
+    return queryset.annotate(
+        cost_amount=expressions["cost"],
+        market_rate=expressions["market_rate"],
+        market_value=expressions["market_value"],
+        return_amount=expressions["return_value"],
+    )
+
+
+class PortfolioValuation(typing.NamedTuple):
+    """Valuation of a portfolio's investments"""
+
+    invested_capital: decimal.Decimal
+    """Total cost of the investments"""
+    total_return: decimal.Decimal
+    """Total return on the investments that have a market rate"""
+
+
+EMPTY_VALUATION = PortfolioValuation(
+    invested_capital=decimal.Decimal("0.00"), total_return=decimal.Decimal("0.00")
+)
+
+
+def get_portfolio_valuations(
+    portfolios: typing.Iterable[typing.Union[Portfolio, typing.Any]],
+    date: typing.Optional[datetime.date] = None,
+) -> typing.Dict[typing.Any, PortfolioValuation]:
+    """
+    Value the investments of many portfolios in a single query.
+
+    :param portfolios: The portfolios, or their IDs.
+    :param date: Value the investments on this date. If not provided, the latest rates are used.
+    :return: A mapping of portfolio IDs to their valuations. Portfolios without investments
+        have an empty valuation.
+    """
+    portfolio_ids = [
+        portfolio.pk if isinstance(portfolio, Portfolio) else portfolio
+        for portfolio in portfolios
+    ]
+    if not portfolio_ids:
+        return {}
+
+    expressions = get_investment_value_expressions(date=date)
+    totals = (
+        Investment.objects.filter(portfolio_id__in=portfolio_ids)
+        .order_by()
+        .values("portfolio_id")
+        .annotate(
+            invested_capital=Coalesce(models.Sum(expressions["cost"]), _ZERO),
+            total_return=Coalesce(models.Sum(expressions["return_value"]), _ZERO),
+        )
+    )
+    valuations = dict.fromkeys(portfolio_ids, EMPTY_VALUATION)
+    for row in totals:
+        valuations[row["portfolio_id"]] = PortfolioValuation(
+            invested_capital=decimal.Decimal(row["invested_capital"]).quantize(
+                TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+            ),
+            total_return=decimal.Decimal(row["total_return"]).quantize(
+                TWO_PLACES, rounding=decimal.ROUND_HALF_UP
+            ),
+        )
+    return valuations
+
+
+
+def get_portfolio_namespace(portfolio_id: typing.Any) -> str:
+    """Returns the valuation cache namespace of a portfolio's investments"""
+    return f"portfolio:{portfolio_id}"
+
+
+def invalidate_portfolio_valuations(*portfolio_ids: typing.Any) -> None:
+    """Invalidate the cached valuations of portfolios. Call after their investments change."""
+    valuation_cache.bump(
+        *(get_portfolio_namespace(portfolio_id) for portfolio_id in portfolio_ids)
+    )
+
+
+def get_cached_portfolio_valuation(
+    portfolio_id: typing.Any, date: typing.Optional[datetime.date] = None
+) -> PortfolioValuation:
+    """
+    Value a portfolio's investments, using the valuation cache.
+
+    :param portfolio_id: The ID of the portfolio.
+    :param date: Value the investments on this date. If not provided, the latest rates are used.
+    """
+    key = ("portfolio", str(portfolio_id), date.isoformat() if date else None)
+    if date is not None:
+        # Rates are filtered by date in the current timezone
+        key += (timezone.get_current_timezone_name(),)
+    return valuation_cache.get_or_set(
+        key,
+        lambda: get_portfolio_valuations([portfolio_id], date)[portfolio_id],
+        namespaces=(RATES_NAMESPACE, get_portfolio_namespace(portfolio_id)),
+    )
@@ -9,33 +9,35 @@ from django.http import JsonResponse, HttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.db.models import Q
-from django.db.models.functions import TruncDate
 from django.utils import timezone
 import datetime
 from django.shortcuts import render
 from django.core.mail import send_mail
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 
-from .models import Portfolio, Investment
+from .models import Portfolio, Investment, TransactionUpload, TransactionUploadStatus
 from apps.stocks.models import Stock
+from apps.stocks.helpers import get_latest_prices
 from .forms import PortfolioCreateForm, InvestmentAddForm, PortfolioUpdateForm
 from helpers.exceptions import capture
 from helpers.logging import log_exception
 from .helpers import (
-    get_investments_allocation_piechart_data,
+    get_portfolio_allocation_piechart_data,
     get_portfolio_performance_graph_data,
     get_stocks_invested_from_investments,
 )
 from .transactions_upload import (
-    handle_transactions_file,
+    stage_transactions_upload,
     get_transactions_upload_template,
     TransactionUploadError,
     EXPECTED_TRANSACTION_COLUMNS,
 )
 from .stock_summary import generate_portfolio_stocks_summary
+from .comparison import compare_transactions
 
 
 portfolio_qs = Portfolio.objects.select_related("owner").all()
@@ -71,17 +73,20 @@ class PortfolioListView(LoginRequiredMixin, generic.ListView):
         investments = Investment.objects.filter(
             portfolio__owner=user
         ).select_related('stock', 'portfolio')
+        # Fetch the current prices of all invested stocks at once, instead of per investment
+        prices = get_latest_prices({investment.stock_id for investment in investments})
         
         # Group investments by stock and portfolio
         holdings_data = []
         for investment in investments:
             stock = investment.stock
             portfolio = investment.portfolio
+            price = prices.get(investment.stock_id)
             
             # Calculate return percentage
             try:
-                if stock and stock.price and investment.rate:
-                    return_percentage = ((stock.price - investment.rate) / investment.rate) * 100
+                if stock and price and investment.rate:
+                    return_percentage = ((price - investment.rate) / investment.rate) * 100
                 else:
                     return_percentage = 0
             except (TypeError, ZeroDivisionError):
@@ -93,15 +98,29 @@ class PortfolioListView(LoginRequiredMixin, generic.ListView):
                 'company_name': stock.title if stock else 'N/A',
                 'quantity': investment.quantity,
                 'avg_cost': investment.rate,
-                'market_price': stock.price if stock else investment.rate,
+                'market_price': price if stock else investment.rate,
                 'return_percentage': return_percentage,
                 'portfolio_id': str(portfolio.id),
                 'stock_id': str(stock.id) if stock else None
             })
         
         context['holdings_data'] = holdings_data
+        context['transactions_upload'] = self.get_transactions_upload()
         return context
 
+    def get_transactions_upload(self):
+        """The requested transactions upload, or else the latest one still being processed"""
+        uploads = TransactionUpload.objects.filter(owner=self.request.user)
+        upload_id = self.request.GET.get("upload", None)
+        if upload_id:
+            try:
+                return uploads.filter(id=upload_id).first()
+            except ValidationError:
+                return None
+        return uploads.exclude(
+            status__in=[TransactionUploadStatus.COMPLETED, TransactionUploadStatus.FAILED]
+        ).first()
+
     def post(self, request, *args, **kwargs):
          """Handle transaction file uploads with detailed debugging"""
          import logging
@@ -121,24 +140,19 @@ class PortfolioListView(LoginRequiredMixin, generic.ListView):
          logger.info(f"File received: {transactions_file.name}, Size: {transactions_file.size}")
             
          try:
-                logger.info(f"Starting transaction upload for user: {request.user}")
-                
-                # Check initial investment count
-                initial_count = Investment.objects.filter(portfolio__owner=request.user).count()
-                logger.info(f"Initial investment count for user: {initial_count}")
-                
-                # The handle_transactions_file function returns None, not a dict
-                handle_transactions_file(transactions_file, request.user)
-                
-                # Check final investment count
-                final_count = Investment.objects.filter(portfolio__owner=request.user).count()
-                logger.info(f"Final investment count for user: {final_count}")
-                logger.info(f"New investments created: {final_count - initial_count}")
-                
-                logger.info("Transaction upload completed successfully")
-                messages.success(request, f"Transactions uploaded successfully! Created {final_count - initial_count} investments.")
-                return redirect("portfolios:portfolio_list")
-                
+                upload = stage_transactions_upload(transactions_file, request.user)
+                logger.info(f"Transactions upload {upload.pk} staged for user: {request.user}")
+                if upload.status == TransactionUploadStatus.FAILED:
+                    for error in upload.errors:
+                        messages.error(request, error)
+                elif upload.is_finished:
+                    messages.success(request, f"Transactions uploaded successfully! Created {upload.rows_imported} investments.")
+                else:
+                    messages.info(request, "Transactions upload received. Your transactions are being imported.")
+                return redirect(
+                    f"{reverse('portfolios:portfolio_list')}?upload={upload.pk}"
+                )
+
          except TransactionUploadError as exc:
                 logger.error(f"TransactionUploadError: {exc}")
                 messages.error(request, str(exc))
@@ -225,9 +239,7 @@ class PortfolioDetailView(LoginRequiredMixin, generic.ListView):
             investments.select_related("stock")
         )
         context["pie_chart_data"] = json.dumps(
-            get_investments_allocation_piechart_data(
-                investments.select_related("stock")
-            )
+            get_portfolio_allocation_piechart_data(portfolio)
         )
 
         # Performance data is no longer calculated and sent pre-page load
@@ -290,6 +302,25 @@ class PortfolioPerformanceDataView(LoginRequiredMixin, generic.View):
         )
 
 
+class TransactionUploadStatusView(LoginRequiredMixin, generic.View):
+    """Processing status and progress of a transactions upload, for the UI to poll"""
+
+    http_method_names = ["get"]
+
+    def get(self, request, *args: Any, **kwargs: Any) -> JsonResponse:
+        upload = get_object_or_404(
+            TransactionUpload, id=self.kwargs["upload_id"], owner=request.user
+        )
+        return JsonResponse(
+            data={
+                "status": "success",
+                "detail": "Upload status fetched successfully",
+                "data": upload.get_progress(),
+            },
+            status=200,
+        )
+
+
 @capture.enable
 @capture.capture(content="Oops! An error occurred")
 class PortfolioUpdateView(LoginRequiredMixin, generic.View):
@@ -476,12 +507,13 @@ class TransactionCompareView(LoginRequiredMixin, generic.TemplateView):
         if selected_portfolio:
             investments_query = investments_query.filter(portfolio=selected_portfolio)
             
-        investments = investments_query.annotate(
-            transaction_day=TruncDate('transaction_date')
-        ).values('transaction_day').distinct().order_by('-transaction_day')
-        
-        # Get the dates as a list
-        transaction_dates = [inv['transaction_day'] for inv in investments if inv['transaction_day']]
+        # Transaction dates are already dates, so there is nothing to truncate
+        transaction_dates = list(
+            investments_query.filter(transaction_date__isnull=False)
+            .order_by('-transaction_date')
+            .values_list('transaction_date', flat=True)
+            .distinct()
+        )
         
         # Default to the two most recent dates if available
         date1 = self.request.GET.get('date1')
@@ -506,10 +538,6 @@ class TransactionCompareView(LoginRequiredMixin, generic.TemplateView):
         if not date2 and len(transaction_dates) > 1:
             date2 = transaction_dates[1]
         
-        # Get transactions for the selected dates
-        transactions1 = []
-        transactions2 = []
-        
         transactions_query = Investment.objects.filter(portfolio__owner=user)
         
         # Filter by portfolio if selected
@@ -518,89 +546,18 @@ class TransactionCompareView(LoginRequiredMixin, generic.TemplateView):
         
         # Get selected stocks to compare
         selected_stocks = self.request.GET.getlist('stocks')
-        
-        if date1:
-            date1_query = transactions_query.filter(transaction_date=date1)
-            if selected_stocks:
-                date1_query = date1_query.filter(stock__ticker__in=selected_stocks)
-            transactions1 = date1_query.select_related('stock', 'portfolio')
-        
-        if date2:
-            date2_query = transactions_query.filter(transaction_date=date2)
-            if selected_stocks:
-                date2_query = date2_query.filter(stock__ticker__in=selected_stocks)
-            transactions2 = date2_query.select_related('stock', 'portfolio')
+        if selected_stocks:
+            transactions_query = transactions_query.filter(stock__ticker__in=selected_stocks)
         
         # Get all available stocks for selection
-        all_available_stocks = set()
-        for t in Investment.objects.filter(portfolio__owner=user).select_related('stock'):
-            if t.stock:
-                all_available_stocks.add((t.stock.ticker, t.stock.title))
-        
-        # Prepare comparison data
-        comparison_data = []
-        
-        # Create a set of all symbols from both transaction sets
-        all_symbols = set()
-        for t in transactions1:
-            if t.stock:
-                all_symbols.add(t.stock.ticker)
-        
-        for t in transactions2:
-            if t.stock:
-                all_symbols.add(t.stock.ticker)
-        
-        # For each symbol, find the transactions and compare them
-        for symbol in all_symbols:
-            t1_list = [t for t in transactions1 if t.stock and t.stock.ticker == symbol]
-            t2_list = [t for t in transactions2 if t.stock and t.stock.ticker == symbol]
-            
-            # Calculate totals for date1
-            t1_buy_qty = sum(t.quantity for t in t1_list if t.transaction_type == 'buy')
-            t1_sell_qty = sum(t.quantity for t in t1_list if t.transaction_type == 'sell')
-            t1_avg_rate = sum(t.rate * t.quantity for t in t1_list) / sum(t.quantity for t in t1_list) if t1_list else 0
-            t1_total_cost = sum(t.cost for t in t1_list)
-            
-            # Calculate totals for date2
-            t2_buy_qty = sum(t.quantity for t in t2_list if t.transaction_type == 'buy')
-            t2_sell_qty = sum(t.quantity for t in t2_list if t.transaction_type == 'sell')
-            t2_avg_rate = sum(t.rate * t.quantity for t in t2_list) / sum(t.quantity for t in t2_list) if t2_list else 0
-            t2_total_cost = sum(t.cost for t in t2_list)
-            
-            # Calculate differences
-            qty_diff = (t1_buy_qty - t1_sell_qty) - (t2_buy_qty - t2_sell_qty)
-            rate_diff = t1_avg_rate - t2_avg_rate
-            cost_diff = t1_total_cost - t2_total_cost
-            
-            # Get stock name
-            stock_name = t1_list[0].stock.title if t1_list else (t2_list[0].stock.title if t2_list else "Unknown")
-            
-            comparison_data.append({
-                'ticker': symbol,
-                'name': stock_name,
-                'date1': {
-                    'buy_qty': t1_buy_qty,
-                    'sell_qty': t1_sell_qty,
-                    'net_qty': t1_buy_qty - t1_sell_qty,
-                    'avg_rate': t1_avg_rate,
-                    'total_cost': t1_total_cost
-                },
-                'date2': {
-                    'buy_qty': t2_buy_qty,
-                    'sell_qty': t2_sell_qty,
-                    'net_qty': t2_buy_qty - t2_sell_qty,
-                    'avg_rate': t2_avg_rate,
-                    'total_cost': t2_total_cost
-                },
-                'diff': {
-                    'qty': qty_diff,
-                    'rate': rate_diff,
-                    'cost': cost_diff
-                }
-            })
+        all_available_stocks = set(
+            Stock.objects.filter(
+                id__in=Investment.objects.filter(portfolio__owner=user).values("stock_id")
+            ).values_list("ticker", "title")
+        )
         
-        # Sort comparison data by symbol
-        comparison_data.sort(key=lambda x: x['ticker'])
+        # Totals of the transactions per stock on each date, computed in the database
+        comparison_data = compare_transactions(transactions_query, date1, date2)
         
         context.update({
             'portfolios': portfolios,
@@ -710,29 +667,24 @@ class PortfolioTransactionsAPIView(LoginRequiredMixin, generic.View):
     """API endpoint to fetch portfolio transactions from the database."""
     http_method_names = ['get']
     
-    def _get_stock_data(self, stock, transaction_rate):
+    def _get_stock_data(self, stock, transaction_rate, prices):
         """
         Helper function to safely get stock data with proper error handling and fallbacks
         
         Args:
             stock: The stock model instance
             transaction_rate: The transaction rate to use as fallback
+            prices: Current prices of the stocks, keyed by stock ID
             
         Returns:
             tuple: (current_price, avg_buy_rate)
         """
-        # Initialize with safe defaults
-        current_price = None
+        # Use the prefetched current price, and safe defaults otherwise
+        current_price = prices.get(stock.pk)
         avg_buy_rate = 0
         
         # Handle potential attribute errors safely
         try:
-            # Try to get current price from different possible attributes
-            if hasattr(stock, 'price') and stock.price is not None:
-                current_price = stock.price
-            elif hasattr(stock, 'current_rate') and stock.current_rate is not None:
-                current_price = stock.current_rate
-                
             # Try to get average buy rate if it exists
             if hasattr(stock, 'avg_buy_rate') and stock.avg_buy_rate is not None:
                 avg_buy_rate = stock.avg_buy_rate
@@ -760,13 +712,15 @@ class PortfolioTransactionsAPIView(LoginRequiredMixin, generic.View):
                 query = query.filter(portfolio_id=portfolio_id)
             
             # Get the latest transactions
-            transactions = query.select_related('stock', 'portfolio').order_by('-transaction_date')[:limit]
+            transactions = list(query.select_related('stock', 'portfolio').order_by('-transaction_date')[:limit])
+            # Fetch the current prices of all transacted stocks at once, instead of per transaction
+            prices = get_latest_prices({transaction.stock_id for transaction in transactions})
             
             # Format transactions for frontend
             transaction_data = []
             for transaction in transactions:
                 # Get stock data safely
-                current_price, avg_buy_rate = self._get_stock_data(transaction.stock, transaction.rate)
+                current_price, avg_buy_rate = self._get_stock_data(transaction.stock, transaction.rate, prices)
                 
                 # Calculate return
                 try:
@@ -898,3 +852,4 @@ transaction_compare_view = TransactionCompareView.as_view()
 email_notification_view = EmailNotificationView.as_view()
 portfolio_transactions_api_view = PortfolioTransactionsAPIView.as_view()
 portfolio_news_api_view = PortfolioNewsAPIView.as_view()
+transaction_upload_status_view = TransactionUploadStatusView.as_view()
@@ -0,0 +1,138 @@
+"""
+Aggregations backing the screener chart endpoints.
+
+All aggregations run in the database, and the serialized chart payloads are cached
+per (endpoint, parameters) along with an ETag, so repeat chart loads cost a cache
+lookup (or a 304 response) instead of a query.
+"""
+
+import typing
+import datetime
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, Sum
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+
+from .models import Stock
+
+CHART_CACHE_TIMEOUT = 60 * 15
+"""How long (in seconds) serialized chart payloads are cached for"""
+CHART_MAX_AGE = 60
+"""How long (in seconds) clients may reuse a chart response without revalidating"""
+CHART_DATA_VERSION_KEY = "psxscreener:chart_data_version"
+
+
+def get_chart_data_version() -> int:
+    """Returns the current version of the stock data used to build charts"""
+    version = cache.get(CHART_DATA_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(CHART_DATA_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def invalidate_chart_data() -> None:
+    """
+    Invalidate all cached chart payloads.
+
+    Should be called whenever stock data is saved/updated.
+    """
+    try:
+        cache.incr(CHART_DATA_VERSION_KEY)
+    except ValueError:
+        cache.set(CHART_DATA_VERSION_KEY, 2, timeout=None)
+
+
+def get_sector_summary(date: datetime.date) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Aggregate the stocks of a trading date by sector.
+
+    :param date: The trading date.
+    :return: A list of per-sector totals and averages, ordered by sector.
+    """
+    return list(
+        Stock.objects.filter(date=date)
+        .values("sector")
+        .annotate(
+            count=Count("id"),
+            total_market_cap=Sum("market_cap"),
+            avg_market_cap=Avg("market_cap"),
+            total_volume=Sum("volume"),
+            avg_change=Avg("change_percentage"),
+        )
+        .order_by("sector")
+    )
+
+
+def get_market_trend(
+    start_date: datetime.date, end_date: datetime.date
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Aggregate the average price and volume of all stocks per trading date.
+
+    :param start_date: The first trading date.
+    :param end_date: The last trading date.
+    :return: A list of per-date averages, ordered by date.
+    """
+    return list(
+        Stock.objects.filter(date__range=[start_date, end_date])
+        .values("date")
+        .annotate(
+            avg_price=Avg("current_price"),
+            avg_volume=Avg("volume"),
+        )
+        .order_by("date")
+    )
+
+
+def cached_chart_response(
+    request,
+    endpoint: str,
+    params: typing.Iterable[typing.Any],
+    build_data: typing.Callable[[], typing.Optional[typing.Dict[str, typing.Any]]],
+    empty_message: str = "No data available",
+) -> HttpResponse:
+    """
+    Returns a cached chart response, building and caching the chart data if necessary.
+
+    Responds with 304 (Not Modified) if the request's `If-None-Match` header
+    matches the chart data's ETag.
+
+    :param request: The request.
+    :param endpoint: Name of the chart endpoint, used in the cache key.
+    :param params: Parameters that the chart data depends on, used in the cache key.
+    :param build_data: Callable that returns the chart data, or None if there is no data.
+    :param empty_message: Error message returned if there is no data.
+    """
+    cache_key = ":".join(
+        [
+            "psxscreener:chart",
+            endpoint,
+            str(get_chart_data_version()),
+            *(str(param) for param in params),
+        ]
+    )
+    cached = cache.get(cache_key)
+    if cached is None:
+        data = build_data()
+        if not data:
+            return JsonResponse({"error": empty_message}, status=404)
+
+        content = json.dumps(data, cls=DjangoJSONEncoder).encode()
+        cached = {
+            "content": content,
+            "etag": f'"{hashlib.md5(content).hexdigest()}"',
+        }
+        cache.set(cache_key, cached, timeout=CHART_CACHE_TIMEOUT)
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if cached["etag"] in (etag.strip() for etag in if_none_match.split(",")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(cached["content"], content_type="application/json")
+    response["ETag"] = cached["etag"]
+    patch_cache_control(response, public=True, max_age=CHART_MAX_AGE)
+    return response
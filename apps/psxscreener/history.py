@@ -0,0 +1,166 @@
+"""
+Per-symbol price history, loaded as columns and downsampled server-side.
+
+Long date ranges are reduced to a point budget before serialization, either by
+aggregating fixed-size OHLC buckets or with Largest-Triangle-Three-Buckets (LTTB)
+on closing prices, so chart payloads stay small regardless of the range length.
+"""
+
+import typing
+import datetime
+import numpy as np
+
+from .models import Stock
+
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS_LIMIT = 2000
+MAX_HISTORY_DAYS = 365 * 10
+"""Longest date range (in days) that can be requested"""
+
+HISTORY_COLUMNS = ("date", "open_price", "high_price", "low_price", "current_price", "volume")
+
+DOWNSAMPLING_METHODS = ("ohlc", "lttb")
+
+
+class History(typing.NamedTuple):
+    """Columnar price history of a symbol, ordered by date"""
+
+    dates: np.ndarray
+    opens: np.ndarray
+    highs: np.ndarray
+    lows: np.ndarray
+    closes: np.ndarray
+    volumes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def take(self, indices: np.ndarray) -> "History":
+        """Returns the history at the given positions"""
+        return History(*(column[indices] for column in self))
+
+
+def load_symbol_history(
+    symbol: str, start_date: datetime.date, end_date: datetime.date
+) -> History:
+    """
+    Load a symbol's daily price history from the database.
+
+    Only the required columns are fetched, using the (symbol, date) index.
+
+    :param symbol: The stock symbol.
+    :param start_date: The first date to load.
+    :param end_date: The last date to load.
+    """
+    rows = list(
+        Stock.objects.filter(symbol=symbol, date__range=[start_date, end_date])
+        .order_by("date")
+        .values_list(*HISTORY_COLUMNS)
+    )
+    if not rows:
+        return History(*(np.empty(0) for _ in HISTORY_COLUMNS))
+
+    dates, opens, highs, lows, closes, volumes = zip(*rows)
+    return History(
+        dates=np.asarray(dates, dtype="datetime64[D]"),
+        opens=np.asarray(opens, dtype=float),
+        highs=np.asarray(highs, dtype=float),
+        lows=np.asarray(lows, dtype=float),
+        closes=np.asarray(closes, dtype=float),
+        volumes=np.asarray(volumes, dtype=np.int64),
+    )
+
+
+def ohlc_buckets(history: History, max_points: int) -> History:
+    """
+    Downsample history by aggregating consecutive days into at most `max_points` OHLC buckets.
+
+    Each bucket takes the first open, highest high, lowest low, last close and total
+    volume of its days, and is dated by its last day.
+
+    :param history: The history to downsample.
+    :param max_points: The maximum number of points to return.
+    """
+    if len(history) <= max_points:
+        return history
+
+    starts = np.linspace(0, len(history), max_points, endpoint=False).astype(int)
+    ends = np.append(starts[1:], len(history)) - 1
+    return History(
+        dates=history.dates[ends],
+        opens=history.opens[starts],
+        highs=np.maximum.reduceat(history.highs, starts),
+        lows=np.minimum.reduceat(history.lows, starts),
+        closes=history.closes[ends],
+        volumes=np.add.reduceat(history.volumes, starts),
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Select the indices of the points kept by the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are always kept.
+
+    :param x: The x values, in ascending order.
+    :param y: The y values.
+    :param max_points: The number of points to keep. Must be at least 3.
+    """
+    length = len(x)
+    if length <= max_points:
+        return np.arange(length)
+
+    # Buckets between the first and last points
+    edges = np.linspace(1, length - 1, max_points - 1).astype(int)
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = length - 1
+
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else length
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        indices[i + 1] = previous
+    return indices
+
+
+def downsample_history(
+    history: History, max_points: int, method: str = "ohlc"
+) -> History:
+    """
+    Downsample history to at most `max_points` points.
+
+    :param history: The history to downsample.
+    :param max_points: The maximum number of points to return.
+    :param method: "ohlc" to aggregate OHLC buckets, or "lttb" to select the
+        points that best preserve the shape of the closing price line.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unsupported downsampling method: {method}")
+    if len(history) <= max_points:
+        return history
+    if method == "lttb":
+        x = history.dates.astype(np.int64).astype(float)
+        return history.take(lttb_indices(x, history.closes, max(max_points, 3)))
+    return ohlc_buckets(history, max_points)
+
+
+def history_to_columns(history: History) -> typing.Dict[str, typing.List]:
+    """Convert history into compact, JSON-serializable columns"""
+    return {
+        "dates": np.datetime_as_string(history.dates, unit="D").tolist(),
+        "opens": np.round(history.opens, 2).tolist(),
+        "highs": np.round(history.highs, 2).tolist(),
+        "lows": np.round(history.lows, 2).tolist(),
+        "prices": np.round(history.closes, 2).tolist(),
+        "volumes": history.volumes.tolist(),
+    }
@@ -2,8 +2,9 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import datetime, timedelta
-from psxscreener.models import Stock, LastDataUpdate
-from psxscreener.views import fetch_stock_data, save_stock_data, HISTORY_API_URL
+from apps.psxscreener.models import LastDataUpdate
+from apps.psxscreener.views import fetch_stock_data, save_stock_data, HISTORY_API_URL
+from apps.psxscreener.technicals import update_technicals
 import logging
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,10 @@ class Command(BaseCommand):
                 
                 current_start += timedelta(days=batch_size)
 
+            self.stdout.write("Updating technical indicators...")
+            updated_count = update_technicals(since=start_date)
+            self.stdout.write(self.style.SUCCESS(f"Updated technical indicators for {updated_count} stocks"))
+
             self.stdout.write(self.style.SUCCESS("Backfill completed successfully"))
             
         except Exception as e:
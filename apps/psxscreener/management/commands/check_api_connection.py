@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.psxscreener.views import test_api_connection
+
+
+class Command(BaseCommand):
+    help = "Check connectivity to the MGLink stock prices API used by the screener."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Testing API connectivity...")
+        if not test_api_connection():
+            raise CommandError("API connection test failed. Check the logs for details.")
+        self.stdout.write(self.style.SUCCESS("API connection successful."))
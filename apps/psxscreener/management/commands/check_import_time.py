@@ -0,0 +1,84 @@
+import os
+import re
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+SETUP_DONE_MARKER = "-- django setup done --"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the time taken to import the psxscreener app's modules in a fresh "
+        "interpreter, and fail if it exceeds the given budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=300,
+            help="Maximum cumulative import time (in milliseconds) allowed for the app's modules.",
+        )
+        parser.add_argument(
+            "--module",
+            type=str,
+            default="apps.psxscreener.urls",
+            help="Module to import. Defaults to the app's URL configuration, which imports its views.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Number of slowest imports to report.",
+        )
+
+    def handle(self, *args, **options):
+        budget: float = options["budget"]
+        module: str = options["module"]
+        top: int = options["top"]
+
+        # Django is set up before timing starts, so only the app's own import cost is measured
+        code = (
+            "import sys, django; django.setup(); "
+            f"sys.stderr.write({SETUP_DONE_MARKER!r} + '\\n'); sys.stderr.flush(); "
+            f"import {module}"
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Failed to import {module}:\n{result.stderr[-2000:]}")
+
+        # Lines are (self time, cumulative time, indented module name), in microseconds.
+        # Only the app's top-level imports are counted, since nested imports are included in their cumulative time
+        app_prefix = module.rsplit(".", 1)[0]
+        imports = []
+        module_import_output = result.stderr.split(SETUP_DONE_MARKER, 1)[-1]
+        for line in module_import_output.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                imports.append((name, int(self_us), int(cumulative_us), len(indent)))
+
+        app_imports = [entry for entry in imports if entry[0].startswith(app_prefix)]
+        if not app_imports:
+            raise CommandError(f"No imports of {app_prefix} were recorded.")
+        outermost = min(depth for *_, depth in app_imports)
+        total_ms = sum(cumulative for _, _, cumulative, depth in app_imports if depth == outermost) / 1000
+
+        self.stdout.write(f"Slowest imports while importing {module}:")
+        for name, self_us, cumulative_us, _ in sorted(imports, key=lambda entry: entry[1], reverse=True)[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms self, {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+        if total_ms > budget:
+            raise CommandError(
+                f"Importing {module} took {total_ms:.1f} ms, exceeding the budget of {budget:.1f} ms."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Importing {module} took {total_ms:.1f} ms (budget: {budget:.1f} ms).")
+        )
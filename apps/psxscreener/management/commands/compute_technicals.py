@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from apps.psxscreener.technicals import update_technicals
+from apps.psxscreener.scheduled_tasks import schedule_technicals_update
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute or schedule computation of technical indicators (moving averages, RSI, "
+        "52-week range, average volume) for stored stock data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=str,
+            help="First date (YYYY-MM-DD) to compute indicators for. Defaults to the latest date in the database.",
+        )
+        parser.add_argument(
+            "--until",
+            type=str,
+            help="Last date (YYYY-MM-DD) to compute indicators for. Defaults to the latest date in the database.",
+        )
+        parser.add_argument(
+            "--symbols",
+            nargs="+",
+            help="Only compute indicators for these symbols.",
+        )
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="""
+            Schedule a task to compute indicators for the latest date based on the provided interval.
+
+            Deletes the existing schedule if it already exists.
+
+            Defaults to repeating indefinitely every weekday after market close.
+            """,
+        )
+        parser.add_argument(
+            "--repeats",
+            type=int,
+            default=-1,
+            help="Number of times to repeat the task. -1 to repeat indefinitely.",
+        )
+        parser.add_argument(
+            "--cron",
+            type=str,
+            default="0 18 * * 1-5",
+            help="Cron expression defining the interval at which the task should run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            self.schedule_update(repeats=options["repeats"], cron=options["cron"])
+            return
+
+        since = parse_date(options["since"]) if options["since"] else None
+        until = parse_date(options["until"]) if options["until"] else None
+        if since and until and since > until:
+            self.stdout.write(self.style.ERROR("Since date cannot be after until date."))
+            return
+
+        try:
+            self.stdout.write("Computing technical indicators...")
+            updated_count = update_technicals(
+                since=since, until=until, symbols=options["symbols"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully updated technical indicators for {updated_count} stocks."
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(
+                self.style.ERROR(f"Error computing technical indicators: {exc}")
+            )
+
+    def schedule_update(self, **kwargs):
+        try:
+            self.stdout.write(
+                f"Scheduling technical indicators update to run every {kwargs.get('cron')}..."
+            )
+            schedule_technicals_update(**kwargs)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Technical indicators update scheduled to run every {kwargs.get('cron')}."
+                )
+            )
+        except Exception as exc:
+            self.stdout.write(
+                self.style.ERROR(f"Error scheduling technical indicators update: {exc}")
+            )
@@ -1,8 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from django.db.models import Max
 from datetime import datetime, timedelta
-from psxscreener.models import Stock, LastDataUpdate
-from psxscreener.views import fetch_stock_data, save_stock_data, HISTORY_API_URL
+from apps.psxscreener.models import Stock, LastDataUpdate
+from apps.psxscreener.views import fetch_stock_data, save_stock_data, HISTORY_API_URL
+from apps.psxscreener.technicals import update_technicals
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,6 +60,10 @@ class Command(BaseCommand):
                         else:
                             self.stdout.write(self.style.ERROR(f'Failed to save data for {current_date}'))
                         current_date += timedelta(days=1)
+
+                    self.stdout.write('Updating technical indicators...')
+                    updated_count = update_technicals(since=start_date)
+                    self.stdout.write(self.style.SUCCESS(f'Updated technical indicators for {updated_count} stocks'))
                 else:
                     self.stdout.write(self.style.ERROR('Failed to fetch new data from API'))
             else:
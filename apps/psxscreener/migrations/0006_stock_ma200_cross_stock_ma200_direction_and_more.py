@@ -0,0 +1,45 @@
+# Generated by Django 5.1 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('psxscreener', '0005_stock_avg_volume_stock_change_stock_country_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='ma200_cross',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='ma200_direction',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='ma50_cross',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='ma50_direction',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['date', 'rsi14'], name='psxscreener_date_96e184_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['date', 'ma50_cross'], name='psxscreener_date_66505f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(fields=['date', 'ma200_cross'], name='psxscreener_date_c8ab31_idx'),
+        ),
+    ]
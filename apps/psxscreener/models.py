@@ -34,6 +34,12 @@ class Stock(models.Model):
     avg_volume = models.BigIntegerField(null=True, blank=True)
     relative_volume = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     change = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Moving average trend (1 rising, -1 falling, 0 flat) and crosses
+    # (1 price crossed above, -1 price crossed below, 0 no cross) on this date
+    ma50_direction = models.SmallIntegerField(null=True, blank=True)
+    ma200_direction = models.SmallIntegerField(null=True, blank=True)
+    ma50_cross = models.SmallIntegerField(null=True, blank=True)
+    ma200_cross = models.SmallIntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = ('symbol', 'date')
@@ -43,6 +49,9 @@ class Stock(models.Model):
             models.Index(fields=['date']),
             models.Index(fields=['symbol', 'sector']),
             models.Index(fields=['date', 'sector']),
+            models.Index(fields=['date', 'rsi14']),
+            models.Index(fields=['date', 'ma50_cross']),
+            models.Index(fields=['date', 'ma200_cross']),
         ]
         ordering = ['-date', 'symbol']  # Default ordering
 
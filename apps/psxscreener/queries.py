@@ -0,0 +1,312 @@
+"""
+Database-backed stock screening.
+
+Filters, sorts and paginates the latest trading date's `Stock` rows in the database,
+so that only the requested page of stocks is ever loaded into memory.
+"""
+
+import typing
+import logging
+from django.db import models
+from django.db.models import F, Q, Max, Value
+from django.db.models.functions import NullIf
+from django.core.paginator import Paginator, Page, EmptyPage, PageNotAnInteger
+
+from .models import Stock
+from .filter_service import StockFilterService
+from .schemas import FilterCriteria
+
+logger = logging.getLogger(__name__)
+
+
+FIELD_MAP: typing.Dict[str, str] = {
+    "Symbol": "symbol",
+    "CompanyName": "company_name",
+    "Sector": "sector",
+    "Industry": "industry",
+    "Country": "country",
+    "Exchange": "exchange",
+    "CurrentPrice": "current_price",
+    "ChangePercentage": "change_percentage",
+    "Change": "change",
+    "Volume": "volume",
+    "OpenPrice": "open_price",
+    "HighPrice": "high_price",
+    "LowPrice": "low_price",
+    "VWAP": "vwap",
+    "PE": "pe_ratio",
+    "MarketCap": "market_cap",
+    "DividendYield": "dividend_yield",
+    "PB": "pb_ratio",
+    "PS": "ps_ratio",
+    "RSI14": "rsi14",
+    "MA50": "ma50",
+    "MA200": "ma200",
+    "MA50Direction": "ma50_direction",
+    "MA200Direction": "ma200_direction",
+    "YearHigh": "year_high",
+    "YearLow": "year_low",
+    "AvgVolume": "avg_volume",
+    "RelativeVolume": "relative_volume",
+    "VolumeToAvgRatio": "relative_volume",
+}
+"""Mapping of screener (API/template) column names to `Stock` model fields"""
+
+_ratio_field = models.DecimalField(max_digits=20, decimal_places=6)
+
+DERIVED_FIELDS: typing.Dict[str, typing.Tuple[str, models.Expression]] = {
+    "PriceToMA50Ratio": (
+        "price_to_ma50_ratio",
+        models.ExpressionWrapper(
+            F("current_price") / NullIf(F("ma50"), Value(0)),
+            output_field=_ratio_field,
+        ),
+    ),
+    "PriceToMA200Ratio": (
+        "price_to_ma200_ratio",
+        models.ExpressionWrapper(
+            F("current_price") / NullIf(F("ma200"), Value(0)),
+            output_field=_ratio_field,
+        ),
+    ),
+    "YearHighRatio": (
+        "year_high_ratio",
+        models.ExpressionWrapper(
+            F("current_price") * 100 / NullIf(F("year_high"), Value(0)),
+            output_field=_ratio_field,
+        ),
+    ),
+    "YearLowRatio": (
+        "year_low_ratio",
+        models.ExpressionWrapper(
+            (F("current_price") - F("year_low")) * 100 / NullIf(F("year_low"), Value(0)),
+            output_field=_ratio_field,
+        ),
+    ),
+    "YearRangePercentile": (
+        "year_range_percentile",
+        models.ExpressionWrapper(
+            (F("current_price") - F("year_low"))
+            * 100
+            / NullIf(F("year_high") - F("year_low"), Value(0)),
+            output_field=_ratio_field,
+        ),
+    ),
+}
+"""
+Mapping of screener column names that are computed from other `Stock` fields,
+to the alias and expression used to compute them in the database.
+"""
+
+DERIVED_FLAGS: typing.Dict[str, Q] = {
+    # Same thresholds used by `views.process_stock_data`
+    "IsNewHigh": Q(year_high_ratio__gt=98),
+    "IsNewLow": Q(year_low_ratio__lt=2),
+    "CrossedAboveMA50": Q(ma50_cross=1),
+    "CrossedBelowMA50": Q(ma50_cross=-1),
+    "CrossedAboveMA200": Q(ma200_cross=1),
+    "CrossedBelowMA200": Q(ma200_cross=-1),
+}
+"""Mapping of boolean screener columns to the equivalent database condition"""
+
+_DERIVED_FLAG_DEPENDENCIES = {
+    "IsNewHigh": "YearHighRatio",
+    "IsNewLow": "YearLowRatio",
+}
+
+LOOKUPS = {
+    "gt": "gt",
+    "gte": "gte",
+    "lt": "lt",
+    "lte": "lte",
+    "eq": "exact",
+    "exact": "iexact",
+    "contains": "icontains",
+    "between": "range",
+    "in": "in",
+}
+"""Mapping of filter condition types to Django field lookups"""
+
+
+def get_latest_trading_date():
+    """Returns the most recent date for which stock data exists in the database"""
+    return Stock.objects.aggregate(latest=Max("date"))["latest"]
+
+
+def get_latest_stocks() -> models.QuerySet[Stock]:
+    """Returns a queryset of the latest trading date's stocks"""
+    latest_date = get_latest_trading_date()
+    if latest_date is None:
+        return Stock.objects.none()
+    return Stock.objects.filter(date=latest_date)
+
+
+def condition_to_q(condition: typing.Dict[str, typing.Any]) -> typing.Optional[Q]:
+    """
+    Convert a filter condition, as built by `StockFilterService.build_filter_conditions`,
+    into a `Q` object.
+
+    Conditions on derived columns expect the queryset to have been aliased
+    using `alias_derived_fields`.
+
+    :param condition: The filter condition.
+    :return: The `Q` object or None if the condition cannot be applied in the database.
+    """
+    column = condition["column"]
+    filter_type = condition["type"]
+    value = condition["value"]
+
+    if column in DERIVED_FLAGS:
+        q = DERIVED_FLAGS[column]
+        if filter_type == "eq" and value is False:
+            return ~q
+        return q if filter_type == "eq" else None
+
+    if column in FIELD_MAP:
+        field_name = FIELD_MAP[column]
+    elif column in DERIVED_FIELDS:
+        field_name = DERIVED_FIELDS[column][0]
+    else:
+        return None
+
+    if filter_type == "neq":
+        return ~Q(**{field_name: value})
+    lookup = LOOKUPS.get(filter_type)
+    if lookup is None:
+        return None
+    return Q(**{f"{field_name}__{lookup}": value})
+
+
+def alias_derived_fields(
+    queryset: models.QuerySet[Stock], columns: typing.Iterable[str]
+) -> models.QuerySet[Stock]:
+    """
+    Add aliases for the derived columns required to filter/sort the queryset.
+
+    :param queryset: The queryset to alias.
+    :param columns: The screener column names in use.
+    """
+    aliases = {}
+    for column in columns:
+        column = _DERIVED_FLAG_DEPENDENCIES.get(column, column)
+        if column in DERIVED_FIELDS:
+            alias, expression = DERIVED_FIELDS[column]
+            aliases[alias] = expression
+    if not aliases:
+        return queryset
+    return queryset.alias(**aliases)
+
+
+def build_filter_query(
+    filter_criteria: typing.Union[FilterCriteria, typing.Mapping[str, typing.Any]],
+) -> typing.Tuple[Q, typing.List[str]]:
+    """
+    Translate filter criteria into a single `Q` object.
+
+    :param filter_criteria: The filter criteria.
+    :return: A tuple of the combined `Q` object and the screener columns it references.
+    """
+    if not isinstance(filter_criteria, FilterCriteria):
+        filter_criteria = FilterCriteria(**filter_criteria)
+
+    conditions = StockFilterService().build_filter_conditions(filter_criteria)
+    query = Q()
+    columns = []
+    for condition_id, condition in conditions.items():
+        q = condition_to_q(condition)
+        if q is None:
+            logger.warning(
+                f"Filter '{condition_id}' on column '{condition['column']}' "
+                "cannot be applied in the database. Skipping."
+            )
+            continue
+        query &= q
+        columns.append(condition["column"])
+    return query, columns
+
+
+def get_ordering(sort_by: str, sort_order: str = "asc") -> typing.List[models.OrderBy]:
+    """
+    Returns the database ordering for a screener sort column.
+
+    Null values are always sorted last. Symbol is used as a tie-breaker
+    to keep pages stable.
+
+    :param sort_by: The screener column to sort by.
+    :param sort_order: "asc" or "desc".
+    """
+    field_name = FIELD_MAP.get(sort_by) or DERIVED_FIELDS.get(sort_by, (None,))[0]
+    if field_name is None:
+        field_name = "symbol"
+
+    descending = sort_order.lower() == "desc"
+    ordering = [
+        F(field_name).desc(nulls_last=True)
+        if descending
+        else F(field_name).asc(nulls_last=True)
+    ]
+    if field_name != "symbol":
+        ordering.append(F("symbol").asc())
+    return ordering
+
+
+def screen_stocks(
+    filter_criteria: typing.Union[FilterCriteria, typing.Mapping[str, typing.Any]],
+    *,
+    sort_by: str = "Symbol",
+    sort_order: str = "asc",
+    queryset: typing.Optional[models.QuerySet[Stock]] = None,
+) -> models.QuerySet[Stock]:
+    """
+    Filter and sort stocks in the database.
+
+    :param filter_criteria: The filter criteria.
+    :param sort_by: The screener column to sort by.
+    :param sort_order: "asc" or "desc".
+    :param queryset: The queryset to screen. Defaults to the latest trading date's stocks.
+    :return: The filtered and sorted (lazy) queryset.
+    """
+    if queryset is None:
+        queryset = get_latest_stocks()
+
+    query, columns = build_filter_query(filter_criteria)
+    queryset = alias_derived_fields(queryset, [*columns, sort_by])
+    return queryset.filter(query).order_by(*get_ordering(sort_by, sort_order))
+
+
+def stock_to_dict(stock: Stock) -> typing.Dict[str, typing.Any]:
+    """Convert a `Stock` instance into the dictionary format used by the screener templates"""
+    data = {}
+    for column, field_name in FIELD_MAP.items():
+        value = getattr(stock, field_name)
+        if value is not None and not isinstance(value, (str, int)):
+            value = float(value)
+        data[column] = value
+
+    data["Date"] = stock.date.strftime("%Y-%m-%d")
+    data["LastUpdated"] = stock.updated_at.strftime("%Y-%m-%d %H:%M:%S")
+    return data
+
+
+def paginate_stocks(
+    queryset: models.QuerySet[Stock], page: typing.Any, per_page: int
+) -> Page:
+    """
+    Paginate a screened queryset using LIMIT/OFFSET.
+
+    Only the requested page's rows are fetched and converted to dictionaries.
+
+    :param queryset: The screened queryset.
+    :param page: The requested page number. Invalid pages resolve to the first/last page.
+    :param per_page: The number of stocks per page.
+    """
+    paginator = Paginator(queryset, per_page)
+    try:
+        stocks_page = paginator.page(page)
+    except PageNotAnInteger:
+        stocks_page = paginator.page(1)
+    except EmptyPage:
+        stocks_page = paginator.page(paginator.num_pages)
+
+    stocks_page.object_list = [stock_to_dict(stock) for stock in stocks_page.object_list]
+    return stocks_page
@@ -0,0 +1,36 @@
+import datetime
+from django_q.tasks import schedule
+from django_q.models import Schedule
+from django.utils import timezone
+
+
+def schedule_technicals_update(
+    repeats: int = -1,
+    cron: str = "0 18 * * 1-5",
+):
+    """
+    Schedule the task to recompute technical indicators for the latest trading date.
+
+    Deletes the existing schedule if it already exists.
+
+    :param repeats: Number of times to repeat the task. -1 to repeat indefinitely.
+    :param cron: Cron expression defining the interval at which the task should run.
+        Defaults to every weekday after market close.
+    """
+    task_name = "apps.psxscreener.technicals.update_technicals"
+    # Delete the schedule if it already exists
+    Schedule.objects.filter(func=task_name).delete()
+
+    schedule(
+        task_name,
+        q_options={
+            "retry": 1220,
+            "save": True,
+        },
+        timeout=1200,
+        schedule_type="C",
+        repeats=repeats,
+        cron=cron,
+        # Set the next run time to 10 seconds from now to avoid running the task immediately
+        next_run=(timezone.now() + datetime.timedelta(seconds=10)),
+    )
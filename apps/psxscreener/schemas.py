@@ -119,6 +119,7 @@ class FilterCriteria(BaseModel):
     """Pydantic model for filter parameters"""
     symbol: Optional[str] = None
     exchange: Optional[str] = Field(None, description="Exchange code (PSX, NYSE, NASDAQ, etc.)")
+    index: Optional[str] = Field(None, description="Index (KSE100, KSE30, KMI30, etc.)")
     sector: Optional[str] = Field(None, description="Sector name")
     industry: Optional[str] = Field(None, description="Industry name")
     country: Optional[str] = Field(None, description="Country (Pakistan, USA, etc.)")
@@ -0,0 +1,140 @@
+"""
+Static sector and industry mappings for PSX symbols.
+
+The mappings are built on first use and reused afterwards,
+instead of being rebuilt on every call that needs them.
+"""
+
+import functools
+import typing
+
+
+@functools.lru_cache(maxsize=None)
+def get_core_symbol_sectors() -> typing.Dict[str, str]:
+    """Returns the sectors of PSX symbols used when saving stock data to the database"""
+    return {
+        # Sugar & Allied Industries
+        'AABS': 'Sugar & Allied Industries',
+        'HABSM': 'Sugar & Allied Industries',
+        'MRNS': 'Sugar & Allied Industries',
+        'SASML': 'Sugar & Allied Industries',
+
+        # Oil & Gas
+        'OGDC': 'Oil & Gas', 'PPL': 'Oil & Gas', 'PSO': 'Oil & Gas', 'MARI': 'Oil & Gas',
+        'APL': 'Oil & Gas', 'ATRL': 'Oil & Gas', 'PRL': 'Oil & Gas', 'BYCO': 'Oil & Gas',
+        'SNGP': 'Oil & Gas', 'SSGC': 'Oil & Gas', 'POL': 'Oil & Gas', 'NRL': 'Oil & Gas',
+
+        # Banking
+        'HBL': 'Banking', 'UBL': 'Banking', 'MCB': 'Banking', 'BAHL': 'Banking',
+        'MEBL': 'Banking', 'BAFL': 'Banking', 'ABL': 'Banking', 'BOP': 'Banking',
+        'AKBL': 'Banking', 'FABL': 'Banking', 'NBP': 'Banking', 'JSBL': 'Banking',
+
+        # Cement
+        'LUCK': 'Cement', 'DGKC': 'Cement', 'FCCL': 'Cement', 'MLCF': 'Cement',
+        'PIOC': 'Cement', 'CHCC': 'Cement', 'KOHC': 'Cement', 'ACPL': 'Cement',
+        'POWER': 'Cement', 'GWLC': 'Cement', 'BWCL': 'Cement',
+
+        # Technology
+        'SYS': 'Technology', 'TRG': 'Technology', 'AVN': 'Technology',
+        'NETSOL': 'Technology', 'TPL': 'Technology', 'OCTOPUS': 'Technology',
+
+        # Add more sectors as needed...
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_symbol_sectors() -> typing.Dict[str, str]:
+    """Returns the sectors of common PSX symbols used when processing live API data"""
+    return {
+        # Oil & Gas
+        'OGDC': 'Oil & Gas', 'PPL': 'Oil & Gas', 'PSO': 'Oil & Gas', 'MARI': 'Oil & Gas',
+        'APL': 'Oil & Gas', 'ATRL': 'Oil & Gas', 'PRL': 'Oil & Gas', 'BYCO': 'Oil & Gas',
+        'SNGP': 'Oil & Gas', 'SSGC': 'Oil & Gas', 'POL': 'Oil & Gas', 'NRL': 'Oil & Gas',
+        'GHGL': 'Oil & Gas', 'SHEL': 'Oil & Gas', 'HASCOL': 'Oil & Gas', 'PSX': 'Oil & Gas',
+
+        # Banking
+        'HBL': 'Banking', 'UBL': 'Banking', 'MCB': 'Banking', 'BAHL': 'Banking',
+        'MEBL': 'Banking', 'BAFL': 'Banking', 'ABL': 'Banking', 'BOP': 'Banking',
+        'AKBL': 'Banking', 'FABL': 'Banking', 'NBP': 'Banking', 'JSBL': 'Banking',
+        'BIPL': 'Banking', 'SILK': 'Banking', 'BOK': 'Banking', 'HMB': 'Banking',
+
+        # Cement
+        'LUCK': 'Cement', 'DGKC': 'Cement', 'FCCL': 'Cement', 'MLCF': 'Cement',
+        'PIOC': 'Cement', 'CHCC': 'Cement', 'KOHC': 'Cement', 'ACPL': 'Cement',
+        'POWER': 'Cement', 'GWLC': 'Cement', 'KOHC': 'Cement', 'BWCL': 'Cement',
+        'FECTC': 'Cement', 'LCL': 'Cement', 'MCL': 'Cement', 'PFL': 'Cement',
+
+        # Fertilizer
+        'EFERT': 'Fertilizer', 'FFC': 'Fertilizer', 'ENGRO': 'Fertilizer',
+        'FFBL': 'Fertilizer', 'FATIMA': 'Fertilizer', 'DAAG': 'Fertilizer',
+        'SING': 'Fertilizer', 'PKGS': 'Fertilizer', 'AGL': 'Fertilizer',
+
+        # Technology
+        'SYS': 'Technology', 'TRG': 'Technology', 'AVN': 'Technology',
+        'NETSOL': 'Technology', 'TPL': 'Technology', 'OCTOPUS': 'Technology',
+        'INIL': 'Technology', 'PAEL': 'Technology', 'TELE': 'Technology',
+
+        # Automobile
+        'HCAR': 'Automobile', 'INDU': 'Automobile', 'PSMC': 'Automobile',
+        'GHNL': 'Automobile', 'AGTL': 'Automobile', 'MTL': 'Automobile',
+        'GATM': 'Automobile', 'SAZEW': 'Automobile', 'ATLH': 'Automobile',
+
+        # Power
+        'HUBC': 'Power', 'KAPCO': 'Power', 'KEL': 'Power', 'NPL': 'Power',
+        'NCPL': 'Power', 'SPWL': 'Power', 'HASCOL': 'Power', 'PKGP': 'Power',
+        'LPL': 'Power', 'EPQL': 'Power', 'SEARL': 'Power',
+
+        # Textile
+        'NML': 'Textile', 'GATM': 'Textile', 'ILP': 'Textile', 'KTML': 'Textile',
+        'NCL': 'Textile', 'GADT': 'Textile', 'RUBY': 'Textile', 'SILK': 'Textile',
+        'BWHL': 'Textile', 'NPTL': 'Textile', 'TREET': 'Textile',
+
+        # Food
+        'UNITY': 'Food', 'ASC': 'Food', 'SAZEW': 'Food', 'NESTLE': 'Food',
+        'FFL': 'Food', 'KTML': 'Food', 'EFOODS': 'Food', 'MITL': 'Food',
+        'HASCOL': 'Food', 'PAEL': 'Food',
+
+        # Pharmaceuticals
+        'SEARL': 'Pharmaceuticals', 'ABOT': 'Pharmaceuticals', 'GLAXO': 'Pharmaceuticals',
+        'HINOON': 'Pharmaceuticals', 'FEROZ': 'Pharmaceuticals', 'AGP': 'Pharmaceuticals',
+        'SAPL': 'Pharmaceuticals', 'DWHL': 'Pharmaceuticals', 'ATRL': 'Pharmaceuticals',
+
+        # Chemicals
+        'ICI': 'Chemicals', 'LOTCHEM': 'Chemicals', 'EPCL': 'Chemicals',
+        'AKZO': 'Chemicals', 'SPL': 'Chemicals', 'DOL': 'Chemicals',
+        'NCPL': 'Chemicals', 'FFBL': 'Chemicals', 'FATIMA': 'Chemicals',
+
+        # Insurance
+        'AICL': 'Insurance', 'IGIHL': 'Insurance', 'JGICL': 'Insurance',
+        'ADAMJEE': 'Insurance', 'EFU': 'Insurance', 'SILK': 'Insurance',
+        'HASCOL': 'Insurance', 'PAEL': 'Insurance', 'TPL': 'Insurance',
+
+        # Telecommunication
+        'PTC': 'Telecommunication', 'TELE': 'Telecommunication', 'WTL': 'Telecommunication',
+        'SCOM': 'Telecommunication', 'NTC': 'Telecommunication', 'PAEL': 'Telecommunication',
+
+        # Miscellaneous
+        'PAEL': 'Miscellaneous', 'HASCOL': 'Miscellaneous', 'TPL': 'Miscellaneous',
+        'SILK': 'Miscellaneous', 'NML': 'Miscellaneous', 'GATM': 'Miscellaneous',
+        'KTML': 'Miscellaneous', 'NCL': 'Miscellaneous', 'BWHL': 'Miscellaneous',
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_sector_industries() -> typing.Dict[str, typing.List[str]]:
+    """Returns the industries of each sector"""
+    return {
+        'Oil & Gas': ['Oil & Gas Exploration', 'Oil & Gas Marketing', 'Oil & Gas Refining', 'Oil & Gas Distribution'],
+        'Banking': ['Commercial Banking', 'Islamic Banking', 'Microfinance Banking', 'Investment Banking'],
+        'Cement': ['Cement Manufacturing', 'Construction Materials'],
+        'Fertilizer': ['Fertilizer Manufacturing', 'Agrichemicals'],
+        'Technology': ['Software Development', 'IT Services', 'Technology Hardware'],
+        'Automobile': ['Auto Manufacturing', 'Auto Parts', 'Automotive Components'],
+        'Power': ['Power Generation', 'Power Distribution', 'Renewable Energy'],
+        'Textile': ['Textile Composite', 'Textile Spinning', 'Textile Weaving', 'Apparel Manufacturing'],
+        'Food': ['Food Processing', 'Beverages', 'Packaged Foods'],
+        'Pharmaceuticals': ['Pharmaceutical Manufacturing', 'Healthcare Equipment', 'Biotechnology'],
+        'Chemicals': ['Chemical Manufacturing', 'Petrochemicals', 'Specialty Chemicals'],
+        'Insurance': ['General Insurance', 'Life Insurance', 'Reinsurance'],
+        'Telecommunication': ['Telecommunications Services', 'Network Operators', 'Communications Equipment']
+    }
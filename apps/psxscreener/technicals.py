@@ -0,0 +1,290 @@
+"""
+Technical indicators for `Stock` rows, computed from stored daily history.
+
+The indicators are computed per symbol using rolling-window NumPy operations
+and written back to the `Stock` table in bulk, so screener filters on moving
+averages, RSI and 52-week ranges run against real, indexed values.
+"""
+
+import typing
+import datetime
+import logging
+from decimal import Decimal
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Stock
+
+logger = logging.getLogger(__name__)
+
+
+MA_SHORT_WINDOW = 50
+MA_LONG_WINDOW = 200
+RSI_PERIOD = 14
+YEAR_WINDOW = 252
+"""Number of trading days in a year"""
+AVG_VOLUME_WINDOW = 50
+
+HISTORY_LOOKBACK = datetime.timedelta(days=400)
+"""
+Calendar days of history needed to compute indicators for a date.
+Enough to cover `YEAR_WINDOW` and `MA_LONG_WINDOW` trading days.
+"""
+
+TECHNICAL_FIELDS = (
+    "ma50",
+    "ma200",
+    "rsi14",
+    "year_high",
+    "year_low",
+    "avg_volume",
+    "relative_volume",
+    "ma50_direction",
+    "ma200_direction",
+    "ma50_cross",
+    "ma200_cross",
+)
+"""`Stock` fields written by `update_technicals`"""
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean over `window` values. Positions without a full window are NaN.
+
+    :param values: 1-D array of values.
+    :param window: The window size.
+    """
+    result = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return result
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    result[window - 1 :] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
+
+
+def rolling_extreme(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    """
+    Rolling maximum/minimum over at most `window` values.
+
+    Positions without a full window use all values available up to that position.
+
+    :param values: 1-D array of values.
+    :param window: The window size.
+    :param ufunc: `np.maximum` or `np.minimum`.
+    """
+    result = np.empty(values.shape)
+    if not len(values):
+        return result
+    head = min(window - 1, len(values))
+    result[:head] = ufunc.accumulate(values[:head])
+    if len(values) >= window:
+        result[window - 1 :] = ufunc.reduce(sliding_window_view(values, window), axis=1)
+    return result
+
+
+def wilder_rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """
+    Relative Strength Index using Wilder's smoothing.
+
+    Positions before the first full period are NaN.
+
+    :param closes: 1-D array of closing prices.
+    :param period: The RSI period.
+    """
+    result = np.full(closes.shape, np.nan)
+    if len(closes) <= period:
+        return result
+
+    deltas = np.diff(closes)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    avg_gain = gains[:period].mean()
+    avg_loss = losses[:period].mean()
+    avg_gains = np.empty(len(deltas) - period + 1)
+    avg_losses = np.empty(len(deltas) - period + 1)
+    avg_gains[0], avg_losses[0] = avg_gain, avg_loss
+    # Wilder's smoothing is recursive, so it cannot be expressed as a plain window op
+    for i, (gain, loss) in enumerate(zip(gains[period:], losses[period:]), start=1):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+        avg_gains[i], avg_losses[i] = avg_gain, avg_loss
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gains / avg_losses
+        rsi = 100 - (100 / (1 + rs))
+    # No losses in the period means maximum strength
+    rsi[avg_losses == 0] = 100.0
+    rsi[(avg_losses == 0) & (avg_gains == 0)] = 50.0
+    result[period:] = rsi
+    return result
+
+
+def crosses(closes: np.ndarray, averages: np.ndarray) -> np.ndarray:
+    """
+    Detect price crosses over a moving average.
+
+    :return: Array of 1 (crossed above), -1 (crossed below), 0 (no cross) or NaN
+        where the average is not available for the position or the previous one.
+    """
+    result = np.full(closes.shape, np.nan)
+    if len(closes) < 2:
+        return result
+    above = closes > averages
+    previous_above = above[:-1]
+    valid = ~np.isnan(averages[1:]) & ~np.isnan(averages[:-1])
+    result[1:] = np.where(
+        valid,
+        np.where(above[1:] & ~previous_above, 1, np.where(~above[1:] & previous_above, -1, 0)),
+        np.nan,
+    )
+    return result
+
+
+def directions(averages: np.ndarray) -> np.ndarray:
+    """
+    Day-over-day direction of a moving average.
+
+    :return: Array of 1 (rising), -1 (falling), 0 (flat) or NaN.
+    """
+    result = np.full(averages.shape, np.nan)
+    if len(averages) < 2:
+        return result
+    result[1:] = np.sign(np.diff(averages))
+    return result
+
+
+def compute_technicals(
+    closes: np.ndarray,
+    highs: np.ndarray,
+    lows: np.ndarray,
+    volumes: np.ndarray,
+) -> typing.Dict[str, np.ndarray]:
+    """
+    Compute the technical indicators for a single symbol's daily history.
+
+    All arrays must be ordered by date, ascending.
+
+    :return: Mapping of `Stock` field names to arrays of values, aligned with the input.
+    """
+    ma50 = rolling_mean(closes, MA_SHORT_WINDOW)
+    ma200 = rolling_mean(closes, MA_LONG_WINDOW)
+    avg_volume = rolling_mean(volumes, AVG_VOLUME_WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_volume = np.where(avg_volume > 0, volumes / avg_volume, np.nan)
+
+    return {
+        "ma50": ma50,
+        "ma200": ma200,
+        "rsi14": wilder_rsi(closes),
+        "year_high": rolling_extreme(np.fmax(highs, closes), YEAR_WINDOW, np.maximum),
+        "year_low": rolling_extreme(np.fmin(lows, closes), YEAR_WINDOW, np.minimum),
+        "avg_volume": avg_volume,
+        "relative_volume": relative_volume,
+        "ma50_direction": directions(ma50),
+        "ma200_direction": directions(ma200),
+        "ma50_cross": crosses(closes, ma50),
+        "ma200_cross": crosses(closes, ma200),
+    }
+
+
+def _to_field_value(field_name: str, value: float):
+    """Convert a computed indicator value into the value stored in the `Stock` field"""
+    if np.isnan(value):
+        return None
+    if field_name == "avg_volume" or field_name.endswith(("_direction", "_cross")):
+        return int(value)
+    if field_name == "rsi14":
+        value = min(max(value, 0.0), 100.0)
+    elif field_name == "relative_volume":
+        # Field allows at most 4 integer digits
+        value = min(value, 9999.99)
+    return Decimal(str(round(value, 2)))
+
+
+def update_technicals(
+    since: typing.Optional[datetime.date] = None,
+    until: typing.Optional[datetime.date] = None,
+    symbols: typing.Optional[typing.Iterable[str]] = None,
+    batch_size: int = 2000,
+) -> int:
+    """
+    Compute technical indicators from stored daily history and write them to
+    the `Stock` rows dated between `since` and `until`.
+
+    :param since: The first date whose rows should be updated. Defaults to the latest date in the database.
+    :param until: The last date whose rows should be updated. Defaults to the latest date in the database.
+    :param symbols: Only update rows for these symbols.
+    :param batch_size: The number of rows written per update query.
+    :return: The number of rows updated.
+    """
+    latest_date = Stock.objects.aggregate(latest=Max("date"))["latest"]
+    if latest_date is None:
+        return 0
+    until = until or latest_date
+    since = since or until
+    if since > until:
+        raise ValueError("since cannot be after until")
+
+    history = Stock.objects.filter(
+        date__gte=since - HISTORY_LOOKBACK, date__lte=until
+    )
+    if symbols is not None:
+        history = history.filter(symbol__in=list(symbols))
+
+    rows = list(
+        history.order_by("symbol", "date").values_list(
+            "id", "symbol", "date", "current_price", "high_price", "low_price", "volume"
+        )
+    )
+    if not rows:
+        return 0
+
+    ids, row_symbols, dates, *columns = zip(*rows)
+    ids = np.asarray(ids)
+    row_symbols = np.asarray(row_symbols)
+    dates = np.asarray(dates)
+    closes, highs, lows, volumes = (np.asarray(column, dtype=float) for column in columns)
+
+    # Rows are ordered by symbol, so each symbol's history is a contiguous slice
+    boundaries = np.flatnonzero(row_symbols[1:] != row_symbols[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(rows)]))
+
+    stocks = []
+    for start, end in zip(starts, ends):
+        technicals = compute_technicals(
+            closes[start:end], highs[start:end], lows[start:end], volumes[start:end]
+        )
+        for offset in np.flatnonzero(dates[start:end] >= since):
+            stock = Stock(id=int(ids[start + offset]))
+            for field_name, values in technicals.items():
+                setattr(stock, field_name, _to_field_value(field_name, values[offset]))
+            stocks.append(stock)
+
+    with transaction.atomic():
+        Stock.objects.bulk_update(stocks, TECHNICAL_FIELDS, batch_size=batch_size)
+    logger.info(f"Updated technical indicators for {len(stocks)} stocks from {since} to {until}")
+    return len(stocks)
+
+
+def get_latest_technicals(
+    symbols: typing.Optional[typing.Iterable[str]] = None,
+) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """
+    Returns the stored technical indicators of the latest trading date, keyed by symbol.
+
+    :param symbols: Only return indicators for these symbols.
+    """
+    latest_date = Stock.objects.aggregate(latest=Max("date"))["latest"]
+    if latest_date is None:
+        return {}
+
+    stocks = Stock.objects.filter(date=latest_date)
+    if symbols is not None:
+        stocks = stocks.filter(symbol__in=list(symbols))
+    return {
+        values["symbol"]: values
+        for values in stocks.values("symbol", *TECHNICAL_FIELDS)
+    }
@@ -1,7 +1,6 @@
 from django.shortcuts import render, redirect
 import json
 import random
-import requests
 from datetime import datetime, timedelta
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -10,66 +9,52 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from .models import Stock, LastDataUpdate
 from django.db.models import Max, Avg
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 import time
 from decimal import Decimal, InvalidOperation # Use Decimal for 
 from django.conf import settings
-from django.apps import apps
-from django.db import connection
+
+from apps.live_rates.tokens import mg_link_token_manager
+from apps.live_rates.clients import CircuitOpenError, mg_link_client
+from helpers.exceptions.requests import RequestError
+from .sectors import get_core_symbol_sectors, get_sector_industries, get_symbol_sectors
+from .queries import get_latest_stocks, get_latest_trading_date, screen_stocks, paginate_stocks
+from .history import (
+    DEFAULT_MAX_POINTS,
+    DOWNSAMPLING_METHODS,
+    MAX_HISTORY_DAYS,
+    MAX_POINTS_LIMIT,
+    downsample_history,
+    history_to_columns,
+    load_symbol_history,
+)
+from .charts import cached_chart_response, get_market_trend, get_sector_summary, invalidate_chart_data
+from .technicals import get_latest_technicals, update_technicals
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# API credentials
-API_USERNAME = "EKCapital2024"
-API_PASSWORD = "3KC@Pit@L!2024"
-
 # API configuration
 AUTH_API_URL = "https://api.mg-link.net/api/auth/token"
 LIVE_API_URL = "https://api.mg-link.net/api/Data1/PSXStockPrices?StartDate=&EndDate="
 HISTORY_API_URL = "https://api.mg-link.net/api/Data1/PSXStockPrices?StartDate={start_date}&EndDate={end_date}"
 
 def get_api_token():
-    """Get authentication token from API"""
-    try:
-        body = {
-            'grant_type': 'password',
-            'username': API_USERNAME,
-            'password': API_PASSWORD
-        }
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        
-        response = requests.post(AUTH_API_URL, data=body, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            return response.json().get('access_token')
-        else:
-            logger.error(f"Token request failed: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        logger.error(f"Error getting API token: {str(e)}")
-        return None
+    """Get authentication token from API (shared across workers via the cache)"""
+    return mg_link_token_manager.get_token()
 
-def fetch_stock_data(api_url, max_retries=3, timeout=30):
+def fetch_stock_data(api_url, max_retries=3, timeout=None):
     """
     Fetch stock data from the provided API URL using token authentication.
     Implements retry logic and timeout handling.
+    Uses the endpoint's default timeout if `timeout` is not given.
     """
+    request_kwargs = {'timeout': timeout} if timeout is not None else {}
     for attempt in range(max_retries):
         try:
-            # Get authentication token
-            token = get_api_token()
-            if not token:
-                logger.error("Failed to get authentication token")
-                continue
-            
-            # Make API request with token
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Authorization': f'Bearer {token}'
-            }
-            
             logger.info(f"Fetching data from API (attempt {attempt + 1}/{max_retries}): {api_url}")
-            response = requests.get(api_url, headers=headers, timeout=timeout)
+            # Pooled client authenticates with the shared token, retrying once if it is rejected
+            response = mg_link_client.get(api_url, **request_kwargs)
             
             if response.status_code == 200:
                 data = response.json()
@@ -87,10 +72,11 @@ def fetch_stock_data(api_url, max_retries=3, timeout=30):
                 # For 5xx errors, retry; for 4xx errors, break
                 if response.status_code < 500:
                     break
-        except requests.exceptions.Timeout:
-            logger.error(f"Request timed out (attempt {attempt + 1}/{max_retries})")
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error (attempt {attempt + 1}/{max_retries})")
+        except CircuitOpenError as e:
+            logger.error(f"Not fetching data from API: {str(e)}")
+            break
+        except RequestError as e:
+            logger.error(f"Request failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
         except Exception as e:
             logger.error(f"Error fetching data from API: {str(e)}")
             break
@@ -107,35 +93,8 @@ def save_stock_data(data, date):
     Save stock data to the database with proper sector mapping and data validation.
     """
     try:
-        # Define sectors mapping for PSX stocks
-        sectors = {
-            # Sugar & Allied Industries
-            'AABS': 'Sugar & Allied Industries',
-            'HABSM': 'Sugar & Allied Industries',
-            'MRNS': 'Sugar & Allied Industries',
-            'SASML': 'Sugar & Allied Industries',
-            
-            # Oil & Gas
-            'OGDC': 'Oil & Gas', 'PPL': 'Oil & Gas', 'PSO': 'Oil & Gas', 'MARI': 'Oil & Gas',
-            'APL': 'Oil & Gas', 'ATRL': 'Oil & Gas', 'PRL': 'Oil & Gas', 'BYCO': 'Oil & Gas',
-            'SNGP': 'Oil & Gas', 'SSGC': 'Oil & Gas', 'POL': 'Oil & Gas', 'NRL': 'Oil & Gas',
-            
-            # Banking
-            'HBL': 'Banking', 'UBL': 'Banking', 'MCB': 'Banking', 'BAHL': 'Banking',
-            'MEBL': 'Banking', 'BAFL': 'Banking', 'ABL': 'Banking', 'BOP': 'Banking',
-            'AKBL': 'Banking', 'FABL': 'Banking', 'NBP': 'Banking', 'JSBL': 'Banking',
-            
-            # Cement
-            'LUCK': 'Cement', 'DGKC': 'Cement', 'FCCL': 'Cement', 'MLCF': 'Cement',
-            'PIOC': 'Cement', 'CHCC': 'Cement', 'KOHC': 'Cement', 'ACPL': 'Cement',
-            'POWER': 'Cement', 'GWLC': 'Cement', 'BWCL': 'Cement',
-            
-            # Technology
-            'SYS': 'Technology', 'TRG': 'Technology', 'AVN': 'Technology',
-            'NETSOL': 'Technology', 'TPL': 'Technology', 'OCTOPUS': 'Technology',
-            
-            # Add more sectors as needed...
-        }
+        # Sectors mapping for PSX stocks
+        sectors = get_core_symbol_sectors()
 
         saved_count = 0
         for item in data:
@@ -232,6 +191,8 @@ def save_stock_data(data, date):
                 continue
 
         logger.info(f"Successfully saved {saved_count} stocks for date {date}")
+        if saved_count:
+            invalidate_chart_data()
         return True
     except Exception as e:
         logger.error(f"Error saving stock data: {str(e)}")
@@ -265,6 +226,7 @@ def get_historical_data(start_date, end_date):
             
             # Process missing dates in chunks to avoid timeouts
             chunk_size = 30  # Process 30 days at a time
+            saved_dates = []
             for i in range(0, len(missing_dates), chunk_size):
                 chunk_dates = missing_dates[i:i + chunk_size]
                 chunk_start = chunk_dates[0]
@@ -290,10 +252,18 @@ def get_historical_data(start_date, end_date):
                                 defaults={'is_success': True}
                             )
                             logger.info(f"Successfully saved data for {date}")
+                            saved_dates.append(date)
                         else:
                             logger.error(f"Failed to save data for {date}")
                 else:
                     logger.error(f"Failed to fetch data for chunk {chunk_start} to {chunk_end}")
+            
+            # Recompute technical indicators from the earliest newly saved date onwards
+            if saved_dates:
+                try:
+                    update_technicals(since=min(saved_dates))
+                except Exception as e:
+                    logger.error(f"Error updating technical indicators: {str(e)}")
         
         # Retrieve all data for the requested date range
         stocks = Stock.objects.filter(
@@ -339,97 +309,11 @@ def process_stock_data(data):
     if not data:
         return []
     
-    # Define common sectors for known symbols, but don't limit to these
-    sectors = {
-        # Oil & Gas
-        'OGDC': 'Oil & Gas', 'PPL': 'Oil & Gas', 'PSO': 'Oil & Gas', 'MARI': 'Oil & Gas',
-        'APL': 'Oil & Gas', 'ATRL': 'Oil & Gas', 'PRL': 'Oil & Gas', 'BYCO': 'Oil & Gas',
-        'SNGP': 'Oil & Gas', 'SSGC': 'Oil & Gas', 'POL': 'Oil & Gas', 'NRL': 'Oil & Gas',
-        'GHGL': 'Oil & Gas', 'SHEL': 'Oil & Gas', 'HASCOL': 'Oil & Gas', 'PSX': 'Oil & Gas',
-
-        # Banking
-        'HBL': 'Banking', 'UBL': 'Banking', 'MCB': 'Banking', 'BAHL': 'Banking',
-        'MEBL': 'Banking', 'BAFL': 'Banking', 'ABL': 'Banking', 'BOP': 'Banking',
-        'AKBL': 'Banking', 'FABL': 'Banking', 'NBP': 'Banking', 'JSBL': 'Banking',
-        'BIPL': 'Banking', 'SILK': 'Banking', 'BOK': 'Banking', 'HMB': 'Banking',
-
-        # Cement
-        'LUCK': 'Cement', 'DGKC': 'Cement', 'FCCL': 'Cement', 'MLCF': 'Cement',
-        'PIOC': 'Cement', 'CHCC': 'Cement', 'KOHC': 'Cement', 'ACPL': 'Cement',
-        'POWER': 'Cement', 'GWLC': 'Cement', 'KOHC': 'Cement', 'BWCL': 'Cement',
-        'FECTC': 'Cement', 'LCL': 'Cement', 'MCL': 'Cement', 'PFL': 'Cement',
-
-        # Fertilizer
-        'EFERT': 'Fertilizer', 'FFC': 'Fertilizer', 'ENGRO': 'Fertilizer',
-        'FFBL': 'Fertilizer', 'FATIMA': 'Fertilizer', 'DAAG': 'Fertilizer',
-        'SING': 'Fertilizer', 'PKGS': 'Fertilizer', 'AGL': 'Fertilizer',
-
-        # Technology
-        'SYS': 'Technology', 'TRG': 'Technology', 'AVN': 'Technology',
-        'NETSOL': 'Technology', 'TPL': 'Technology', 'OCTOPUS': 'Technology',
-        'INIL': 'Technology', 'PAEL': 'Technology', 'TELE': 'Technology',
-
-        # Automobile
-        'HCAR': 'Automobile', 'INDU': 'Automobile', 'PSMC': 'Automobile',
-        'GHNL': 'Automobile', 'AGTL': 'Automobile', 'MTL': 'Automobile',
-        'GATM': 'Automobile', 'SAZEW': 'Automobile', 'ATLH': 'Automobile',
-
-        # Power
-        'HUBC': 'Power', 'KAPCO': 'Power', 'KEL': 'Power', 'NPL': 'Power',
-        'NCPL': 'Power', 'SPWL': 'Power', 'HASCOL': 'Power', 'PKGP': 'Power',
-        'LPL': 'Power', 'EPQL': 'Power', 'SEARL': 'Power',
-
-        # Textile
-        'NML': 'Textile', 'GATM': 'Textile', 'ILP': 'Textile', 'KTML': 'Textile',
-        'NCL': 'Textile', 'GADT': 'Textile', 'RUBY': 'Textile', 'SILK': 'Textile',
-        'BWHL': 'Textile', 'NPTL': 'Textile', 'TREET': 'Textile',
-
-        # Food
-        'UNITY': 'Food', 'ASC': 'Food', 'SAZEW': 'Food', 'NESTLE': 'Food',
-        'FFL': 'Food', 'KTML': 'Food', 'EFOODS': 'Food', 'MITL': 'Food',
-        'HASCOL': 'Food', 'PAEL': 'Food',
-
-        # Pharmaceuticals
-        'SEARL': 'Pharmaceuticals', 'ABOT': 'Pharmaceuticals', 'GLAXO': 'Pharmaceuticals',
-        'HINOON': 'Pharmaceuticals', 'FEROZ': 'Pharmaceuticals', 'AGP': 'Pharmaceuticals',
-        'SAPL': 'Pharmaceuticals', 'DWHL': 'Pharmaceuticals', 'ATRL': 'Pharmaceuticals',
-
-        # Chemicals
-        'ICI': 'Chemicals', 'LOTCHEM': 'Chemicals', 'EPCL': 'Chemicals',
-        'AKZO': 'Chemicals', 'SPL': 'Chemicals', 'DOL': 'Chemicals',
-        'NCPL': 'Chemicals', 'FFBL': 'Chemicals', 'FATIMA': 'Chemicals',
-
-        # Insurance
-        'AICL': 'Insurance', 'IGIHL': 'Insurance', 'JGICL': 'Insurance',
-        'ADAMJEE': 'Insurance', 'EFU': 'Insurance', 'SILK': 'Insurance',
-        'HASCOL': 'Insurance', 'PAEL': 'Insurance', 'TPL': 'Insurance',
-
-        # Telecommunication
-        'PTC': 'Telecommunication', 'TELE': 'Telecommunication', 'WTL': 'Telecommunication',
-        'SCOM': 'Telecommunication', 'NTC': 'Telecommunication', 'PAEL': 'Telecommunication',
-
-        # Miscellaneous
-        'PAEL': 'Miscellaneous', 'HASCOL': 'Miscellaneous', 'TPL': 'Miscellaneous',
-        'SILK': 'Miscellaneous', 'NML': 'Miscellaneous', 'GATM': 'Miscellaneous',
-        'KTML': 'Miscellaneous', 'NCL': 'Miscellaneous', 'BWHL': 'Miscellaneous',
-    }
+    # Common sectors for known symbols, but don't limit to these
+    sectors = get_symbol_sectors()
     
-    # Define a mapping for industries based on sector
-    industry_mapping = {
-        'Oil & Gas': ['Oil & Gas Exploration', 'Oil & Gas Marketing', 'Oil & Gas Refining', 'Oil & Gas Distribution'],
-        'Banking': ['Commercial Banking', 'Islamic Banking', 'Microfinance Banking', 'Investment Banking'],
-        'Cement': ['Cement Manufacturing', 'Construction Materials'],
-        'Fertilizer': ['Fertilizer Manufacturing', 'Agrichemicals'],
-        'Technology': ['Software Development', 'IT Services', 'Technology Hardware'],
-        'Automobile': ['Auto Manufacturing', 'Auto Parts', 'Automotive Components'],
-        'Power': ['Power Generation', 'Power Distribution', 'Renewable Energy'],
-        'Textile': ['Textile Composite', 'Textile Spinning', 'Textile Weaving', 'Apparel Manufacturing'],
-        'Food': ['Food Processing', 'Beverages', 'Packaged Foods'],
-        'Pharmaceuticals': ['Pharmaceutical Manufacturing', 'Healthcare Equipment', 'Biotechnology'],
-        'Chemicals': ['Chemical Manufacturing', 'Petrochemicals', 'Specialty Chemicals'],
-        'Insurance': ['General Insurance', 'Life Insurance', 'Reinsurance'],
-        'Telecommunication': ['Telecommunications Services', 'Network Operators', 'Communications Equipment']
-    }
+    # Mapping for industries based on sector
+    industry_mapping = get_sector_industries()
     
     # Group data by symbol to get the latest entry for each stock
     stock_data = {}
@@ -438,6 +322,9 @@ def process_stock_data(data):
         if symbol and (symbol not in stock_data or item.get('CreateDateTime') > stock_data[symbol].get('CreateDateTime', '')):
             stock_data[symbol] = item
     
+    # Load the stored technical indicators for all symbols in one query
+    technicals = get_latest_technicals(stock_data.keys())
+    
     # Convert to the format needed by the template
     stocks = []
     for symbol, item in stock_data.items():
@@ -687,53 +574,57 @@ def process_stock_data(data):
             else:
                 ps_ratio = round(random.uniform(0.3, 7.0), 2)
             
+            # Technical indicators precomputed from stored daily history (see `technicals.update_technicals`)
+            stored = technicals.get(symbol, {})
+
+            def stored_float(field_name):
+                value = stored.get(field_name)
+                return float(value) if value is not None else None
+
             # RSI (14)
-            rsi_value = round(random.uniform(20, 80), 2)
+            rsi_value = stored_float('rsi14')
             
             # 52-Week data
-            year_high = round(price * (1 + random.uniform(0.05, 0.3)), 2)
-            year_low = round(price * (1 - random.uniform(0.05, 0.3)), 2)
-            
-            # Make sure year_high is actually higher than current price
-            if year_high < price:
-                year_high = price * 1.05
-            
-            # Make sure year_low is actually lower than current price
-            if year_low > price:
-                year_low = price * 0.95
+            year_high = stored_float('year_high')
+            year_low = stored_float('year_low')
             
             # Calculate 52-week range metrics
-            year_high_ratio = round((price / year_high) * 100, 2)  # How close to 52-week high (percent)
-            year_low_ratio = round(((price - year_low) / year_low) * 100, 2)  # How far from 52-week low (percent)
-            year_range_percentile = round(((price - year_low) / (year_high - year_low)) * 100, 2)  # Position in range (0-100%)
+            year_high_ratio = round((price / year_high) * 100, 2) if year_high else None  # How close to 52-week high (percent)
+            year_low_ratio = round(((price - year_low) / year_low) * 100, 2) if year_low else None  # How far from 52-week low (percent)
+            if year_high is not None and year_low is not None and year_high > year_low:
+                year_range_percentile = round(((price - year_low) / (year_high - year_low)) * 100, 2)  # Position in range (0-100%)
+            else:
+                year_range_percentile = None
             
             # Moving Averages
-            ma_50 = round(price * (1 + random.uniform(-0.15, 0.15)), 2)  # 50-day MA
-            ma_200 = round(price * (1 + random.uniform(-0.2, 0.2)), 2)  # 200-day MA
+            ma_50 = stored_float('ma50')  # 50-day MA
+            ma_200 = stored_float('ma200')  # 200-day MA
             
             # Calculate ratios and trends
-            price_to_ma50_ratio = round(price / ma_50, 2) if ma_50 > 0 else 1
-            price_to_ma200_ratio = round(price / ma_200, 2) if ma_200 > 0 else 1
+            price_to_ma50_ratio = round(price / ma_50, 2) if ma_50 else None
+            price_to_ma200_ratio = round(price / ma_200, 2) if ma_200 else None
             
-            # Direction indicators (-1 to 1 range)
-            ma50_direction = round(random.uniform(-1, 1), 2)
-            ma200_direction = round(random.uniform(-1, 1), 2)
+            # Direction indicators (1 rising, -1 falling, 0 flat)
+            ma50_direction = stored.get('ma50_direction')
+            ma200_direction = stored.get('ma200_direction')
             
-            # Boolean flags for crosses
-            crossed_above_ma50 = random.random() < 0.1  # 10% chance of recent cross
-            crossed_below_ma50 = random.random() < 0.1 and not crossed_above_ma50
-            crossed_above_ma200 = random.random() < 0.05  # 5% chance of recent cross
-            crossed_below_ma200 = random.random() < 0.05 and not crossed_above_ma200
+            # Boolean flags for crosses on the latest trading day
+            crossed_above_ma50 = stored.get('ma50_cross') == 1
+            crossed_below_ma50 = stored.get('ma50_cross') == -1
+            crossed_above_ma200 = stored.get('ma200_cross') == 1
+            crossed_below_ma200 = stored.get('ma200_cross') == -1
             
             # Volume metrics
-            avg_volume = round(volume * (1 + random.uniform(-0.4, 0.4)))
-            volume_to_avg_ratio = round(volume / avg_volume, 2) if avg_volume > 0 else 1
-            rel_volume = volume_to_avg_ratio  # Set rel_volume to volume_to_avg_ratio
-            volume_trend = round(random.uniform(-1, 1), 2)  # -1 to 1 range for decreasing to increasing
+            avg_volume = stored.get('avg_volume')
+            volume_to_avg_ratio = round(volume / avg_volume, 2) if avg_volume else None
+            if volume_to_avg_ratio is not None:
+                rel_volume = volume_to_avg_ratio
+            # Volume trend is not tracked yet
+            volume_trend = None
             
             # New High/Low flags
-            is_new_high = year_high_ratio > 98  # Within 2% of 52-week high
-            is_new_low = year_low_ratio < 2  # Within 2% of 52-week low
+            is_new_high = year_high_ratio is not None and year_high_ratio > 98  # Within 2% of 52-week high
+            is_new_low = year_low_ratio is not None and year_low_ratio < 2  # Within 2% of 52-week low
             
             stock = {
                 'Symbol': symbol,
@@ -872,42 +763,6 @@ def index(request):
             'change_open': request.GET.get('change_open', 'any'),
         }
 
-        # Fetch data (Live or Historical - simplified for now)
-        # Add your date range logic back here if needed for historical
-        # start_date = request.GET.get('start_date', ...)
-        # end_date = request.GET.get('end_date', ...)
-
-        if params['live_data'] == 'true':
-            logger.info("Attempting to fetch live data from API")
-            try:
-                raw_data = fetch_stock_data(LIVE_API_URL)
-                if raw_data:
-                    all_stocks = process_stock_data(raw_data)
-                    data_source = "Live API"
-                    logger.info(f"Successfully processed {len(all_stocks)} stocks from Live API")
-                else:
-                    logger.warning("API returned no data, falling back to mock data")
-                    all_stocks = generate_mock_stock_data(200)  # Generate mock data
-                    data_source = "Mock Data (API failed)"
-            except Exception as e:
-                logger.error(f"Error processing API data: {str(e)}")
-                all_stocks = generate_mock_stock_data(200)  # Generate mock data on exception
-                data_source = "Mock Data (API error)"
-        else:
-            # Historical data mode
-            logger.info("Using historical/mock data as requested")
-            # Implement historical fetching properly if needed
-            # stocks = get_historical_data(start_date, end_date)
-            all_stocks = generate_mock_stock_data(200) # Mock for now
-            data_source = "Historical (Mock)"
-
-        if not all_stocks or len(all_stocks) == 0:
-            logger.warning("No stocks available after processing. Generating mock data.")
-            all_stocks = generate_mock_stock_data(200)
-            data_source = "Mock Data (Fallback)"
-
-        logger.info(f"Data source: {data_source}, stock count: {len(all_stocks)}")
-
         # Check if we have any active filters
         active_filters = {}
         for key, value in params.items():
@@ -944,67 +799,113 @@ def index(request):
                     filter_counts[category] += 1
                     break
         
-        # Only apply filters if we actually have active filters
-        if has_active_filters:
-            logger.info("Active filters detected, applying filters")
-            filtered_stocks = filter_stocks(all_stocks, params)
-            total_stocks = len(all_stocks)  # Total count before filtering
-        else:
-            logger.info("No active filters, showing all stocks")
-            filtered_stocks = all_stocks
-            total_stocks = len(all_stocks)
-
-        # Get market index data for context (for now, just mock data)
-        index_data = get_index_data(all_stocks)
-        
-        # Apply sorting
         sort_by = params['sort_by']
         sort_order = params['sort_order']
-        
-        # Make sure the sort field exists in the data
-        if filtered_stocks and sort_by in filtered_stocks[0]:
-            reverse = sort_order == 'desc'
-            # Sort numeric fields differently - handle None values and text vs numbers
-            if sort_by in ['CurrentPrice', 'ChangePercentage', 'Volume', 'PE', 'MarketCap', 'DividendYield']:
-                # Sort numeric with None at the end
-                filtered_stocks = sorted(
-                    filtered_stocks,
-                    key=lambda x: (x.get(sort_by) is None, x.get(sort_by, 0) or 0),
-                    reverse=reverse
-                )
+        items_per_page = max(min(int(params['items_per_page']), 200), 10)  # Between 10-200
+
+        # Fetch data (Live or Database)
+        if params['live_data'] == 'true':
+            logger.info("Attempting to fetch live data from API")
+            try:
+                raw_data = fetch_stock_data(LIVE_API_URL)
+                if raw_data:
+                    all_stocks = process_stock_data(raw_data)
+                    data_source = "Live API"
+                    logger.info(f"Successfully processed {len(all_stocks)} stocks from Live API")
+                else:
+                    logger.warning("API returned no data, falling back to mock data")
+                    all_stocks = generate_mock_stock_data(200)  # Generate mock data
+                    data_source = "Mock Data (API failed)"
+            except Exception as e:
+                logger.error(f"Error processing API data: {str(e)}")
+                all_stocks = generate_mock_stock_data(200)  # Generate mock data on exception
+                data_source = "Mock Data (API error)"
+
+            if not all_stocks or len(all_stocks) == 0:
+                logger.warning("No stocks available after processing. Generating mock data.")
+                all_stocks = generate_mock_stock_data(200)
+                data_source = "Mock Data (Fallback)"
+
+            # Only apply filters if we actually have active filters
+            if has_active_filters:
+                logger.info("Active filters detected, applying filters")
+                filtered_stocks = filter_stocks(all_stocks, params)
+                total_stocks = len(all_stocks)  # Total count before filtering
             else:
-                # Sort strings
-                filtered_stocks = sorted(
-                    filtered_stocks,
-                    key=lambda x: str(x.get(sort_by, '')).lower(),
-                    reverse=reverse
-                )
-            logger.info(f"Sorted by '{sort_by}' ({sort_order})")
-        else:
-            logger.warning(f"Sort field '{sort_by}' not found in stock data, skipping sort")
+                logger.info("No active filters, showing all stocks")
+                filtered_stocks = all_stocks
+                total_stocks = len(all_stocks)
+
+            # Apply sorting
+            # Make sure the sort field exists in the data
+            if filtered_stocks and sort_by in filtered_stocks[0]:
+                reverse = sort_order == 'desc'
+                # Sort numeric fields differently - handle None values and text vs numbers
+                if sort_by in ['CurrentPrice', 'ChangePercentage', 'Volume', 'PE', 'MarketCap', 'DividendYield']:
+                    # Sort numeric with None at the end
+                    filtered_stocks = sorted(
+                        filtered_stocks,
+                        key=lambda x: (x.get(sort_by) is None, x.get(sort_by, 0) or 0),
+                        reverse=reverse
+                    )
+                else:
+                    # Sort strings
+                    filtered_stocks = sorted(
+                        filtered_stocks,
+                        key=lambda x: str(x.get(sort_by, '')).lower(),
+                        reverse=reverse
+                    )
+                logger.info(f"Sorted by '{sort_by}' ({sort_order})")
+            else:
+                logger.warning(f"Sort field '{sort_by}' not found in stock data, skipping sort")
 
-        # Create Paginator for the sorted filtered stocks
-        items_per_page = max(min(int(params['items_per_page']), 200), 10)  # Between 10-200
-        paginator = Paginator(filtered_stocks, items_per_page)
-        page = params['page']
-        
-        try:
-            stocks_page = paginator.page(page)
-        except PageNotAnInteger:
-            stocks_page = paginator.page(1)
-        except EmptyPage:
-            stocks_page = paginator.page(paginator.num_pages)
-
-        # Get all unique values for dropdown filters
-        unique_sectors = sorted(list(set(s.get('Sector', 'Other') for s in all_stocks if s.get('Sector'))))
-        unique_industries = sorted(list(set(s.get('Industry', 'N/A') for s in all_stocks if s.get('Industry') != 'N/A')))
-        unique_countries = sorted(list(set(s.get('Country', 'Pakistan') for s in all_stocks if s.get('Country'))))
+            # Create Paginator for the sorted filtered stocks
+            paginator = Paginator(filtered_stocks, items_per_page)
+            page = params['page']
         
+            try:
+                stocks_page = paginator.page(page)
+            except PageNotAnInteger:
+                stocks_page = paginator.page(1)
+            except EmptyPage:
+                stocks_page = paginator.page(paginator.num_pages)
+            total_stocks_filtered = len(filtered_stocks)
+
+            # Get all unique values for dropdown filters
+            unique_sectors = sorted(list(set(s.get('Sector', 'Other') for s in all_stocks if s.get('Sector'))))
+            unique_industries = sorted(list(set(s.get('Industry', 'N/A') for s in all_stocks if s.get('Industry') != 'N/A')))
+            unique_countries = sorted(list(set(s.get('Country', 'Pakistan') for s in all_stocks if s.get('Country'))))
+        else:
+            # Database mode - filter, sort and paginate the latest trading date's
+            # stocks in the database so only the requested page is loaded
+            logger.info("Screening latest stocks from the database")
+            latest_stocks = get_latest_stocks()
+            screened_stocks = screen_stocks(
+                active_filters,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                queryset=latest_stocks,
+            )
+            stocks_page = paginate_stocks(screened_stocks, params['page'], items_per_page)
+            total_stocks = latest_stocks.count()
+            total_stocks_filtered = stocks_page.paginator.count
+            data_source = "Database"
+
+            # Get all unique values for dropdown filters
+            unique_sectors = list(latest_stocks.order_by('sector').values_list('sector', flat=True).distinct())
+            unique_industries = list(latest_stocks.exclude(industry__isnull=True).order_by('industry').values_list('industry', flat=True).distinct())
+            unique_countries = list(latest_stocks.order_by('country').values_list('country', flat=True).distinct())
+
+        logger.info(f"Data source: {data_source}, stock count: {total_stocks}")
+
+        # Get market index data for context (for now, just mock data)
+        index_data = get_index_data()
+
         # Prepare context
         context = {
             'stocks': stocks_page, # Pass the paginated page object
             'total_stocks': total_stocks, # Total stocks from API
-            'total_stocks_filtered': len(filtered_stocks), # Total matching filters
+            'total_stocks_filtered': total_stocks_filtered, # Total matching filters
             'active_filters': active_filters, # Pass the active filters dict
             'active_filters_count': len(active_filters), # Explicitly set the count
             'filter_count': len(active_filters), # Alternative name for template
@@ -1594,6 +1495,12 @@ def get_stock_chart_data(request):
     """
     API endpoint to fetch historical data for a specific stock and generate chart data.
     Uses database data for historical stock information.
+
+    Query parameters:
+    - symbol: The stock symbol (required).
+    - start_date/end_date: The date range (defaults to the last 90 days).
+    - points: Maximum number of data points to return (defaults to 500).
+    - method: Downsampling method for long ranges, "ohlc" (default) or "lttb".
     """
     try:
         symbol = request.GET.get('symbol')
@@ -1604,16 +1511,27 @@ def get_stock_chart_data(request):
         logger.info(f"Fetching chart data for symbol: {symbol}")
 
         # Get date range (default to last 90 days for better visualization)
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=90)
+        try:
+            end_date = parse_date(request.GET.get('end_date') or '') or timezone.now().date()
+            start_date = parse_date(request.GET.get('start_date') or '') or end_date - timedelta(days=90)
+            max_points = int(request.GET.get('points', DEFAULT_MAX_POINTS))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date range or points'}, status=400)
+
+        if start_date > end_date:
+            return JsonResponse({'error': 'start_date cannot be after end_date'}, status=400)
+        if (end_date - start_date).days > MAX_HISTORY_DAYS:
+            return JsonResponse({'error': f'Date range cannot exceed {MAX_HISTORY_DAYS} days'}, status=400)
+        max_points = min(max(max_points, 3), MAX_POINTS_LIMIT)
+
+        method = request.GET.get('method', 'ohlc').lower()
+        if method not in DOWNSAMPLING_METHODS:
+            return JsonResponse({'error': f'Unsupported method: {method}'}, status=400)
 
         # Query database for historical data
-        stocks = Stock.objects.filter(
-            symbol=symbol,
-            date__range=[start_date, end_date]
-        ).order_by('date')
+        history = load_symbol_history(symbol, start_date, end_date)
 
-        if not stocks.exists():
+        if not len(history):
             logger.error(f"No data found for symbol {symbol} in database")
             return JsonResponse({
                 'error': 'No data found for the specified symbol',
@@ -1621,49 +1539,21 @@ def get_stock_chart_data(request):
                 'date_range': f"{start_date} to {end_date}"
             }, status=404)
 
-        # Prepare data arrays
-        dates = []
-        prices = []  # Close prices
-        opens = []
-        highs = []
-        lows = []
-        volumes = []
-        
-        for stock in stocks:
-            try:
-                date_str = stock.date.strftime('%Y-%m-%d')
-                dates.append(date_str)
-                prices.append(float(stock.current_price))
-                opens.append(float(stock.open_price))
-                highs.append(float(stock.high_price))
-                lows.append(float(stock.low_price))
-                volumes.append(stock.volume)
-            except (ValueError, TypeError) as e:
-                logger.error(f"Error processing data for {symbol} on {stock.date}: {str(e)}")
-                continue
-
-        if not dates:
-            logger.error(f"No valid data points found for symbol {symbol}")
-            return JsonResponse({
-                'error': 'No valid data points found',
-                'symbol': symbol,
-                'date_range': f"{start_date} to {end_date}"
-            }, status=404)
+        downsampled = downsample_history(history, max_points, method)
+        company_name = Stock.objects.filter(symbol=symbol).order_by('-date').values_list('company_name', flat=True).first()
 
         chart_data = {
-            'dates': dates,
-            'prices': prices,
-            'opens': opens,
-            'highs': highs,
-            'lows': lows,
-            'volumes': volumes,
+            **history_to_columns(downsampled),
             'symbol': symbol,
-            'company_name': stocks.first().company_name,
-            'data_points': len(dates),
+            'company_name': company_name,
+            'data_points': len(downsampled),
+            'total_points': len(history),
+            'downsampled': len(downsampled) < len(history),
+            'method': method,
             'source': 'database'
         }
         
-        logger.info(f"Successfully generated chart data for {symbol} with {len(dates)} data points")
+        logger.info(f"Successfully generated chart data for {symbol} with {len(downsampled)} of {len(history)} data points")
         return JsonResponse(chart_data)
 
     except Exception as e:
@@ -1677,78 +1567,45 @@ def get_heat_map_data(request):
     """
     API endpoint to fetch data for the heat map visualization.
     Groups stocks by sector and measures by different metrics.
+
+    Uses the trading date given by the `date` query parameter, or the latest one.
     """
     try:
-        # Get live data from API
-        raw_data = fetch_stock_data(LIVE_API_URL)
-        if not raw_data:
-            return JsonResponse({'error': 'Failed to fetch data from API'}, status=500)
-        
-        # Process data for heat map
-        stocks = process_stock_data(raw_data)
-        
-        # Group stocks by sector and calculate metrics
-        sectors = {}
-        for stock in stocks:
-            sector = stock['Sector']
-            if sector not in sectors:
-                sectors[sector] = {
-                    'stocks': [],
-                    'market_cap': 0,
-                    'volume': 0,
-                    'change_total': 0,
-                    'count': 0
-                }
-            sectors[sector]['stocks'].append(stock)
-            
-            # Handle potential decimal.Decimal type in MarketCap
-            market_cap = stock['MarketCap']
-            if hasattr(market_cap, 'to_integral_exact'):  # Check if it's a decimal.Decimal
-                market_cap = float(market_cap)
-            sectors[sector]['market_cap'] += float(market_cap)
-            
-            sectors[sector]['volume'] += int(stock['Volume'])
-            sectors[sector]['change_total'] += float(stock['ChangePercentage'])
-            sectors[sector]['count'] += 1
-        
-        # Create heat map data structure
-        sector_names = list(sectors.keys())
-        metrics = ['Market Cap', 'Volume', 'Change %']
-        values = []
-        
-        # Calculate normalized values for each metric
-        for metric in metrics:
-            row = []
-            for sector in sector_names:
-                if metric == 'Market Cap':
-                    value = sectors[sector]['market_cap'] / 1e9  # Convert to billions
-                elif metric == 'Volume':
-                    value = sectors[sector]['volume'] / 1e6  # Convert to millions
-                else:  # Change %
-                    value = sectors[sector]['change_total'] / sectors[sector]['count']
-                row.append(round(value, 2))
-            values.append(row)
-        
-        # Create text annotations
-        text = []
-        for metric in metrics:
-            row = []
-            for sector in sector_names:
-                if metric == 'Market Cap':
-                    value = f"{sectors[sector]['market_cap']/1e9:.1f}B"
-                elif metric == 'Volume':
-                    value = f"{sectors[sector]['volume']/1e6:.1f}M"
-                else:
-                    value = f"{sectors[sector]['change_total']/sectors[sector]['count']:.1f}%"
-                row.append(value)
-            text.append(row)
-        
-        return JsonResponse({
-            'x': sector_names,
-            'y': metrics,
-            'z': values,
-            'text': text
-        })
+        try:
+            date = parse_date(request.GET.get('date') or '') or get_latest_trading_date()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date'}, status=400)
+        if date is None:
+            return JsonResponse({'error': 'No data available'}, status=404)
+
+        def build_heat_map_data():
+            sectors = get_sector_summary(date)
+            if not sectors:
+                return None
+
+            sector_names = [sector['sector'] for sector in sectors]
+            metrics = ['Market Cap', 'Volume', 'Change %']
+            market_caps = [float(sector['total_market_cap'] or 0) / 1e9 for sector in sectors]  # Convert to billions
+            volumes = [float(sector['total_volume'] or 0) / 1e6 for sector in sectors]  # Convert to millions
+            changes = [float(sector['avg_change'] or 0) for sector in sectors]
+
+            return {
+                'x': sector_names,
+                'y': metrics,
+                'z': [
+                    [round(value, 2) for value in market_caps],
+                    [round(value, 2) for value in volumes],
+                    [round(value, 2) for value in changes],
+                ],
+                'text': [
+                    [f"{value:.1f}B" for value in market_caps],
+                    [f"{value:.1f}M" for value in volumes],
+                    [f"{value:.1f}%" for value in changes],
+                ],
+                'date': date.strftime('%Y-%m-%d'),
+            }
+
+        return cached_chart_response(request, 'heat_map', [date], build_heat_map_data)
         
     except Exception as e:
         logger.error(f"Error generating heat map data: {str(e)}")
@@ -1761,79 +1618,53 @@ def get_bubble_chart_data(request):
     """
     API endpoint to fetch data for the bubble chart visualization.
     Shows market cap vs change percentage by sector, with bubble size representing volume.
+
+    Uses the trading date given by the `date` query parameter, or the latest one.
     """
     try:
-        # Get live or historical data based on request
-        live_data = request.GET.get('live_data', 'true')
-        
-        if live_data == 'true':
-            # Fetch live data from API
-            raw_data = fetch_stock_data(LIVE_API_URL)
-            stocks = process_stock_data(raw_data)
-        else:
-            # Get historical data from database
-            end_date = timezone.now().date()
-            start_date = end_date - timedelta(days=1)
-            stocks = get_historical_data(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-        
-        if not stocks:
+        try:
+            date = parse_date(request.GET.get('date') or '') or get_latest_trading_date()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date'}, status=400)
+        if date is None:
             return JsonResponse({'error': 'No data available'}, status=404)
-        
-        # Group stocks by sector and calculate metrics
-        sector_data = {}
-        for stock in stocks:
-            sector = stock.get('Sector', 'Other')
-            if sector not in sector_data:
-                sector_data[sector] = {
-                    'count': 0,
-                    'total_change': 0,
-                    'total_market_cap': 0,
-                    'total_volume': 0
-                }
-            
-            sector_data[sector]['count'] += 1
-            sector_data[sector]['total_change'] += float(stock.get('ChangePercentage', 0))
-            
-            # Handle potential decimal.Decimal type in MarketCap
-            market_cap = stock.get('MarketCap', 0)
-            if hasattr(market_cap, 'to_integral_exact'):  # Check if it's a decimal.Decimal
-                market_cap = float(market_cap)
-            sector_data[sector]['total_market_cap'] += float(market_cap)
-            
-            sector_data[sector]['total_volume'] += float(stock.get('Volume', 0))
-        
-        # Calculate averages and prepare data for the chart
-        x = []  # Sectors
-        y = []  # Average change percentage
-        size = []  # Volume
-        color = []  # Market cap
-        text = []  # Hover text
-        
-        for sector, data in sector_data.items():
-            if data['count'] > 0:
-                avg_change = data['total_change'] / data['count']
-                avg_market_cap = data['total_market_cap'] / data['count']
-                total_volume = data['total_volume']
+
+        def build_bubble_chart_data():
+            x = []  # Sectors
+            y = []  # Average change percentage
+            size = []  # Volume
+            color = []  # Market cap
+            text = []  # Hover text
+            
+            for sector in get_sector_summary(date):
+                avg_change = float(sector['avg_change'] or 0)
+                avg_market_cap = float(sector['avg_market_cap'] or 0)
+                total_volume = float(sector['total_volume'] or 0)
                 
-                x.append(sector)
+                x.append(sector['sector'])
                 y.append(avg_change)
                 size.append(total_volume / 1000000)  # Scale down volume for better visualization
                 color.append(avg_market_cap / 1000000)  # Scale down market cap for better visualization
-                text.append(f"Sector: {sector}<br>" +
+                text.append(f"Sector: {sector['sector']}<br>" +
                           f"Avg Change: {avg_change:.2f}%<br>" +
                           f"Avg Market Cap: {avg_market_cap/1000000:.2f}M<br>" +
                           f"Total Volume: {total_volume/1000000:.2f}M")
-        
-        if not x:
-            return JsonResponse({'error': 'No valid data available'}, status=404)
-        
-        return JsonResponse({
-            'x': x,
-            'y': y,
-            'size': size,
-            'color': color,
-            'text': text
-        })
+            
+            if not x:
+                return None
+            return {
+                'x': x,
+                'y': y,
+                'size': size,
+                'color': color,
+                'text': text,
+                'date': date.strftime('%Y-%m-%d'),
+            }
+
+        return cached_chart_response(
+            request, 'bubble_chart', [date], build_bubble_chart_data,
+            empty_message='No valid data available'
+        )
         
     except Exception as e:
         logger.error(f"Error in get_bubble_chart_data: {str(e)}")
@@ -1843,60 +1674,33 @@ def get_line_chart_data(request):
     """
     API endpoint to fetch data for the line chart visualization.
     Creates a market trend line chart using historical data.
+
+    Uses the date range given by the `start_date` and `end_date` query parameters,
+    defaulting to the last 30 days.
     """
     try:
-        # Get historical data for the last 30 days
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        # Get data from database
-        stocks = Stock.objects.filter(
-            date__range=[start_date, end_date]
-        ).order_by('date')
-        
-        if not stocks.exists():
-            return JsonResponse({'error': 'No historical data available'}, status=404)
-        
-        # Group data by date and calculate market metrics
-        dates = []
-        market_values = []
-        volume_values = []
-        
-        current_date = None
-        daily_total = {'price': 0, 'volume': 0, 'count': 0}
-        
-        for stock in stocks:
-            if current_date != stock.date:
-                if current_date is not None:
-                    # Calculate averages and append to arrays
-                    avg_price = daily_total['price'] / daily_total['count']
-                    avg_volume = daily_total['volume'] / daily_total['count']
-                    dates.append(current_date.strftime('%Y-%m-%d'))
-                    market_values.append(round(avg_price, 2))
-                    volume_values.append(round(avg_volume, 0))
-                
-                # Reset for new date
-                current_date = stock.date
-                daily_total = {'price': 0, 'volume': 0, 'count': 0}
-            
-            # Accumulate daily values
-            daily_total['price'] += float(stock.current_price)
-            daily_total['volume'] += stock.volume
-            daily_total['count'] += 1
-        
-        # Add the last day
-        if current_date is not None:
-            avg_price = daily_total['price'] / daily_total['count']
-            avg_volume = daily_total['volume'] / daily_total['count']
-            dates.append(current_date.strftime('%Y-%m-%d'))
-            market_values.append(round(avg_price, 2))
-            volume_values.append(round(avg_volume, 0))
-        
-        return JsonResponse({
-            'dates': dates,
-            'market_values': market_values,
-            'volume_values': volume_values
-        })
+        try:
+            end_date = parse_date(request.GET.get('end_date') or '') or timezone.now().date()
+            start_date = parse_date(request.GET.get('start_date') or '') or end_date - timedelta(days=30)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date range'}, status=400)
+        if start_date > end_date:
+            return JsonResponse({'error': 'start_date cannot be after end_date'}, status=400)
+
+        def build_line_chart_data():
+            trend = get_market_trend(start_date, end_date)
+            if not trend:
+                return None
+            return {
+                'dates': [day['date'].strftime('%Y-%m-%d') for day in trend],
+                'market_values': [round(float(day['avg_price']), 2) for day in trend],
+                'volume_values': [round(float(day['avg_volume']), 0) for day in trend],
+            }
+
+        return cached_chart_response(
+            request, 'line_chart', [start_date, end_date], build_line_chart_data,
+            empty_message='No historical data available'
+        )
         
     except Exception as e:
         logger.error(f"Error generating line chart data: {str(e)}")
@@ -2006,7 +1810,9 @@ def stock_detail(request, symbol):
                 symbol=symbol,
                 date__lte=today,
                 date__gte=today - timedelta(days=30)
-            ).order_by('-date')
+            ).order_by('-date').values_list(
+                'date', 'current_price', 'change_percentage', 'volume', 'open_price', 'high_price', 'low_price'
+            )
             
             # Convert to list of dictionaries for template
             stock_data = {
@@ -2040,17 +1846,18 @@ def stock_detail(request, symbol):
                 'RelativeVolume': float(stock.relative_volume) if hasattr(stock, 'relative_volume') and stock.relative_volume is not None else None
             }
             
-            history_data = []
-            for h in history:
-                history_data.append({
-                    'date': h.date.strftime('%Y-%m-%d'),
-                    'price': float(h.current_price),
-                    'change': float(h.change_percentage),
-                    'volume': h.volume,
-                    'open': float(h.open_price),
-                    'high': float(h.high_price),
-                    'low': float(h.low_price),
-                })
+            history_data = [
+                {
+                    'date': date.strftime('%Y-%m-%d'),
+                    'price': float(price),
+                    'change': float(change),
+                    'volume': volume,
+                    'open': float(open_price),
+                    'high': float(high_price),
+                    'low': float(low_price),
+                }
+                for date, price, change, volume, open_price, high_price, low_price in history
+            ]
             
             # Calculate estimated annual dividend if dividend yield is available
             dividend_yield = stock_data.get('DividendYield', 0)
@@ -2109,15 +1916,10 @@ def debug_api(request):
             
             # Test API connectivity with token
             try:
-                headers = {
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Authorization': f'Bearer {token}'
-                }
-                
                 # Try to get a small sample of data
                 test_url = LIVE_API_URL
                 logger.info(f"Testing API connectivity with URL: {test_url}")
-                response = requests.get(test_url, headers=headers, timeout=30)
+                response = mg_link_client.get(test_url)
                 
                 result['api_status_code'] = response.status_code
                 
@@ -2143,6 +1945,8 @@ def debug_api(request):
         result['token_status'] = 'Error'
         result['error'] = str(e)
     
+    # Per-endpoint latency and circuit breaker state of this worker's API client
+    result['client_stats'] = mg_link_client.stats()
     return JsonResponse(result)
 
 @csrf_exempt
@@ -2203,29 +2007,24 @@ def debug_api_fetch(request):
             'message': 'An error occurred while debugging API fetch'
         })
 
-# Test API connectivity on startup
 def test_api_connection():
-    """Test API connectivity on application startup and log results"""
-    if getattr(settings, 'TESTING', False):
-        # Skip during tests
-        return
-    
-    logger.info("Testing API connectivity on startup...")
+    """
+    Test API connectivity and log results.
+
+    Returns True if the API returned data. Run with the `check_api_connection` management command.
+    """
+    logger.info("Testing API connectivity...")
     try:
         token = get_api_token()
         if token:
             logger.info("✅ Successfully obtained API token")
             try:
-                headers = {
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Authorization': f'Bearer {token}'
-                }
-                
-                response = requests.get(LIVE_API_URL, headers=headers, timeout=30)
+                response = mg_link_client.get(LIVE_API_URL)
                 if response.status_code == 200:
                     data = response.json()
                     if data and len(data) > 0:
                         logger.info(f"✅ API connection successful, received {len(data)} records")
+                        return True
                     else:
                         logger.warning("⚠️ API returned empty data, check query parameters")
                 else:
@@ -2237,116 +2036,4 @@ def test_api_connection():
             logger.error("❌ Failed to obtain API token, check credentials")
     except Exception as e:
         logger.error(f"❌ Unexpected error during API connection test: {str(e)}")
-
-# Run the API test when the application is ready
-def ready():
-    """Run when the application is ready"""
-    test_api_connection()
-
-# Attempt to run the test now
-try:
-    if apps.apps_ready:
-        test_api_connection()
-except:
-    # Ignore errors during import time
-    pass
-
-def update_db_schema():
-    """
-    Update database schema to add missing columns to the Stock model table.
-    This function runs when the application is loaded.
-    """
-    logger.info("Checking and updating psxscreener_stock database schema...")
-    
-    cursor = connection.cursor()
-    
-    # Check if columns exist before adding them
-    try:
-        # Add industry column if it doesn't exist
-        cursor.execute("""
-        SELECT column_name FROM information_schema.columns 
-        WHERE table_name='psxscreener_stock' AND column_name='industry';
-        """)
-        if not cursor.fetchone():
-            cursor.execute("""
-            ALTER TABLE psxscreener_stock ADD COLUMN industry varchar(100) NULL;
-            """)
-            logger.info("Added 'industry' column")
-        
-        # Add country column if it doesn't exist
-        cursor.execute("""
-        SELECT column_name FROM information_schema.columns 
-        WHERE table_name='psxscreener_stock' AND column_name='country';
-        """)
-        if not cursor.fetchone():
-            cursor.execute("""
-            ALTER TABLE psxscreener_stock ADD COLUMN country varchar(50) DEFAULT 'Pakistan';
-            """)
-            logger.info("Added 'country' column")
-        
-        # Add exchange column if it doesn't exist
-        cursor.execute("""
-        SELECT column_name FROM information_schema.columns 
-        WHERE table_name='psxscreener_stock' AND column_name='exchange';
-        """)
-        if not cursor.fetchone():
-            cursor.execute("""
-            ALTER TABLE psxscreener_stock ADD COLUMN exchange varchar(20) DEFAULT 'PSX';
-            """)
-            logger.info("Added 'exchange' column")
-        
-        # Add additional columns
-        columns_to_add = [
-            ('dividend_yield', 'decimal(6,2)'),
-            ('pb_ratio', 'decimal(10,2)'),
-            ('ps_ratio', 'decimal(10,2)'),
-            ('year_high', 'decimal(10,2)'),
-            ('year_low', 'decimal(10,2)'),
-            ('ma50', 'decimal(10,2)'),
-            ('ma200', 'decimal(10,2)'),
-            ('rsi14', 'decimal(6,2)'),
-            ('avg_volume', 'bigint'),
-            ('relative_volume', 'decimal(6,2)'),
-            ('change', 'decimal(10,2)')
-        ]
-        
-        for column_name, column_type in columns_to_add:
-            cursor.execute(f"""
-            SELECT column_name FROM information_schema.columns 
-            WHERE table_name='psxscreener_stock' AND column_name='{column_name}';
-            """)
-            if not cursor.fetchone():
-                cursor.execute(f"""
-                ALTER TABLE psxscreener_stock ADD COLUMN {column_name} {column_type} NULL;
-                """)
-                logger.info(f"Added '{column_name}' column")
-        
-        logger.info("Database schema update completed successfully!")
-        
-    except Exception as e:
-        logger.error(f"Error during schema update: {e}")
-        connection.rollback()
-    finally:
-        cursor.close()
-
-# Run the update when the module is loaded
-try:
-    update_db_schema()
-except Exception as e:
-    logger.error(f"Failed to update database schema: {e}")
-
-# Import the rest of the module after the schema update
-from django.shortcuts import render, redirect
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
-from django.utils import timezone
-from datetime import datetime, timedelta
-import requests
-import json
-import random
-import decimal
-import os
-import re
-from .models import Stock, LastDataUpdate
-from django.apps import apps
\ No newline at end of file
+    return False
@@ -0,0 +1,30 @@
+"""
+Shared cache of stock prices and investment valuations.
+
+Entries are keyed by primitive IDs and dates, and depend on the versions of namespaces:
+- `RATES_NAMESPACE` is bumped whenever stock rates are ingested.
+- Apps add their own namespaces, e.g. for a portfolio's investments.
+
+Configure the cache with the `VALUATION_CACHE` setting, e.g.
+
+```python
+VALUATION_CACHE = {
+    "MAXSIZE": 4096,  # Entries kept in-process
+    "TTL": 300,  # Seconds. None to only evict entries when the cache is full
+    "CACHE_ALIAS": "default",  # Share entries and versions through this Django cache
+}
+```
+"""
+
+from helpers.caching import VersionedCache
+
+
+valuation_cache = VersionedCache.from_settings("valuation", "VALUATION_CACHE")
+
+RATES_NAMESPACE = "rates"
+"""Namespace of entries that depend on stock rates"""
+
+
+def invalidate_rates() -> None:
+    """Invalidate the cached entries that depend on stock rates. Call after ingesting rates."""
+    valuation_cache.bump(RATES_NAMESPACE)
@@ -1,9 +1,16 @@
-from typing import Dict
+from typing import Dict, Iterable, NamedTuple, Optional
+import datetime
+import decimal
+import numpy as np
 import pandas as pd
 from django.core.files import File
+from django.db import models
+from django.db.models.functions import RowNumber
 from dateutil.parser import parse
 
 from .models import Rate, Stock, KSE100Rate, StockIndices
+from .caching import invalidate_rates
+from .signals import send_rates_ingested
 from helpers.utils.misc import comma_separated_to_int_float
 
 
@@ -12,6 +19,95 @@ def get_stocks_by_indices(*indices: StockIndices):
     return Stock.objects.filter(indices__contains=indices)
 
 
+def get_latest_prices(stocks: Iterable, date: Optional[datetime.date] = None) -> Dict:
+    """
+    Return the current prices of many stocks in a single query.
+
+    Prices are rounded the same way as `Stock.price`.
+
+    :param stocks: The stocks, or their IDs.
+    :param date: If provided, return the last prices on or before this date instead.
+    :return: A mapping of stock IDs to their current prices. Stocks without rates are omitted.
+    """
+    stock_ids = {stock.pk if isinstance(stock, Stock) else stock for stock in stocks}
+    if not stock_ids:
+        return {}
+
+    rates = Rate.objects.filter(stock_id__in=stock_ids)
+    if date is not None:
+        rates = rates.filter(added_at__date__lte=date)
+    latest_rates = (
+        rates.annotate(
+            row_number=models.Window(
+                RowNumber(),
+                partition_by=models.F("stock_id"),
+                order_by=models.F("added_at").desc(),
+            )
+        )
+        .filter(row_number=1)
+        .values_list("stock_id", "close")
+    )
+    return {
+        stock_id: decimal.Decimal(close).quantize(
+            decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+        )
+        for stock_id, close in latest_rates
+    }
+
+
+class CloseSeries(NamedTuple):
+    """Daily close prices"""
+
+    dates: np.ndarray
+    """Trading days (datetime64[D]), in ascending order"""
+    closes: np.ndarray
+
+    def on_or_before(self, dates: Iterable[datetime.date]) -> np.ndarray:
+        """
+        Returns the close on each of the dates, or on the nearest trading day before it.
+
+        NaN where there is no close on or before the date.
+        """
+        dates = np.asarray(list(dates), dtype="datetime64[D]")
+        positions = np.searchsorted(self.dates, dates, side="right") - 1
+        closes = np.full(len(dates), np.nan)
+        found = positions >= 0
+        closes[found] = self.closes[positions[found]]
+        return closes
+
+
+def get_kse100_closes(start_date: datetime.date, end_date: datetime.date) -> CloseSeries:
+    """
+    Load the KSE100 closes within a date range in a single query,
+    including the last close before the range.
+
+    :param start_date: The start date of the range.
+    :param end_date: The end date of the range (inclusive).
+    """
+    previous_date = (
+        KSE100Rate.objects.filter(date__lt=start_date)
+        .order_by("-date")
+        .values("date")[:1]
+    )
+    rates = list(
+        KSE100Rate.objects.filter(
+            models.Q(date__gte=start_date, date__lte=end_date)
+            | models.Q(date=models.Subquery(previous_date))
+        )
+        .order_by("date")
+        .values_list("date", "close")
+    )
+    if not rates:
+        return CloseSeries(
+            dates=np.array([], dtype="datetime64[D]"), closes=np.array([], dtype=float)
+        )
+
+    dates, closes = zip(*rates)
+    # Keep one close per date
+    dates, indices = np.unique(np.array(dates, dtype="datetime64[D]"), return_index=True)
+    return CloseSeries(dates=dates, closes=np.asarray(closes, dtype=float)[indices])
+
+
 def get_trend(previous_close: float, close: float) -> str:
     """Get the market trend based on the previous close and current close."""
     if close > previous_close:
@@ -101,6 +197,8 @@ def handle_rates_file(rates_file: File) -> None:
 
     Rate.objects.bulk_create(new_rates, batch_size=5000)
     Rate.objects.bulk_update(existing_rates, UPDATEABLE_RATE_FIELDS, batch_size=5000)
+    invalidate_rates()
+    send_rates_ingested([*new_rates, *existing_rates])
     return None
 
 
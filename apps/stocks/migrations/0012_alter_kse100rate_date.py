@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0011_alter_rate_added_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kse100rate',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
@@ -7,7 +7,7 @@ from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from helpers.caching import ttl_cache
+from .caching import valuation_cache, RATES_NAMESPACE
 
 
 
@@ -55,21 +55,43 @@ class Stock(models.Model):
             decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
         )
     
-    @ttl_cache(ttl=30)
     def get_price_on_date(
         self, date: datetime.date
     ) -> typing.Optional[decimal.Decimal]:
-        rate_on_date = (
-            self.rates.filter(added_at__date=date)
-            .order_by("-added_at")
-            .only("close", "added_at")
-            .first()
-        )
+        """Price of the stock on a date, i.e. the close of its last rate on that date."""
+        return type(self).get_price_on_date_by_id(self.pk, date)
 
-        if not rate_on_date:
-            return
-        return decimal.Decimal(rate_on_date.close).quantize(
-            decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+    @classmethod
+    def get_price_on_date_by_id(
+        cls, stock_id: typing.Any, date: datetime.date
+    ) -> typing.Optional[decimal.Decimal]:
+        """
+        Price of a stock on a date, i.e. the close of its last rate on that date.
+
+        Prices are cached in the valuation cache until new rates are ingested.
+
+        :param stock_id: The ID of the stock.
+        :param date: The date.
+        """
+
+        def get_price():
+            rate_on_date = (
+                Rate.objects.filter(stock_id=stock_id, added_at__date=date)
+                .order_by("-added_at")
+                .only("close", "added_at")
+                .first()
+            )
+            if not rate_on_date:
+                return None
+            return decimal.Decimal(rate_on_date.close).quantize(
+                decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP
+            )
+
+        return valuation_cache.get_or_set(
+            # Rates are filtered by date in the current timezone
+            ("price", str(stock_id), date.isoformat(), timezone.get_current_timezone_name()),
+            get_price,
+            namespaces=(RATES_NAMESPACE,),
         )
 
 
@@ -123,7 +145,7 @@ class KSE100Rate(models.Model):
     """Model definition for KSE100 Rate"""
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     open = models.FloatField()
     high = models.FloatField()
     low = models.FloatField()
@@ -0,0 +1,31 @@
+import typing
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Rate
+
+
+rates_ingested = Signal()
+"""
+Sent after stock rates are ingested, with the arguments:
+
+- `start_date`: The earliest trading date (in the Pakistan timezone) of the ingested rates.
+- `stock_ids`: The IDs of the stocks whose rates were ingested.
+"""
+
+
+def send_rates_ingested(rates: typing.Iterable[Rate]) -> None:
+    """Send `rates_ingested` for ingested rates. Nothing is sent if there are none."""
+    rates = list(rates)
+    if not rates:
+        return
+    start_date = min(
+        timezone.localdate(rate.added_at, timezone=settings.PAKISTAN_TIMEZONE)
+        for rate in rates
+    )
+    rates_ingested.send(
+        sender=Rate,
+        start_date=start_date,
+        stock_ids={rate.stock_id for rate in rates},
+    )
@@ -178,6 +178,9 @@ STATICFILES_DIRS = [
     # os.path.join(BASE_DIR, "static"),
 ]
 
+# Uploaded files, e.g. staged transactions uploads. These are private, and not served.
+MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_URL = "accounts:signin"
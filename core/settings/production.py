@@ -165,6 +165,9 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
 
+# Uploaded files, e.g. staged transactions uploads. These are private, and not served.
+MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -192,6 +195,14 @@ CSRF_TRUSTED_ORIGINS = ["https://doulab.project.bytechain.dev"]
 #     },
 # }
 
+# Share cached prices and valuations between processes, so that rate ingestion
+# (in the task workers) invalidates them in the web processes
+VALUATION_CACHE = {
+    "MAXSIZE": 4096,
+    "TTL": 60 * 5,
+    "CACHE_ALIAS": "default",
+}
+
 MG_LINK_CLIENT_USERNAME = os.getenv("MG_LINK_CLIENT_USERNAME", "EKCapital2024")
 MG_LINK_CLIENT_PASSWORD = os.getenv("MG_LINK_CLIENT_PASSWORD", "3KC@Pit@L!2024")
 
@@ -19,6 +19,7 @@ urlpatterns = [
     path("academy/", include("apps.Academy.urls", namespace="academy")),
     path("fullview/", include("apps.Fullview.urls", namespace="fullview")),
     path("alerts/", include("apps.Alerts.urls", namespace="alerts")),
+    path("live/", include("apps.live_rates.urls", namespace="live_rates")),
 ]
 
 if settings.DEBUG:
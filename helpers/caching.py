@@ -1,6 +1,6 @@
 import functools
-from typing import Callable, TypeVar, Coroutine, Any
-from cachetools import TTLCache
+from typing import Callable, TypeVar, Coroutine, Any, Dict, Hashable, Iterable, Optional, Tuple
+from cachetools import LRUCache, TTLCache
 import asyncio
 import threading
 
@@ -135,3 +135,196 @@ def ttl_cache(func: Callable[..., T] = None, *, maxsize: int = 128, ttl: float =
     if func is None:
         return decorator
     return decorator(func)
+
+
+class CacheStats:
+    """Thread-safe hit and miss counters of a cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """The ratio of hits to lookups. None if there have been no lookups"""
+        lookups = self.hits + self.misses
+        if not lookups:
+            return None
+        return self.hits / lookups
+
+    def reset(self) -> None:
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """
+    Cache of computed values keyed by primitive values (IDs, dates, etc.),
+    whose entries can be invalidated in bulk by bumping the version of a namespace.
+
+    An entry is stored under its key plus the current versions of the namespaces it
+    depends on. Bumping a namespace's version makes the entries stored under the
+    previous version unreachable, and they are evicted as the cache fills up or expire.
+
+    Entries and versions are kept in-process, in an LRU cache with an optional TTL.
+    If a Django cache alias is given, they are shared through that cache instead (e.g. Redis),
+    so that versions bumped in one process invalidate the entries in all processes.
+    Hit and miss counts are always per process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 300,
+        cache_alias: Optional[str] = None,
+    ):
+        """
+        :param name: Name of the cache. Prefixes the keys in a shared cache.
+        :param maxsize: The maximum number of entries kept in-process.
+        :param ttl: The time to live of entries in seconds. None for entries
+            to only be evicted when the cache is full (least recently used first).
+        :param cache_alias: Alias of the Django cache to share entries and versions through.
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.stats = CacheStats()
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl) if ttl else LRUCache(maxsize=maxsize)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name: str, setting_name: str) -> "VersionedCache":
+        """
+        Create a cache configured by a settings dictionary, with the (optional)
+        keys "MAXSIZE", "TTL" and "CACHE_ALIAS".
+        """
+        from django.conf import settings
+
+        config = getattr(settings, setting_name, None) or {}
+        return cls(
+            name,
+            maxsize=config.get("MAXSIZE", 1024),
+            ttl=config.get("TTL", 300),
+            cache_alias=config.get("CACHE_ALIAS", None),
+        )
+
+    @property
+    def shared_cache(self):
+        """The Django cache entries are shared through, if any"""
+        if self.cache_alias is None:
+            return None
+
+        from django.core.cache import caches
+
+        return caches[self.cache_alias]
+
+    def _version_key(self, namespace: str) -> str:
+        return f"{self.name}:version:{namespace}"
+
+    def get_versions(self, namespaces: Iterable[str]) -> Tuple[int, ...]:
+        """Returns the current versions of namespaces"""
+        namespaces = tuple(namespaces)
+        if not namespaces:
+            return ()
+
+        shared_cache = self.shared_cache
+        if shared_cache is None:
+            with self._lock:
+                return tuple(self._versions.get(namespace, 0) for namespace in namespaces)
+
+        keys = [self._version_key(namespace) for namespace in namespaces]
+        versions = shared_cache.get_many(keys)
+        return tuple(versions.get(key, 0) for key in keys)
+
+    def bump(self, *namespaces: str) -> None:
+        """Bump the versions of namespaces, invalidating their entries"""
+        shared_cache = self.shared_cache
+        for namespace in namespaces:
+            if shared_cache is None:
+                with self._lock:
+                    self._versions[namespace] = self._versions.get(namespace, 0) + 1
+                continue
+
+            key = self._version_key(namespace)
+            try:
+                shared_cache.incr(key)
+            except ValueError:
+                # The version does not exist yet. If another process
+                # added it in the meantime, increment theirs instead
+                if not shared_cache.add(key, 1, timeout=None):
+                    shared_cache.incr(key)
+
+    def get_or_set(
+        self,
+        key: Tuple[Hashable, ...],
+        func: Callable[[], T],
+        namespaces: Iterable[str] = (),
+    ) -> T:
+        """
+        Returns the entry for a key, computing and storing it with `func` if it is missing.
+
+        :param key: The entry's key. A tuple of primitive values.
+        :param func: Computes the entry's value. None values are stored too.
+        :param namespaces: Namespaces whose versions the entry depends on.
+        """
+        versioned_key = (*key, *self.get_versions(namespaces))
+        shared_cache = self.shared_cache
+        if shared_cache is None:
+            with self._lock:
+                value = self._entries.get(versioned_key, _MISSING)
+        else:
+            cache_key = ":".join(str(part) for part in (self.name, *versioned_key))
+            # Values are stored wrapped in a tuple, to tell stored None values from misses
+            wrapped = shared_cache.get(cache_key)
+            value = wrapped[0] if wrapped is not None else _MISSING
+
+        self.stats.record(hit=value is not _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = func()
+        if shared_cache is None:
+            with self._lock:
+                self._entries[versioned_key] = value
+        else:
+            shared_cache.set(cache_key, (value,), timeout=self.ttl)
+        return value
+
+    def clear(self) -> None:
+        """Clear the in-process entries, versions and stats"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+        self.stats.reset()
+
+    def info(self) -> Dict[str, Any]:
+        """Returns the configuration, size and stats of the cache"""
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "name": self.name,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "shared": self.cache_alias is not None,
+            "size": size,
+            **self.stats.as_dict(),
+        }
@@ -1,4 +1,6 @@
 from typing import Any, Callable, Dict, Iterable, List, Literal, TypeVar, Generic
+import numpy as np
+import pandas as pd
 from django.db import models
 
 from .parsers import cleanString
@@ -8,6 +10,19 @@ from ..utils.misc import get_value_by_traversal_path
 M = TypeVar("M", bound=models.Model)
 
 
+class DataCleaningError(ValueError):
+    """Raised when raw data cannot be cleaned"""
+
+    def __init__(
+        self, message: str, *, field_name: str, value: Any, index: Iterable = ()
+    ) -> None:
+        super().__init__(message)
+        self.field_name = field_name
+        self.value = value
+        self.index = list(index)
+        """Index labels of the rows with the value, when cleaning a DataFrame"""
+
+
 class ModelDataCleanerMeta(type):
     def __new__(cls, name, bases, attrs):
         new_class = super().__new__(cls, name, bases, attrs)
@@ -170,22 +185,64 @@ class ModelDataCleaner(Generic[M], metaclass=ModelDataCleanerMeta):
             field_name = self.key_mappings[field_name]
         return field_name
 
+    def clean_value(self, field_name: str, value: Any) -> Any:
+        """Clean a raw value of a field. Apply the field's parsers."""
+        if isinstance(value, str) and self.clean_strings is True:
+            value = cleanString(value)
+
+        parsers: Iterable[Callable] = self.parsers.get(field_name, None)
+        if parsers:
+            for parser in parsers:
+                value = parser(value)
+        return value
+
     def clean(self) -> None:
         """Clean the raw data. Apply parsers."""
         self._cleaned = {}
         for name in self.fields:
             key = self.to_key(name)
             value = get_value_by_traversal_path(self.rawdata, key)
+            self._cleaned[name] = self.clean_value(name, value)
+        return
+
+    @classmethod
+    def clean_frame(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Clean the raw data in the rows of a DataFrame, all at once.
 
-            if isinstance(value, str) and self.clean_strings is True:
-                value = cleanString(value)
+        The result is the same as cleaning each row's data, but parsers
+        are applied once per distinct value of a column, rather than per row.
+        Keys that are not columns of the DataFrame have None values.
 
-            parsers: Iterable[Callable] = self.parsers.get(name, None)
-            if parsers:
-                for parser in parsers:
-                    value = parser(value)
-            self._cleaned[name] = value
-        return
+        :param frame: The raw data. A row per instance, and a column per key.
+        :return: The cleaned data. A column per field, indexed like `frame`.
+        :raises DataCleaningError: If a value cannot be cleaned.
+        """
+        # Cleaning only depends on the class' configuration, not any raw data
+        cleaner = cls.__new__(cls)
+        cleaned = {}
+        for name in cleaner.fields:
+            key = cleaner.to_key(name)
+            if key in frame.columns:
+                codes, values = pd.factorize(frame[key], use_na_sentinel=False)
+                # Parsers expect Python, not NumPy, scalars
+                values = values.tolist()
+            else:
+                codes, values = np.zeros(len(frame), dtype=np.intp), [None]
+
+            cleaned_values = np.empty(len(values), dtype=object)
+            for position, value in enumerate(values):
+                try:
+                    cleaned_values[position] = cleaner.clean_value(name, value)
+                except Exception as exc:
+                    raise DataCleaningError(
+                        f"Invalid '{key}' value: {value!r}",
+                        field_name=name,
+                        value=value,
+                        index=frame.index[codes == position],
+                    ) from exc
+            cleaned[name] = cleaned_values[codes]
+        return pd.DataFrame(cleaned, index=frame.index)
 
     def new_instance(self, **extra_fields):
         """